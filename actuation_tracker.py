@@ -0,0 +1,183 @@
+"""
+Command-to-actuation latency tracking.
+
+Every pushed decision carries its id (`last_decision_ts`, epoch ms). The
+device echoes the id of the newest decision it has applied as
+`decision_ack` and keeps reporting `pump_state`. From what the agent reads
+back each cycle the tracker times, per decision:
+
+    pushed -> acknowledged     (ack latency)
+    pushed -> pump_state flip  (actuation latency, for decisions that change the pump)
+
+Devices with a set clock also report when they applied it
+(`decision_ack_ts`, epoch ms), which times the ack and any pump flip
+exactly. Otherwise times are when the agent observes the ack / state, so
+they are at most one agent poll late. An ack for a newer decision also
+confirms the older outstanding ones.
+
+A decision still unacknowledged ACK_TIMEOUT_SECONDS after it was sent is
+due for a re-send, up to MAX_RESENDS times between acks. A device that
+has used up its re-sends, or whose oldest unacknowledged decision is older
+than ACK_TIMEOUT_SECONDS * (1 + MAX_RESENDS), is reported as unconfirmed
+until it acknowledges something again.
+"""
+from collections import deque
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+ACK_TIMEOUT_SECONDS = 20.0
+MAX_RESENDS = 3
+MAX_OUTSTANDING = 32      # unacknowledged decision ids kept per device
+HISTORY_SIZE = 256        # latency samples kept per device for percentiles
+PERCENTILES = (50, 90, 99)
+
+# Fleet histogram bucket upper bounds (ms); the last bucket is open-ended
+HISTOGRAM_BOUNDS_MS = (250, 500, 1000, 2000, 5000, 10000, 30000, 60000, 300000)
+
+ACK = "ack"
+ACTUATION = "actuation"
+
+
+class _DeviceState:
+    __slots__ = ("outstanding", "last_sent", "resends", "unconfirmed", "last_ack",
+                 "pump_state", "awaiting", "latencies")
+
+    def __init__(self):
+        self.outstanding: Dict[int, float] = {}  # decision id -> first push time
+        self.last_sent = None                    # (decision id, time of the latest send)
+        self.resends = 0
+        self.unconfirmed = False
+        self.last_ack = None
+        self.pump_state = None                   # last observed "ON" / "OFF"
+        self.awaiting = None                     # (wanted pump_state, time first commanded)
+        self.latencies = {ACK: deque(maxlen=HISTORY_SIZE), ACTUATION: deque(maxlen=HISTORY_SIZE)}
+
+
+def _summary(samples) -> Dict[str, Any]:
+    if not len(samples):
+        return {"count": 0}
+    values = np.fromiter(samples, dtype=float) * 1000.0
+    summary = {f"p{p}_ms": round(float(v), 1) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+    summary.update(count=len(values), max_ms=round(float(values.max()), 1))
+    return summary
+
+
+class ActuationTracker:
+    """Per-device decision lifecycle; a fleet may share one tracker."""
+
+    def __init__(self, ack_timeout_seconds: float = ACK_TIMEOUT_SECONDS, max_resends: int = MAX_RESENDS):
+        self.ack_timeout_seconds = ack_timeout_seconds
+        self.max_resends = max_resends
+        self.devices: Dict[str, _DeviceState] = {}
+        self.fleet = {ACK: deque(maxlen=HISTORY_SIZE * 16), ACTUATION: deque(maxlen=HISTORY_SIZE * 16)}
+        self.histograms = {ACK: np.zeros(len(HISTOGRAM_BOUNDS_MS) + 1, dtype=np.int64),
+                           ACTUATION: np.zeros(len(HISTOGRAM_BOUNDS_MS) + 1, dtype=np.int64)}
+        self._bounds = np.asarray(HISTOGRAM_BOUNDS_MS, dtype=float) / 1000.0
+        self.counters = {"pushed": 0, "acked": 0, "superseded": 0, "actuated": 0,
+                         "resent": 0, "unconfirmed": 0}
+
+    def _state(self, device: str) -> _DeviceState:
+        state = self.devices.get(device)
+        if state is None:
+            state = self.devices[device] = _DeviceState()
+        return state
+
+    def _record(self, state: _DeviceState, kind: str, seconds: float):
+        seconds = max(0.0, seconds)
+        state.latencies[kind].append(seconds)
+        self.fleet[kind].append(seconds)
+        self.histograms[kind][np.searchsorted(self._bounds, seconds)] += 1
+
+    # --- Events ---
+    def pushed(self, device: str, decision_id: int, pump_on: bool, now: float):
+        """A decision was sent (or queued) for the device."""
+        state = self._state(device)
+        state.outstanding.setdefault(decision_id, now)
+        if len(state.outstanding) > MAX_OUTSTANDING:
+            del state.outstanding[min(state.outstanding)]
+        state.last_sent = (decision_id, now)
+        self.counters["pushed"] += 1
+        if now - min(state.outstanding.values()) > self.ack_timeout_seconds * (1 + self.max_resends):
+            self._unconfirmed(state)
+        wanted = "ON" if pump_on else "OFF"
+        if state.pump_state is None or state.pump_state == wanted:
+            state.awaiting = None
+        elif state.awaiting is None or state.awaiting[0] != wanted:
+            state.awaiting = (wanted, now)  # timed from the first decision asking for the change
+
+    def observe(self, device: str, ack_id: Optional[int], pump_state: Optional[str], now: float,
+                acked_at: Optional[float] = None):
+        """
+        What the device last reported: the newest decision id it applied,
+        its pump state and (optionally) when it applied that decision.
+        """
+        state = self._state(device)
+        if acked_at is not None:
+            now = min(now, acked_at)  # device clock ahead of ours: fall back to observed time
+        if ack_id is not None and ack_id != state.last_ack:
+            state.last_ack = ack_id
+            pushed_at = state.outstanding.get(ack_id)
+            if pushed_at is not None:
+                self._record(state, ACK, now - pushed_at)
+                self.counters["acked"] += 1
+            confirmed = [i for i in state.outstanding if i <= ack_id]
+            self.counters["superseded"] += len(confirmed) - (pushed_at is not None)
+            for i in confirmed:
+                del state.outstanding[i]
+            state.unconfirmed = False
+            state.resends = 0
+        if pump_state is not None:
+            state.pump_state = pump_state
+            if state.awaiting is not None and state.awaiting[0] == pump_state:
+                self._record(state, ACTUATION, now - state.awaiting[1])
+                self.counters["actuated"] += 1
+                state.awaiting = None
+
+    # --- Re-sends ---
+    def resend_due_in(self, device: str, now: float) -> Optional[float]:
+        """Seconds until the latest decision is due for a re-send, or None if nothing is due."""
+        state = self.devices.get(device)
+        if state is None or state.last_sent is None or state.last_sent[0] not in state.outstanding:
+            return None
+        if state.resends >= self.max_resends:
+            return None
+        return max(0.0, state.last_sent[1] + self.ack_timeout_seconds - now)
+
+    def resent(self, device: str, now: float) -> bool:
+        """Records a re-send; True when this one used up the device's re-sends (now unconfirmed)."""
+        state = self._state(device)
+        state.resends += 1
+        state.last_sent = (state.last_sent[0], now)
+        self.counters["resent"] += 1
+        if state.resends >= self.max_resends:
+            return self._unconfirmed(state)
+        return False
+
+    def _unconfirmed(self, state: _DeviceState) -> bool:
+        if state.unconfirmed:
+            return False
+        state.unconfirmed = True
+        self.counters["unconfirmed"] += 1
+        return True
+
+    def unconfirmed(self, device: str) -> bool:
+        state = self.devices.get(device)
+        return state is not None and state.unconfirmed
+
+    # --- Reports ---
+    def report(self, device: Optional[str] = None) -> Dict[str, Any]:
+        """Latency percentiles (ms) for one device, or the fleet with counters and histograms."""
+        if device is not None:
+            state = self._state(device)
+            return {ACK: _summary(state.latencies[ACK]), ACTUATION: _summary(state.latencies[ACTUATION]),
+                    "outstanding": len(state.outstanding), "unconfirmed": state.unconfirmed}
+        return {
+            ACK: _summary(self.fleet[ACK]),
+            ACTUATION: _summary(self.fleet[ACTUATION]),
+            "counters": dict(self.counters),
+            "unconfirmed_devices": sorted(d for d, s in self.devices.items() if s.unconfirmed),
+            "histogram_ms": {"le": list(HISTOGRAM_BOUNDS_MS) + ["+Inf"],
+                             ACK: self.histograms[ACK].tolist(),
+                             ACTUATION: self.histograms[ACTUATION].tolist()},
+        }
@@ -1,7 +1,10 @@
 import streamlit as st
 import pandas as pd
+import os
 import plotly.express as px
 from irrigation_engine import generate_daily_plan, generate_weekly_impact
+from timeseries_store import TimeSeriesStore, TIMESERIES_PATH, HISTORY_RANGES, history_frame
+from columnar_export import EXPORT_DIR, DECISIONS, WATER, ColumnarUnavailable, read_table
 
 # --- UI Configuration ---
 st.set_page_config(
@@ -175,3 +178,73 @@ with c2:
     saved = total_fixed - total_ai
     
     st.info(f"**Weekly Savings:** {saved:,.0f} Liters")
+
+# --- Recorded History (written by decision_core.py) ---
+HISTORY_PATH = os.environ.get("AGENT_TIMESERIES", TIMESERIES_PATH)
+
+@st.cache_resource
+def get_history_store(exists: bool):
+    return TimeSeriesStore.open_readonly(HISTORY_PATH) if exists else None
+
+st.divider()
+st.subheader("📈 Moisture History")
+store = get_history_store(os.path.exists(HISTORY_PATH))
+fields = store.series() if store is not None else []
+if not fields:
+    st.caption("No recorded history yet. Run decision_core.py to start recording field data.")
+else:
+    h1, h2 = st.columns([1, 2])
+    with h1:
+        field = st.selectbox("Field", fields)
+    with h2:
+        history_range = st.radio("Range", list(HISTORY_RANGES), index=1, horizontal=True)
+    history, resolution = history_frame(store, field, HISTORY_RANGES[history_range])
+    if history.empty:
+        st.caption("No data for this field in the selected range.")
+    else:
+        fig = px.line(history, height=300,
+                      color_discrete_sequence=["#3b82f6", "#93c5fd", "#1d4ed8", "#94a3b8"])
+        fig.update_layout(margin=dict(l=0, r=0, t=0, b=0), xaxis_title=None, yaxis_title="%",
+                          legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"{len(history):,} points at {resolution} resolution (min/max/mean per bucket).")
+
+# --- Season Analysis (columnar export written by decision_core.py, AGENT_EXPORT_DIR) ---
+EXPORT_PATH = os.environ.get("AGENT_EXPORT_DIR", EXPORT_DIR)
+
+@st.cache_data(ttl=300)
+def load_season(days: int):
+    start = (pd.Timestamp.now() - pd.Timedelta(days=days - 1)).date()
+    decisions = read_table(EXPORT_PATH, DECISIONS, start=start, columns=["decision"])
+    water = read_table(EXPORT_PATH, WATER, start=start,
+                       columns=["ai_liters", "manual_liters", "fixed_liters", "saved_liters"])
+    return decisions, water
+
+st.divider()
+st.subheader("🗂️ Season Analysis")
+try:
+    season_days = st.radio("Period", [7, 30, 120], index=1, horizontal=True, format_func=lambda d: f"{d} days")
+    decisions, water = load_season(season_days)
+except ColumnarUnavailable:
+    decisions = water = None
+    st.caption("Install pyarrow to analyse exported decisions and water use.")
+if decisions is not None and decisions.empty and water.empty:
+    st.caption("No exported data yet. Run decision_core.py with AGENT_EXPORT_DIR set to start exporting.")
+elif decisions is not None:
+    s1, s2 = st.columns(2)
+    with s1:
+        if not decisions.empty:
+            daily = (decisions.assign(pump_on=decisions["decision"].astype(str) == "PUMP_ON")
+                     .groupby(["date", "region"], observed=True)["pump_on"].sum().reset_index())
+            fig = px.bar(daily, x="date", y="pump_on", color="region", height=300)
+            fig.update_layout(margin=dict(l=0, r=0, t=0, b=0), xaxis_title=None, yaxis_title="Pump-on decisions")
+            st.plotly_chart(fig, use_container_width=True)
+    with s2:
+        if not water.empty:
+            used = water.assign(delivered=water["ai_liters"] + water["manual_liters"])
+            daily = used.groupby(["date", "region"], observed=True)[["delivered", "saved_liters"]].sum().reset_index()
+            fig = px.bar(daily, x="date", y="delivered", color="region", height=300)
+            fig.update_layout(margin=dict(l=0, r=0, t=0, b=0), xaxis_title=None, yaxis_title="Liters delivered")
+            st.plotly_chart(fig, use_container_width=True)
+            st.caption(f"{daily['saved_liters'].sum():,.0f} L saved vs fixed-timer irrigation over the period.")
+    st.caption(f"{len(decisions):,} decisions from {EXPORT_PATH}/")
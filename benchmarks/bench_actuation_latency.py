@@ -0,0 +1,120 @@
+"""
+Decision -> ack -> actuation latency for a fleet, end to end over HTTP.
+
+Runs agents and simulated devices against the ThingsBoard stand-in in real
+time. Agents decide every --agent-interval seconds; each device polls its
+decision every --device-interval seconds, switches the pump after
+--actuation-ms and reports pump_state + decision_ack / decision_ack_ts (like
+scripts/simulate_device.py and the firmware). A fraction of devices is
+offline, so their decisions go unacknowledged and get re-sent. Reports the
+tracker's fleet percentiles, histogram and counters. Agents run under
+poll_scheduler.FleetScheduler, which also drives the re-sends.
+
+    python benchmarks/bench_actuation_latency.py --fields 50 --seconds 20
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import requests
+
+import decision_core
+from actuation_tracker import ActuationTracker
+from poll_scheduler import FleetScheduler
+from tb_standin import StandInServer
+
+
+def run_devices(server: StandInServer, tokens, interval: float, actuation_seconds: float, stop: threading.Event):
+    """Device side: poll the decision, actuate, report state and the applied decision id."""
+    http = requests.Session()
+    rng = random.Random(1)
+    moisture = {token: rng.uniform(25, 60) for token in tokens}
+    pump = {token: "OFF" for token in tokens}
+    acks = {}
+    while not stop.is_set():
+        start = time.time()
+        for token in tokens:
+            base = f"{server.url}/api/v1/{token}/attributes"
+            client = http.get(f"{base}?clientKeys=pump_decision,last_decision_ts", timeout=5).json().get("client", {})
+            sync = {}
+            decision = client.get("pump_decision")
+            if decision in ("PUMP_ON", "PUMP_OFF"):
+                if decision[5:] != pump[token]:
+                    stop.wait(actuation_seconds)  # relay switching
+                    pump[token] = decision[5:]
+                if acks.get(token, (None,))[0] != client["last_decision_ts"]:
+                    acks[token] = (client["last_decision_ts"], int(time.time() * 1000))
+                sync["decision_ack"], sync["decision_ack_ts"] = acks[token]
+            moisture[token] += 6.0 if pump[token] == "ON" else -3.0
+            moisture[token] = max(0.0, min(100.0, moisture[token]))
+            sync.update(current_moisture=round(moisture[token], 1), pump_state=pump[token])
+            http.post(base, json=sync, timeout=5)
+        stop.wait(max(0.0, interval - (time.time() - start)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fields", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--agent-interval", type=float, default=2.0)
+    parser.add_argument("--device-interval", type=float, default=1.0)
+    parser.add_argument("--actuation-ms", type=float, default=50)
+    parser.add_argument("--offline", type=float, default=0.1, help="fraction of devices that never answer")
+    parser.add_argument("--ack-timeout", type=float, default=1.5)
+    args = parser.parse_args()
+
+    server = StandInServer().start()
+    saved = decision_core.THINGSBOARD_SERVER
+    decision_core.THINGSBOARD_SERVER = server.url
+    tracker = ActuationTracker(ack_timeout_seconds=args.ack_timeout)
+    tokens = [f"act-{i:04d}" for i in range(args.fields)]
+    offline = int(args.fields * args.offline)
+    for token in tokens:
+        server.devices[token] = {"current_moisture": 40.0, "pump_state": "OFF"}
+    agents = [decision_core.SmartIrrigationAgent(access_token=token, actuation=tracker) for token in tokens]
+
+    stop = threading.Event()
+    devices = threading.Thread(target=run_devices, daemon=True,
+                               args=(server, tokens[offline:], args.device_interval, args.actuation_ms / 1000, stop))
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Fixed cadence (min == max interval); the scheduler also fires the
+            # agents' re-send deadlines between cycles
+            scheduler = FleetScheduler(agents, min_interval=args.agent_interval, max_interval=args.agent_interval)
+            scheduler.run_due()
+            devices.start()
+            end = time.time() + args.seconds
+            while time.time() < end:
+                scheduler.run_due()
+                time.sleep(min(scheduler.next_due_in(), max(0.0, end - time.time())))
+    finally:
+        stop.set()
+        devices.join(timeout=10)
+        decision_core.THINGSBOARD_SERVER = saved
+        server.stop()
+
+    report = tracker.report()
+    report["unconfirmed_devices"] = len(report["unconfirmed_devices"])
+    print(json.dumps({
+        "fields": args.fields,
+        "offline_devices": offline,
+        "agent_interval_s": args.agent_interval,
+        "device_interval_s": args.device_interval,
+        "seconds": args.seconds,
+        "resend_checks": scheduler.resend_checks,
+        "fleet": report,
+        "example_device": tracker.report(tokens[-1]),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
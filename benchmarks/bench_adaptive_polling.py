@@ -0,0 +1,131 @@
+"""
+Fixed 2-second polling vs adaptive per-field scheduling over a replayed day.
+
+Each field is a small closed-loop simulation (drying, pump response, an
+afternoon rain front, a manual override window on some fields) driven on a
+simulated clock, so a full day replays in seconds. Agents run their real
+decision and scheduling code; only the network layer is replaced by the
+replay, which counts every fetch/weather/push as an upstream request.
+
+    python benchmarks/bench_adaptive_polling.py --fields 5 --hours 24
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from decision_core import SmartIrrigationAgent
+from poll_scheduler import FleetScheduler
+
+PUMP_RISE_PER_HOUR = 20.0
+RAIN_HOURS = (13, 16)
+
+
+class SimClock:
+    def __init__(self, start: float):
+        self.t = start
+
+    def now(self) -> float:
+        return self.t
+
+    def sleep(self, seconds: float):
+        self.t += seconds
+
+
+class ReplayField:
+    def __init__(self, i: int, start: float):
+        self.moisture = 45.0 + (i * 7) % 35
+        self.dry_per_hour = 0.6 + (i % 5) * 0.3
+        self.pump_on = False
+        self.updated = start
+        self.override_window = (6 * 3600, 7 * 3600) if i % 4 == 0 else None
+
+    def advance(self, now: float):
+        hours = (now - self.updated) / 3600.0
+        self.moisture += (PUMP_RISE_PER_HOUR if self.pump_on else -self.dry_per_hour) * hours
+        self.moisture = max(0.0, min(100.0, self.moisture))
+        self.updated = now
+
+
+class ReplayAgent(SmartIrrigationAgent):
+    def __init__(self, field: ReplayField, clock: SimClock, start: float, name: str):
+        super().__init__(access_token=name)
+        self.field = field
+        self.sim = clock
+        self.start = start
+        self.clock = clock.now
+        self.upstream_requests = 0
+
+    def fetch_attributes(self):
+        self.upstream_requests += 1
+        now = self.sim.now()
+        self.field.advance(now)
+        window = self.field.override_window
+        elapsed = now - self.start
+        self.manual_mode = window is not None and window[0] <= elapsed < window[1]
+        self.manual_cmd = "OFF"
+        moisture = round(self.field.moisture, 1)
+        self.update_water_balance(moisture)
+        return moisture
+
+    def get_weather_forecast(self):
+        self.upstream_requests += 1
+        hour = (self.sim.now() - self.start) / 3600.0
+        rain = 85 if RAIN_HOURS[0] <= hour < RAIN_HOURS[1] else 10
+        return {"temperature": 29.0, "humidity": 60, "rain_probability": rain, "rain_forecast_24h": 0.0}
+
+    def push_decision_to_thingsboard(self, decision_data):
+        self.upstream_requests += 1
+        self.field.advance(self.sim.now())
+        self.field.pump_on = decision_data["decision"] == "PUMP_ON"
+
+
+def replay(fields: int, hours: float, min_interval: float, max_interval: float):
+    start = 1_700_000_000.0
+    clock = SimClock(start)
+    agents = [ReplayAgent(ReplayField(i, start), clock, start, f"Field-{i}") for i in range(fields)]
+    scheduler = FleetScheduler(agents, min_interval=min_interval, max_interval=max_interval,
+                               clock=clock.now, sleep=clock.sleep)
+    end = start + hours * 3600
+    cpu_start = time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        while clock.now() < end:
+            scheduler.run_due()
+            clock.sleep(max(scheduler.next_due_in(), 1e-3))
+    cpu = time.process_time() - cpu_start
+    requests = sum(a.upstream_requests for a in agents)
+    return {
+        "cycles": scheduler.cycles_run,
+        "upstream_requests": requests,
+        "requests_per_field": round(requests / fields, 1),
+        "cpu_ms_per_field": round(cpu / fields * 1e3, 2),
+        "min_moisture_seen": round(min(a.field.moisture for a in agents), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fields", type=int, default=5)
+    parser.add_argument("--hours", type=float, default=24)
+    args = parser.parse_args()
+
+    fixed = replay(args.fields, args.hours, 2, 2)
+    adaptive = replay(args.fields, args.hours, 2, 300)
+    results = {
+        "fields": args.fields,
+        "hours": args.hours,
+        "fixed_2s": fixed,
+        "adaptive": adaptive,
+        "request_reduction": round(1 - adaptive["upstream_requests"] / fixed["upstream_requests"], 4),
+        "cpu_reduction": round(1 - adaptive["cpu_ms_per_field"] / fixed["cpu_ms_per_field"], 4),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
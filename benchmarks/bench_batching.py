@@ -0,0 +1,135 @@
+"""
+Per-device POST vs gateway batching for decisions and telemetry.
+
+Reports decisions/second, upstream requests and payload bytes per decision
+for both upload paths, plus a spill/replay pass with upstream failing.
+Body bytes exclude HTTP headers, which add roughly 200 bytes per request
+on top and therefore favour batching further.
+
+    python benchmarks/bench_batching.py --devices 500 --cycles 3
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import decision_core
+from gateway_batcher import GatewayBatcher, http_transport
+from tb_standin import StandInServer
+
+
+def make_decisions(agents):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [agent.analyze_and_decide(35 + i % 40) for i, agent in enumerate(agents)]
+
+
+def measure(server, label, push_all, count):
+    requests_before, bytes_before = server.request_count, server.bytes_received
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        push_all()
+    elapsed = time.perf_counter() - start
+    requests = server.request_count - requests_before
+    return {
+        "mode": label,
+        "items": count,
+        "seconds": round(elapsed, 4),
+        "items_per_sec": round(count / elapsed, 1),
+        "upstream_requests": requests,
+        "body_bytes_per_item": round((server.bytes_received - bytes_before) / count, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--cycles", type=int, default=3)
+    args = parser.parse_args()
+
+    server = StandInServer().start()
+    decision_core.THINGSBOARD_SERVER = server.url
+    spill_path = os.path.join(tempfile.mkdtemp(), "spill.jsonl")
+    batcher = GatewayBatcher(http_transport(server.url, "gateway-token"), max_delay=60, spill_path=spill_path)
+
+    direct = [decision_core.SmartIrrigationAgent(access_token=f"dev-{i}") for i in range(args.devices)]
+    batched = [decision_core.SmartIrrigationAgent(access_token=f"dev-{i}", device_name=f"Field-{i}", uploader=batcher)
+               for i in range(args.devices)]
+    decisions = make_decisions(direct)
+    total = args.devices * args.cycles
+
+    def push(agents):
+        def run():
+            for _ in range(args.cycles):
+                for agent, decision in zip(agents, decisions):
+                    agent.push_decision_to_thingsboard(decision)
+            batcher.flush()
+        return run
+
+    def telemetry_direct():
+        import requests
+        for c in range(args.cycles):
+            for i in range(args.devices):
+                requests.post(f"{server.url}/api/v1/dev-{i}/telemetry",
+                              json={"soil_moisture": 2500 + c, "pump_state": "OFF"}, timeout=5)
+
+    def telemetry_batched():
+        for c in range(args.cycles):
+            ts_ms = int(time.time() * 1000) + c
+            for i in range(args.devices):
+                batcher.add_telemetry(f"Field-{i}", {"soil_moisture": 2500 + c, "pump_state": "OFF"}, ts_ms)
+        batcher.flush()
+
+    results = {
+        "decisions": [
+            measure(server, "per_device_post", push(direct), total),
+            measure(server, "gateway_batch", push(batched), total),
+        ],
+        "telemetry": [
+            measure(server, "per_sample_post", telemetry_direct, total),
+            measure(server, "gateway_batch", telemetry_batched, total),
+        ],
+    }
+
+    # Upstream down: everything spills to disk, then replays on recovery
+    server.fault = "error"
+    with contextlib.redirect_stdout(io.StringIO()):
+        push(batched)()
+    spilled = batcher.stats["entries_spilled"]
+    server.fault = "ok"
+    with contextlib.redirect_stdout(io.StringIO()):
+        push(batched)()
+    results["spill"] = {"entries_spilled": spilled,
+                        "entries_replayed": batcher.stats["entries_replayed"],
+                        "entries_superseded": batcher.stats["entries_superseded"],
+                        "spill_file_left": os.path.exists(spill_path)}
+
+    # Long outage: the spill file stays under its cap, dropping the oldest entries
+    capped_path = os.path.join(os.path.dirname(spill_path), "capped.jsonl")
+    capped = GatewayBatcher(http_transport(server.url, "gateway-token"), max_delay=60,
+                            spill_path=capped_path, max_spill_bytes=64 * 1024)
+    server.fault = "error"
+    with contextlib.redirect_stdout(io.StringIO()):
+        for c in range(args.cycles * 10):
+            for i in range(args.devices):
+                capped.add_telemetry(f"Field-{i}", {"soil_moisture": 2500 + c}, 1_700_000_000_000 + c)
+            capped.flush()
+    server.fault = "ok"
+    results["spill_cap"] = {"max_spill_bytes": capped.max_spill_bytes,
+                            "spill_file_bytes": os.path.getsize(capped_path),
+                            "entries_spilled": capped.stats["entries_spilled"],
+                            "entries_dropped": capped.stats["entries_dropped"]}
+    server.stop()
+    assert results["spill_cap"]["spill_file_bytes"] <= capped.max_spill_bytes and capped.stats["entries_dropped"] > 0
+
+    assert results["spill"]["entries_replayed"] + results["spill"]["entries_superseded"] == spilled and not results["spill"]["spill_file_left"]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
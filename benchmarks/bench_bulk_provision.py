@@ -0,0 +1,104 @@
+"""
+Bulk provisioning: fields provisioned per second against the stand-in.
+
+Provisions a synthetic field inventory (device, credentials, shared config,
+dashboard per field) through scripts/bulk_provision.py against the local
+ThingsBoard stand-in with per-request latency, a tenant rate limit and a
+short JWT lifetime, then re-runs it to show that a second pass creates
+nothing. Finally checks a few fields' config through the device API, the
+way the agent reads it.
+
+    python benchmarks/bench_bulk_provision.py --fields 2000 --workers 16 --latency-ms 20
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, os.path.join(HERE, "..", "scripts"))
+
+import requests
+
+from bulk_provision import DEFAULT_DASHBOARD, Provisioner, TBSession, load_fields
+from field_config import CONFIG_KEYS
+from tb_standin import StandInServer
+
+USERNAME, PASSWORD = "tenant@thingsboard.org", "tenant"
+CROPS = ["Rice (Paddy)", "Wheat", "Sugarcane", "Cotton", "Maize"]
+STAGES = ["Initial", "Vegetative", "Flowering", "Maturity"]
+SOILS = ["Loam (Balanced)", "Clay (Retains Water)", "Sandy (Drains Fast)"]
+
+
+def write_inventory(path: str, fields: int):
+    rng = random.Random(0)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "zone", "crop", "stage", "soil", "size_ha"])
+        for i in range(fields):
+            writer.writerow([f"Field-{i:05d}", f"Zone-{i % 40:02d}", rng.choice(CROPS), rng.choice(STAGES),
+                             rng.choice(SOILS), round(rng.uniform(0.5, 5.0), 2)])
+
+
+def provision(server: StandInServer, fields, template, workers: int, rate: float) -> dict:
+    session = TBSession(server.url, USERNAME, PASSWORD, rate=rate, pool_size=workers)
+    session.login()
+    provisioner = Provisioner(session, template, workers=workers)
+    rows = provisioner.run(fields, progress_seconds=0)
+    return provisioner.summary(len(fields)), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fields", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=0, help="client-side limit, requests/second (0 = none)")
+    parser.add_argument("--server-rate", type=float, default=2000, help="stand-in tenant limit (HTTP 429 above it)")
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--jwt-ttl", type=float, default=2.0, help="seconds; forces token refreshes mid-run")
+    args = parser.parse_args()
+
+    server = StandInServer().start()
+    server.latency_seconds = args.latency_ms / 1000
+    server.rate_limit = args.server_rate
+    server.jwt_ttl_seconds = args.jwt_ttl
+    with open(DEFAULT_DASHBOARD) as f:
+        template = json.load(f)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "fields.csv")
+        write_inventory(path, args.fields)
+        fields = load_fields(path)
+        first, rows = provision(server, fields, template, args.workers, args.rate)
+        rerun, _ = provision(server, fields, template, args.workers, args.rate)
+
+    # The agent's view: shared config through the device API
+    config_ok = 0
+    for row, field in list(zip(rows, fields))[:: max(1, len(rows) // 20)]:
+        url = f"{server.url}/api/v1/{row['token']}/attributes?sharedKeys={CONFIG_KEYS}"
+        shared = requests.get(url, timeout=5).json().get("shared", {})
+        config_ok += shared.get("config_crop_type") == field["crop"] and shared.get("config_zone") == field["zone"]
+    checked = len(rows[:: max(1, len(rows) // 20)])
+    server.stop()
+
+    serial_seconds = first["requests"] * args.latency_ms / 1000
+    print(json.dumps({
+        "fields": args.fields,
+        "workers": args.workers,
+        "latency_ms": args.latency_ms,
+        "first_run": first,
+        "rerun": rerun,
+        "requests_per_field": round(first["requests"] / args.fields, 2),
+        "serial_estimate_seconds": round(serial_seconds, 1),
+        "devices": len(server.rest_devices),
+        "dashboards": len(server.dashboards),
+        "config_checked": f"{config_ok}/{checked}",
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
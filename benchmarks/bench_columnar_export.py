@@ -0,0 +1,134 @@
+"""
+Columnar export vs CSV: write throughput, size on disk and read-back time.
+
+Generates a season of synthetic decision rows in chunks (memory stays
+bounded by --chunk rows whatever --rows is) and streams them through
+ColumnarExporter as Parquet and as Arrow IPC, and through pandas.to_csv
+as the row-oriented baseline. Then times loading a single day / region
+back into pandas (partition pruning) and a whole-table column scan.
+
+    python benchmarks/bench_columnar_export.py --rows 2000000
+    python benchmarks/bench_columnar_export.py --rows 100000000 --dir /data/bench   # the full-size run
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import numpy as np
+import pandas as pd
+
+from columnar_export import ARROW, DECISIONS, PARQUET, ColumnarExporter, read_table
+
+START_MS = 1_767_225_600_000  # 2026-01-01 UTC
+SEASON_DAYS = 120
+REGIONS = np.array([f"Zone-{i:02d}" for i in range(10)], dtype=object)
+REASONS = np.array(["OK", "NEED", "RAIN", "DRY", "STALE"], dtype=object)
+DECISION_NAMES = np.array(["PUMP_OFF", "PUMP_ON"], dtype=object)
+
+
+def decision_chunks(rows: int, chunk: int, fields: int, seed: int = 7):
+    """Decision columns in time order, `chunk` rows at a time (what a fleet's agents produce)."""
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Field-{i:05d}" for i in range(fields)], dtype=object)
+    step_ms = SEASON_DAYS * 86_400_000 // rows
+    for start in range(0, rows, chunk):
+        n = min(chunk, rows - start)
+        index = np.arange(start, start + n)
+        field = index % fields
+        on = rng.random(n) < 0.3
+        yield {
+            "ts": START_MS + index * step_ms,
+            "field": names[field],
+            "region": REGIONS[field % len(REGIONS)],
+            "decision": DECISION_NAMES[on.astype(np.int8)],
+            "reason_code": REASONS[rng.integers(0, len(REASONS), n)],
+            "moisture": rng.uniform(15, 70, n).astype(np.float32),
+            "duration_s": np.where(on, 600, 0).astype(np.int32),
+            "liters": np.where(on, rng.integers(5_000, 60_000, n), 0).astype(np.int32),
+            "rain_prob": rng.integers(0, 100, n).astype(np.int16),
+            "temp_c": rng.normal(31, 4, n).astype(np.float32),
+            "stale": rng.random(n) < 0.01,
+        }
+
+
+def directory_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def export_columnar(root: str, format: str, args) -> dict:
+    exporter = ColumnarExporter(root, format=format, chunk_rows=args.chunk)
+    start = time.perf_counter()
+    for columns in decision_chunks(args.rows, args.chunk, args.fields):
+        exporter.write_columns(DECISIONS, columns)
+    exporter.flush()
+    seconds = time.perf_counter() - start
+    return {"seconds": round(seconds, 2), "rows_per_sec": round(args.rows / seconds),
+            "bytes": directory_bytes(root), "files": exporter.files_written}
+
+
+def export_csv(path: str, args) -> dict:
+    start = time.perf_counter()
+    for i, columns in enumerate(decision_chunks(args.rows, args.chunk, args.fields)):
+        frame = pd.DataFrame(columns)
+        frame["ts"] = pd.to_datetime(frame["ts"], unit="ms", utc=True)
+        frame.to_csv(path, mode="a", header=i == 0, index=False)
+    seconds = time.perf_counter() - start
+    return {"seconds": round(seconds, 2), "rows_per_sec": round(args.rows / seconds), "bytes": os.path.getsize(path)}
+
+
+def read_back(root: str, format: str, csv_path: str, args) -> dict:
+    day = date(2026, 1, 1) + timedelta(days=SEASON_DAYS // 2)
+    start = time.perf_counter()
+    one_day = read_table(root, DECISIONS, start=day, end=day, regions=[REGIONS[0]], format=format)
+    day_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    liters = read_table(root, DECISIONS, columns=["liters"], format=format)["liters"].sum()
+    scan_ms = (time.perf_counter() - start) * 1000
+    result = {"day_region_rows": len(one_day), "day_region_ms": round(day_ms, 1),
+              "liters_column_scan_ms": round(scan_ms, 1), "liters_total": int(liters)}
+    if csv_path is not None:
+        start = time.perf_counter()
+        chunks = pd.read_csv(csv_path, usecols=["liters"], chunksize=args.chunk)
+        total = sum(int(chunk["liters"].sum()) for chunk in chunks)
+        result["csv_liters_column_scan_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        assert total == result["liters_total"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--chunk", type=int, default=262_144, help="rows generated / buffered at a time")
+    parser.add_argument("--fields", type=int, default=5000)
+    parser.add_argument("--dir", help="where to write (default: a temporary directory, removed afterwards)")
+    parser.add_argument("--no-csv", action="store_true", help="skip the CSV baseline (slow at 100M rows)")
+    args = parser.parse_args()
+
+    base = args.dir or tempfile.mkdtemp(prefix="columnar-bench-")
+    try:
+        csv_path = None if args.no_csv else os.path.join(base, "decisions.csv")
+        results = {"rows": args.rows, "chunk_rows": args.chunk, "fields": args.fields}
+        results[PARQUET] = export_columnar(os.path.join(base, PARQUET), PARQUET, args)
+        results[ARROW] = export_columnar(os.path.join(base, ARROW), ARROW, args)
+        if csv_path is not None:
+            results["csv"] = export_csv(csv_path, args)
+            for format in (PARQUET, ARROW):
+                results[format]["size_vs_csv"] = round(results[format]["bytes"] / results["csv"]["bytes"], 3)
+        results["read"] = {PARQUET: read_back(os.path.join(base, PARQUET), PARQUET, csv_path, args),
+                           ARROW: read_back(os.path.join(base, ARROW), ARROW, None, args)}
+    finally:
+        if not args.dir:
+            shutil.rmtree(base, ignore_errors=True)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Versioned config snapshots: bytes and requests per agent cycle.
+
+Runs a fleet of agents against the ThingsBoard stand-in for a number of
+cycles, changing a few fields' config along the way, and compares the
+attribute traffic with the previous scheme (every config key re-fetched
+from both scopes every cycle). Also counts the config posts one
+iot_dashboard.py session makes over a series of reruns, which used to
+re-post the config on every rerun.
+
+    python benchmarks/bench_config_snapshots.py --fields 200 --cycles 20
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import requests
+
+import decision_core
+from field_config import CONFIG_KEYS, snapshot
+from tb_standin import StandInServer
+
+# The per-cycle fetch before config versioning
+LEGACY_KEYS = ("current_moisture,pump_state,config_crop_type,config_growth_stage,config_field_size,"
+               "manual_override,manual_state,config_soil_type,config_zone")
+CROPS = ["Rice (Paddy)", "Wheat", "Sugarcane", "Cotton"]
+
+
+def traffic(server: StandInServer) -> dict:
+    return {"requests": server.request_count,
+            "bytes": server.path_bytes + server.bytes_received + server.bytes_sent}
+
+
+def delta(before: dict, after: dict, per: int) -> dict:
+    return {k: round((after[k] - before[k]) / per, 2) for k in before}
+
+
+def seed(server: StandInServer, fields: int):
+    for i in range(fields):
+        token = f"cfg-{i:05d}"
+        server.devices[token] = snapshot({
+            "current_moisture": 30 + i % 50, "pump_state": "OFF", "manual_override": False,
+            "config_crop_type": CROPS[i % len(CROPS)], "config_growth_stage": "Vegetative",
+            "config_field_size": 1.0 + i % 5, "config_soil_type": "Loam (Balanced)",
+        })
+        server.shared[token] = snapshot({"config_zone": f"Zone-{i % 10:02d}"})
+
+
+def run_agents(server: StandInServer, fields: int, cycles: int, changes_per_cycle: int) -> dict:
+    agents = [decision_core.SmartIrrigationAgent(access_token=f"cfg-{i:05d}") for i in range(fields)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for agent in agents:  # first cycle loads every config
+            agent.fetch_attributes()
+        before = traffic(server)
+        for cycle in range(cycles):
+            for j in range(changes_per_cycle):
+                token = f"cfg-{(cycle * changes_per_cycle + j) % fields:05d}"
+                device = server.devices[token]
+                device.update(snapshot({"config_growth_stage": "Reproductive"}, device["config_version"]))
+            for agent in agents:
+                agent.fetch_attributes()
+        after = traffic(server)
+    reloads = sum(agent.config_tracker.reloads for agent in agents) - fields
+    applied = sum(agent.growth_stage == "Reproductive" for agent in agents)
+    return dict(delta(before, after, fields * cycles), config_reloads=reloads, changed_fields_seen=applied)
+
+
+def run_legacy(server: StandInServer, fields: int, cycles: int) -> dict:
+    http = requests.Session()
+    before = traffic(server)
+    for _ in range(cycles):
+        for i in range(fields):
+            url = f"{server.url}/api/v1/cfg-{i:05d}/attributes?clientKeys={LEGACY_KEYS}&sharedKeys={CONFIG_KEYS}"
+            http.get(url, timeout=5).raise_for_status()
+    return delta(before, traffic(server), fields * cycles)
+
+
+def dashboard_posts(server: StandInServer, reruns: int) -> dict:
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return {"skipped": "streamlit not installed"}
+    os.environ.update({"TB_SERVER": server.url, "TB_TOKEN": "cfg-00000", "DASHBOARD_REFRESH_SECONDS": "0"})
+    app = AppTest.from_file(os.path.join(HERE, "..", "iot_dashboard.py"), default_timeout=60)
+    before = server.bytes_received
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(reruns):
+            app.run()
+        app.sidebar.selectbox[0].select("Cotton" if app.sidebar.selectbox[0].value != "Cotton" else "Wheat").run()
+        for _ in range(reruns):
+            app.run()
+    if app.exception:
+        raise RuntimeError(f"iot_dashboard.py raised: {app.exception[0].message}")
+    # Previously every rerun posted the four config keys
+    previous = len(json.dumps({"config_crop_type": "Cotton", "config_growth_stage": "Vegetative",
+                               "config_field_size": 1.5, "config_soil_type": "Loam (Balanced)"}))
+    return {"reruns": 2 * reruns + 1, "config_bytes_posted": server.bytes_received - before,
+            "previous_config_posts": 2 * reruns + 1, "previous_config_bytes_posted": (2 * reruns + 1) * previous}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fields", type=int, default=200)
+    parser.add_argument("--cycles", type=int, default=20)
+    parser.add_argument("--changes", type=int, default=2, help="fields whose config changes per cycle")
+    parser.add_argument("--reruns", type=int, default=10)
+    args = parser.parse_args()
+
+    server = StandInServer().start()
+    saved = decision_core.THINGSBOARD_SERVER
+    decision_core.THINGSBOARD_SERVER = server.url
+    try:
+        seed(server, args.fields)
+        legacy = run_legacy(server, args.fields, args.cycles)
+        versioned = run_agents(server, args.fields, args.cycles, args.changes)
+        dashboard = dashboard_posts(server, args.reruns)
+    finally:
+        decision_core.THINGSBOARD_SERVER = saved
+        server.stop()
+
+    print(json.dumps({
+        "fields": args.fields,
+        "cycles": args.cycles,
+        "config_changes": args.changes * args.cycles,
+        "per_field_cycle": {"previous": legacy, "versioned": versioned},
+        "bytes_saved_per_cycle_fleet": round((legacy["bytes"] - versioned["bytes"]) * args.fields),
+        "requests_per_field_cycle": {"previous": legacy["requests"], "versioned": versioned["requests"]},
+        "dashboard": dashboard,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
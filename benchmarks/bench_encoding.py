@@ -0,0 +1,92 @@
+"""
+Micro-benchmark: bytes and microseconds per pushed decision.
+
+Compares the original payload path (ISO timestamp, f-string reason, dict
+serialized by requests' default JSON encoder) with the template encoder
+in payload_codec, and the dict path through the fast JSON backend.
+
+    python benchmarks/bench_encoding.py --iterations 200000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import payload_codec
+from payload_codec import DecisionEncoder, REASON_NEED
+
+FIELD_SIZE = 1.5
+CROP = "Rice (Paddy)"
+WEATHER = {"temperature": 28.5, "humidity": 65, "rain_probability": 10, "rain_forecast_24h": 0.0}
+
+
+def legacy_push(moisture=52.0, net_demand_mm=4.3, liters=64500):
+    """What push_decision_to_thingsboard used to build and serialize per cycle."""
+    result = {
+        "decision": "PUMP_ON",
+        "duration_seconds": int(net_demand_mm * 300),
+        "reason": f"Need {net_demand_mm:.1f}mm for {CROP}. Input: {liters}L",
+        "soil_moisture_percent": moisture,
+        "weather_summary": WEATHER,
+        "timestamp": datetime.now().isoformat(),
+        "liters_for_field": liters,
+    }
+    payload = {
+        "pump_decision": result["decision"],
+        "pump_duration": result["duration_seconds"],
+        "ai_reason": result["reason"],
+        "ai_weather_temp": result["weather_summary"]["temperature"],
+        "ai_weather_rain": result["weather_summary"]["rain_probability"],
+        "last_decision_ts": result["timestamp"],
+        "liters_total": result["liters_for_field"],
+        "liters_per_ha": int(result["liters_for_field"] / FIELD_SIZE),
+    }
+    # requests' json= path: json.dumps(..., allow_nan=False).encode("utf-8")
+    return json.dumps(payload, allow_nan=False).encode("utf-8")
+
+
+def compact_result(moisture=52.0, net_demand_mm=4.3, liters=64500):
+    return {
+        "decision": "PUMP_ON",
+        "duration_seconds": int(net_demand_mm * 300),
+        "reason_code": REASON_NEED,
+        "soil_moisture_percent": moisture,
+        "weather_summary": WEATHER,
+        "timestamp": int(time.time() * 1000),
+        "liters_for_field": liters,
+        "data_stale": False,
+    }
+
+
+def measure(fn, iterations):
+    body = fn()
+    seconds = min(timeit.repeat(fn, number=iterations, repeat=3))
+    return {"bytes": len(body), "us_per_decision": round(seconds / iterations * 1e6, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+
+    encoder = DecisionEncoder(FIELD_SIZE)
+    results = {
+        "json_backend": "orjson" if payload_codec.orjson is not None else "stdlib",
+        "legacy_dict_json": measure(legacy_push, args.iterations),
+        "template_encoder": measure(lambda: encoder.encode(compact_result()), args.iterations),
+        "compact_dict_fast_json": measure(lambda: payload_codec.dumps(encoder.encode_dict(compact_result())),
+                                          args.iterations),
+    }
+    # Both compact paths must describe the same payload
+    assert json.loads(encoder.encode(compact_result())) == json.loads(
+        payload_codec.dumps(encoder.encode_dict(compact_result())))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
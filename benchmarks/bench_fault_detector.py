@@ -0,0 +1,145 @@
+"""
+Fault detector: ingest throughput and synthetic fault scenarios.
+
+Generates per-device moisture / pump_state streams (1 sample per minute,
+integer percent readings like the firmware sends) for healthy fields and for
+injected faults, then reports:
+
+  * detection rate and latency per fault type (from onset, or from the first
+    pump run for no_response), false alarms on healthy fields
+  * samples/second through FaultDetector.observe_many on a mixed fleet stream
+  * memory per tracked device
+
+    python benchmarks/bench_fault_detector.py --devices 20000 --hours 6
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fault_detector import FaultDetector
+
+SAMPLE_SECONDS = 60
+FAULT_AT_MINUTE = 120
+DRYING_PER_MIN = 0.04
+WETTING_PER_MIN = 0.6
+NOISE = 0.4
+
+
+def healthy_stream(rng: random.Random, minutes: int, fault: str = None):
+    """Yields (ts, moisture, pump_on). Pump cycles on below 40 %, off above 55 %."""
+    moisture, pump_on, frozen = rng.uniform(40, 60), False, None
+    rain_at = rng.randrange(minutes) if rng.random() < 0.3 else None
+    for minute in range(minutes):
+        faulty = fault is not None and minute >= FAULT_AT_MINUTE
+        if moisture < 40:
+            pump_on = True
+        elif moisture > 55:
+            pump_on = False
+        # Burst pipe / dry well: the pump runs but no water reaches the soil
+        delivered = pump_on and not (faulty and fault == "no_response")
+        moisture += WETTING_PER_MIN if delivered else -DRYING_PER_MIN
+        if rain_at is not None and rain_at <= minute < rain_at + 10:
+            moisture += 1.5  # a heavy shower: +15 % in 10 minutes is real
+        moisture = min(95.0, max(5.0, moisture))
+        reading = round(moisture + rng.gauss(0, NOISE))
+
+        if faulty:
+            if fault == "stuck_dry":
+                reading = 0
+            elif fault == "stuck_wet":
+                reading = 100
+            elif fault == "flatline":
+                frozen = reading if frozen is None else frozen
+                reading = frozen
+            elif fault == "spike" and minute == FAULT_AT_MINUTE:
+                reading = min(100, reading + 45)
+        yield minute * SAMPLE_SECONDS, float(reading), pump_on
+
+
+def run_scenarios(devices_per_scenario: int, minutes: int):
+    report = {}
+    for fault in (None, "stuck_dry", "stuck_wet", "flatline", "spike", "no_response"):
+        name = fault or "healthy"
+        detector = FaultDetector()
+        detected, eligible, latencies = 0, 0, []
+        for d in range(devices_per_scenario):
+            rng = random.Random(f"{name}-{d}")
+            device = f"{name}-{d}"
+            first_raise, onset = None, None
+            for ts, moisture, pump_on in healthy_stream(rng, minutes, fault):
+                if onset is None and ts >= FAULT_AT_MINUTE * SAMPLE_SECONDS:
+                    # A dead pump is only observable once it is asked to run
+                    if fault != "no_response" or pump_on:
+                        onset = ts
+                if detector.observe(device, ts, moisture, pump_on) and first_raise is None:
+                    first_raise = ts
+            if fault and onset is None:
+                continue
+            eligible += 1
+            if first_raise is not None:
+                detected += 1
+                latencies.append((first_raise - (onset or 0)) / 60)
+        entry = {"devices": eligible, "flagged": f"{detected / max(1, eligible):.1%}"}
+        if fault and latencies:
+            entry["median_latency_min"] = sorted(latencies)[len(latencies) // 2]
+        report[name] = entry
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--devices", type=int, default=20000)
+    parser.add_argument("--hours", type=float, default=6)
+    parser.add_argument("--scenario-devices", type=int, default=200)
+    args = parser.parse_args()
+    minutes = int(args.hours * 60)
+
+    scenarios = run_scenarios(args.scenario_devices, max(minutes, 12 * 60))
+
+    # Fleet stream, interleaved by timestamp as it would arrive at ingest (2% faulty)
+    faults = ["stuck_dry", "flatline", "spike", "no_response"]
+    streams = []
+    for d in range(args.devices):
+        rng = random.Random(d)
+        fault = faults[d % len(faults)] if d % 50 == 0 else None
+        streams.append((f"Field-{d:05d}", healthy_stream(rng, minutes, fault)))
+    rows = []
+    for _ in range(minutes):
+        for device, stream in streams:
+            ts, moisture, pump_on = next(stream)
+            rows.append((device, ts, moisture, pump_on))
+
+    # Memory pass (tracemalloc slows everything down), then the timed pass
+    detector = FaultDetector()
+    tracemalloc.start()
+    raised = detector.observe_many(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    detector = FaultDetector()
+    start = time.perf_counter()
+    detector.observe_many(rows)
+    seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        "scenarios": scenarios,
+        "ingest": {
+            "devices": args.devices,
+            "samples": len(rows),
+            "seconds": round(seconds, 3),
+            "samples_per_sec": round(len(rows) / seconds),
+            "us_per_sample": round(seconds / len(rows) * 1e6, 3),
+            "faults_raised": raised,
+            "bytes_per_device": round(peak / args.devices),
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Fleet overview: snapshot refresh, query latency and page render time.
+
+Loads a synthetic fleet into the ThingsBoard stand-in, then measures the
+shared snapshot refresh (concurrent attribute fetches), server-side
+filter/sort/page queries, how much of the table a page actually sends to
+the browser, and fleet_dashboard.py render time against a warm snapshot.
+
+    python benchmarks/bench_fleet_dashboard.py --fields 10000
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import requests
+
+from fleet_snapshot import FleetSource, load_inventory
+from payload_codec import REASON_OK, REASON_NEED, REASON_RAIN, REASON_DRY, REASON_STALE, REASON_FAULT, REASON_MANUAL
+from tb_standin import StandInServer
+
+ZONES = 40
+REASONS = [REASON_OK] * 8 + [REASON_NEED] * 4 + [REASON_RAIN] * 2 + [REASON_DRY, REASON_STALE, REASON_FAULT, REASON_MANUAL]
+
+
+def load_fleet(server: StandInServer, fields: int, directory: str) -> str:
+    """Pushes every device's attributes (one gateway call) and writes the inventory CSV."""
+    rng = random.Random(0)
+    now_ms = int(time.time() * 1000)
+    attributes = {}
+    for i in range(fields):
+        code = rng.choice(REASONS)
+        attributes[f"token-{i:05d}"] = {
+            "ai_reason_code": code,
+            "pump_decision": "PUMP_ON" if code in (REASON_NEED, REASON_DRY) else "PUMP_OFF",
+            "ai_moisture": round(rng.uniform(15, 85), 1),
+            "pump_state": "OFF",
+            "ai_weather_rain": rng.randrange(0, 100),
+            "last_decision_ts": now_ms - rng.randrange(0, 600000),
+            "liters_total": rng.randrange(0, 90000),
+            "water_today": rng.randrange(0, 30000),
+            "water_saved_today": rng.randrange(-10000, 90000),
+            "water_week": rng.randrange(0, 200000),
+            "water_saved_week": rng.randrange(0, 600000),
+            "config_crop_type": rng.choice(["Rice (Paddy)", "Wheat", "Sugarcane", "Cotton"]),
+        }
+    requests.post(f"{server.url}/api/v1/gateway/gateway/attributes", json=attributes, timeout=60).raise_for_status()
+    path = os.path.join(directory, "fleet.csv")
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "token", "zone"])
+        for i in range(fields):
+            writer.writerow([f"Field-{i:05d}", f"token-{i:05d}", f"Zone-{i % ZONES:02d}"])
+    return path
+
+
+def query_latencies(snapshot) -> dict:
+    queries = {
+        "default_page": dict(),
+        "last_page": dict(page=10 ** 9),
+        "alerts_by_moisture": dict(statuses=["FAULT", "STALE", "DRY"], sort_by="moisture"),
+        "zone_by_water": dict(zones=["Zone-07", "Zone-21"], sort_by="water_today", descending=True),
+        "name_search": dict(search="field-012"),
+    }
+    return {name: round(min(timeit.repeat(lambda: snapshot.query(**kwargs), number=20, repeat=3)) / 20 * 1e3, 2)
+            for name, kwargs in queries.items()}
+
+
+def render_times(inventory: str, server: StandInServer, runs: int) -> dict:
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return {"skipped": "streamlit not installed"}
+    os.environ.update({"TB_SERVER": server.url, "FLEET_DEVICES": inventory, "DASHBOARD_REFRESH_SECONDS": "0",
+                       "FLEET_REFRESH_SECONDS": "3600"})
+    script = os.path.join(HERE, "..", "fleet_dashboard.py")
+    timings, requests_before = [], None
+    for i in range(runs + 1):
+        app = AppTest.from_file(script, default_timeout=300)
+        start = time.perf_counter()
+        app.run()
+        if app.exception:
+            raise RuntimeError(f"fleet_dashboard.py raised: {app.exception[0].message}")
+        if i:  # the first run waits for the initial snapshot
+            timings.append(time.perf_counter() - start)
+        else:
+            requests_before = server.request_count
+    return {
+        "page_render_ms": round(statistics.median(timings) * 1e3, 1),
+        "max_ms": round(max(timings) * 1e3, 1),
+        # Warm renders read the shared snapshot; viewers add no ThingsBoard requests
+        "thingsboard_requests": server.request_count - requests_before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fields", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--renders", type=int, default=5)
+    args = parser.parse_args()
+
+    server = StandInServer().start()
+    with tempfile.TemporaryDirectory() as directory:
+        inventory = load_fleet(server, args.fields, directory)
+        source = FleetSource(server.url, load_inventory(inventory), workers=args.workers)
+        start = time.perf_counter()
+        snapshot = source.build()
+        refresh_seconds = time.perf_counter() - start
+
+        page = snapshot.query()["rows"]
+        page_bytes = len(page.to_json(orient="records"))
+        table_bytes = len(snapshot.table.to_json(orient="records"))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            renders = render_times(inventory, server, args.renders)
+    server.stop()
+
+    print(json.dumps({
+        "fields": args.fields,
+        "refresh": {"seconds": round(refresh_seconds, 2), "fields_per_sec": round(args.fields / refresh_seconds),
+                    "workers": args.workers},
+        "query_ms": query_latencies(snapshot),
+        "page_vs_table": {"rows": len(page), "page_json_bytes": page_bytes, "table_json_bytes": table_bytes},
+        "render": renders,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
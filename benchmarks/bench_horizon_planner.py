@@ -0,0 +1,156 @@
+"""
+Receding-horizon planner: solve time and water saved.
+
+Times one nightly 7-day solve for a large fleet, then simulates a season
+where every field is re-planned each day from a noisy forecast and compares
+water use, pump-hours and threshold breaches against the same-day rule
+(refill as soon as today's balance would pass the threshold). If scipy is
+installed, a sample of plans is checked against an LP solve of the same
+problem.
+
+    python benchmarks/bench_horizon_planner.py --fields 10000 --days 60
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from horizon_planner import (HorizonPlanner, plan_irrigation, expected_rain_mm, plannable_rain_mm,
+                             HORIZON_DAYS, MAX_IRRIGATION_MM_PER_DAY)
+from water_balance import FieldWaterBalance, SOIL_PROPERTIES, CROP_ROOTING
+
+PUMP_MM_PER_HOUR = MAX_IRRIGATION_MM_PER_DAY / 8.0  # capacity = 8 pump-hours a day
+FORECAST_NOISE_PER_DAY = 8.0  # % rain-probability error added per day of lead time
+
+
+def build_fleet(fields: int, rng) -> FieldWaterBalance:
+    soils, crops = list(SOIL_PROPERTIES), list(CROP_ROOTING)
+    model = FieldWaterBalance(capacity=fields)
+    for i in range(fields):
+        model.add_field(f"field-{i}", soils[i % len(soils)], crops[i % len(crops)],
+                        kc=float(rng.uniform(0.4, 1.25)), now=0.0)
+    model.depletion[:fields] = model.raw[:fields] * rng.uniform(0.0, 1.0, fields)
+    return model
+
+
+def season(days: int, rng) -> np.ndarray:
+    """Rain probability per day, in wet and dry spells."""
+    wet = np.convolve(rng.random(days + 6) < 0.3, np.ones(3), "same")[:days] > 0
+    return np.where(wet, rng.uniform(40, 95, days), rng.uniform(0, 25, days))
+
+
+def forecast_from(truth: np.ndarray, day: int, horizon: int, rng) -> np.ndarray:
+    window = truth[day:day + horizon]
+    window = np.pad(window, (0, horizon - len(window)), mode="edge")
+    noise = rng.normal(0, FORECAST_NOISE_PER_DAY * np.arange(horizon))
+    return np.clip(window + noise, 0, 100)
+
+
+def simulate(model: FieldWaterBalance, truth: np.ndarray, policy: str, seed: int):
+    rng = np.random.default_rng(seed)
+    n = model.size
+    depletion = model.depletion[:n].copy()
+    raw, taw, etc = model.raw[:n], model.taw[:n], model.etc[:n]
+    cap = np.full(n, MAX_IRRIGATION_MM_PER_DAY)
+    water = np.zeros(n)
+    events = np.zeros(n)
+    breaches = np.zeros(n)
+    solve_seconds = 0.0
+
+    for day in range(len(truth)):
+        forecast = forecast_from(truth, day, HORIZON_DAYS, rng)
+        if policy == "horizon":
+            start = time.perf_counter()
+            irrigation = plan_irrigation(depletion, raw, etc, plannable_rain_mm(forecast), cap)["irrigation"][:, 0]
+            solve_seconds += time.perf_counter() - start
+        else:
+            # Same-day rule: if today's balance crosses the threshold, refill to capacity
+            projected = depletion + etc - expected_rain_mm(forecast[0])
+            irrigation = np.where(projected > raw, np.minimum(cap, projected), 0.0)
+
+        # What actually fell: expected amount, but only on days it actually rains
+        rained = rng.random() < truth[day] / 100.0
+        actual_rain = expected_rain_mm(100.0) * rained * rng.uniform(0.5, 1.0)
+        depletion = np.clip(depletion + etc - actual_rain - irrigation, 0.0, taw)
+        water += irrigation
+        events += irrigation > 0
+        breaches += depletion > raw + 1e-6
+
+    return {
+        "water_mm_per_field": round(float(water.mean()), 2),
+        "pump_hours_per_field": round(float((water / PUMP_MM_PER_HOUR).mean()), 2),
+        "irrigation_events_per_field": round(float(events.mean()), 2),
+        "breach_days_per_field": round(float(breaches.mean()), 3),
+        "solve_ms_per_day": round(solve_seconds / len(truth) * 1e3, 3),
+    }
+
+
+def lp_check(samples: int, rng) -> dict:
+    try:
+        from scipy.optimize import linprog
+    except ImportError:
+        return {"skipped": "scipy not installed"}
+    h = HORIZON_DAYS
+    worst = 0.0
+    for _ in range(samples):
+        raw = rng.uniform(10, 80)
+        d0 = rng.uniform(0, raw)
+        etc = rng.uniform(2, 9, h)
+        rain = expected_rain_mm(rng.uniform(0, 100, h))
+        ours = plan_irrigation(np.array([d0]), np.array([raw]), etc[None, :], rain)["irrigation"][0]
+        # Variables: irrigation I (h), drainage loss L (h). D_k = d0 + sum(etc - rain - I + L)
+        lower = np.tril(np.ones((h, h)))
+        base = d0 + np.cumsum(etc - rain)
+        a_ub = np.vstack([np.hstack([-lower, lower]), np.hstack([lower, -lower])])
+        b_ub = np.concatenate([raw - base, base])
+        bounds = [(0, MAX_IRRIGATION_MM_PER_DAY)] * h + [(0, None)] * h
+        res = linprog(np.concatenate([np.ones(h), np.zeros(h)]), A_ub=a_ub, b_ub=b_ub, bounds=bounds)
+        if res.status == 0:
+            worst = max(worst, ours.sum() - res.x[:h].sum())
+    return {"samples": samples, "max_excess_mm_vs_lp": round(float(worst), 6)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fields", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=60)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    model = build_fleet(args.fields, rng)
+    truth = season(args.days, rng)
+
+    planner = HorizonPlanner(model)
+    forecast = forecast_from(truth, 0, HORIZON_DAYS, rng)
+    planner.solve(forecast)  # warm-up
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        planner.solve(forecast)
+        timings.append(time.perf_counter() - start)
+    nightly = min(timings)
+
+    horizon = simulate(model, truth, "horizon", seed=1)
+    same_day = simulate(model, truth, "same_day", seed=1)
+    saved = 1 - horizon["water_mm_per_field"] / max(same_day["water_mm_per_field"], 1e-9)
+
+    print(json.dumps({
+        "fields": args.fields,
+        "horizon_days": HORIZON_DAYS,
+        "nightly_solve_ms": round(nightly * 1e3, 3),
+        "us_per_field": round(nightly / args.fields * 1e6, 3),
+        "season_days": args.days,
+        "receding_horizon": horizon,
+        "same_day_rule": same_day,
+        "water_saved": f"{saved:.1%}",
+        "lp_optimality": lp_check(200, rng),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
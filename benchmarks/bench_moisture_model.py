@@ -0,0 +1,164 @@
+"""
+Online moisture model: update/inference throughput and forecast accuracy.
+
+Simulates a fleet (mixed soils, crop ET, pump cycles, rain spells) sampled
+every 15 minutes, trains a MoistureModel online from the stream, then times
+fleet-wide updates and 24h forecasts and compares forecast error with
+persistence (tomorrow = today) on fields whose pump stays off. Also checks
+that the agent feeds the model the same crop ET / rain inputs when it
+predicts as when it trains, and that the scalar and fleet forecasts agree.
+
+    python benchmarks/bench_moisture_model.py --fields 100000 --days 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import decision_core
+from moisture_model import MoistureModel, FEATURES, SOIL_CLASSES, MIN_SAMPLES
+
+SAMPLE_SECONDS = 900
+SENSOR_NOISE = 0.4  # % moisture
+
+# Ground-truth response per soil class: drying per mm of ET, wetting per pump
+# hour, wetting per mm of rain, and drainage above 70 %
+TRUTH = {
+    "Loam": (0.55, 6.0, 0.9, 0.08),
+    "Clay": (0.35, 4.0, 0.6, 0.03),
+    "Sandy": (0.9, 9.0, 1.4, 0.25),
+}
+
+
+class Fleet:
+    def __init__(self, fields: int, rng):
+        self.rng = rng
+        self.soil = rng.integers(0, len(SOIL_CLASSES), fields)
+        params = np.array([TRUTH[name] for name in SOIL_CLASSES])[self.soil]
+        # Per-field variation around the soil class
+        self.dry, self.wet, self.rain_gain, self.drain = (params * rng.uniform(0.8, 1.2, params.shape)).T
+        self.etc = rng.uniform(2.5, 8.0, fields)
+        self.moisture = rng.uniform(35, 75, fields)
+        self.pump = np.zeros(fields, dtype=bool)
+        self.rain_mm_day = np.zeros(fields)
+
+    def step(self, hours: float, control: bool = True):
+        if control:
+            self.pump = np.where(self.moisture < 35, True, np.where(self.moisture > 60, False, self.pump))
+        rate = (-self.dry * self.etc / 24.0 * (0.4 + self.moisture / 100.0)
+                + self.wet * self.pump
+                + self.rain_gain * self.rain_mm_day / 24.0
+                - self.drain * np.maximum(0.0, self.moisture - 70.0))
+        self.moisture = np.clip(self.moisture + rate * hours, 0.0, 100.0)
+
+    def new_day(self):
+        raining = self.rng.random(len(SOIL_CLASSES)) < 0.3  # rain per region (~soil class here)
+        self.rain_mm_day = np.where(raining[self.soil], self.rng.uniform(5, 20, self.soil.size), 0.0)
+
+    def sensor(self):
+        return np.clip(self.moisture + self.rng.normal(0, SENSOR_NOISE, self.moisture.size), 0, 100)
+
+
+def check_agent_inputs():
+    """The agent must predict with the inputs it trains on (same ETc / rain for the same weather)."""
+    calls = {}
+
+    class Recorder(MoistureModel):
+        def observe(self, idx, moisture, now, pump_on=False, etc=0.0, rain=0.0):
+            calls["train"] = (etc, rain)
+            super().observe(idx, moisture, now, pump_on, etc, rain)
+
+        def predict(self, idx, moisture, pump_on=False, etc=0.0, rain=0.0, hours=24.0):
+            calls["predict"] = (etc, rain)
+            return super().predict(idx, moisture, pump_on, etc, rain, hours)
+
+    agent = decision_core.SmartIrrigationAgent(access_token="check", device_name="check",
+                                               moisture_model=Recorder())
+    hot = {"temperature": 38.0, "humidity": 30, "rain_probability": 40, "rain_forecast_24h": 0.0}
+    agent.get_weather_forecast = lambda: hot
+    agent.analyze_and_decide(50.0)    # sets the conditions from this weather
+    agent.update_water_balance(48.0)  # trains on them
+    agent.analyze_and_decide(48.0)    # predicts with them
+    assert calls["train"] == calls["predict"], calls
+    return calls["predict"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fields", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    fleet = Fleet(args.fields, rng)
+    model = MoistureModel(capacity=args.fields)
+    for i in range(args.fields):
+        model.add_field(f"field-{i}", SOIL_CLASSES[fleet.soil[i]])
+    everyone = np.arange(args.fields)
+
+    # --- Online training over the simulated stream ---
+    now, update_seconds, updates = 0.0, 0.0, 0
+    steps_per_day = 86400 // SAMPLE_SECONDS
+    for step in range(args.days * steps_per_day):
+        if step % steps_per_day == 0:
+            fleet.new_day()
+        fleet.step(SAMPLE_SECONDS / 3600.0)
+        now += SAMPLE_SECONDS
+        start = time.perf_counter()
+        model.observe_all(everyone, fleet.sensor(), now, fleet.pump.astype(float), fleet.etc, fleet.rain_mm_day)
+        update_seconds += time.perf_counter() - start
+        updates += 1
+    per_update = update_seconds / updates
+
+    # --- 24h forecast accuracy vs persistence (pump held off) ---
+    observed = fleet.sensor()
+    fleet.pump[:] = False
+    predict = lambda: model.predict_all(everyone, observed, np.zeros(args.fields), fleet.etc, fleet.rain_mm_day)
+    forecast = predict()
+    for _ in range(24 * 4):
+        fleet.step(0.25, control=False)
+    actual = fleet.moisture
+    model_mae = float(np.abs(forecast - actual).mean())
+    persistence_mae = float(np.abs(observed - actual).mean())
+
+    # --- Throughput ---
+    predict_seconds = min(timeit.repeat(predict, number=1, repeat=5))
+    single_observe = min(timeit.repeat(
+        lambda: model.observe(7, 50.0, now, False, 5.0, 0.0), number=2000, repeat=3)) / 2000
+    single_predict = min(timeit.repeat(
+        lambda: model.predict(7, 50.0, False, 5.0, 0.0), number=2000, repeat=3)) / 2000
+
+    # --- Consistency: scalar forecast == fleet forecast; agent train / predict inputs match ---
+    trained = np.flatnonzero(model.samples[:args.fields] >= MIN_SAMPLES)[:100]
+    scalar = [model.predict(i, observed[i], False, fleet.etc[i], fleet.rain_mm_day[i]) for i in trained]
+    assert np.allclose(scalar, forecast[trained]), "scalar and fleet forecasts disagree"
+    agent_etc, agent_rain = check_agent_inputs()
+
+    state_bytes = sum(getattr(model, name).nbytes for name in MoistureModel.COLUMNS)
+    state_bytes += model.weights.nbytes + model.anchor_x.nbytes
+
+    print(json.dumps({
+        "fields": args.fields,
+        "features": len(FEATURES),
+        "trained_fields": int((model.samples[:args.fields] >= MIN_SAMPLES).sum()),
+        "update": {"ms_per_fleet_update": round(per_update * 1e3, 2),
+                   "ns_per_field": round(per_update / args.fields * 1e9, 1),
+                   "fields_per_sec": round(args.fields / per_update)},
+        "predict_24h": {"ms_per_fleet": round(predict_seconds * 1e3, 2),
+                        "ns_per_field": round(predict_seconds / args.fields * 1e9, 1),
+                        "fields_per_sec": round(args.fields / predict_seconds)},
+        "single_field_us": {"observe": round(single_observe * 1e6, 2), "predict": round(single_predict * 1e6, 2)},
+        "bytes_per_field": round(state_bytes / model.capacity),
+        "mae_24h": {"model": round(model_mae, 2), "persistence": round(persistence_mae, 2)},
+        "agent_inputs": {"etc_mm_day": round(agent_etc, 2), "rain_mm": round(agent_rain, 2)},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
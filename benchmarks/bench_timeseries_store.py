@@ -0,0 +1,90 @@
+"""
+Time-series rollup store: ingest throughput, chart query latency, file size.
+
+Loads a season of per-minute moisture / pump samples for a set of fields
+into a TimeSeriesStore (SQLite file in a temp dir), then times the chart
+queries a dashboard makes (6 h ... full season, picked resolution) from a
+separate read-only connection, and compares rows read with the raw
+2-second telemetry those charts would otherwise need.
+
+    python benchmarks/bench_timeseries_store.py --fields 20 --days 180
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from timeseries_store import TimeSeriesStore, MOISTURE, PUMP_ON
+
+SAMPLE_SECONDS = 60
+TELEMETRY_SECONDS = 2  # what the device sends; charts from raw telemetry would read this
+RANGES = {"6h": 6 * 3600, "24h": 86400, "7d": 7 * 86400, "30d": 30 * 86400}
+
+
+def samples(fields: int, days: int, start: float):
+    """Time-ordered (series, ts, values): daily drying cycle plus pump runs."""
+    for step in range(days * 86400 // SAMPLE_SECONDS):
+        ts = start + step * SAMPLE_SECONDS
+        hour = (ts % 86400) / 3600
+        for f in range(fields):
+            moisture = 50 + 12 * math.sin((step + f * 97) / 700.0) - 3 * math.sin(hour / 24 * 2 * math.pi)
+            yield f"Field-{f:03d}", ts, {MOISTURE: round(moisture, 1), PUMP_ON: moisture < 42}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fields", type=int, default=20)
+    parser.add_argument("--days", type=int, default=180)
+    args = parser.parse_args()
+
+    now = time.time()
+    start = now - args.days * 86400
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "timeseries.sqlite")
+        writer = TimeSeriesStore(path)
+        begin = time.perf_counter()
+        writer.record_many(samples(args.fields, args.days, start))
+        writer.flush()
+        ingest_seconds = time.perf_counter() - begin
+        count = writer.samples
+
+        reader = TimeSeriesStore.open_readonly(path)
+        queries = dict(RANGES, season=args.days * 86400)
+        field = f"Field-{args.fields // 2:03d}"
+        report = {}
+        for name, span in queries.items():
+            run = lambda: reader.query(field, MOISTURE, now - span, now)
+            result = run()
+            seconds = min(timeit.repeat(run, number=20, repeat=3)) / 20
+            report[name] = {
+                "resolution": result["resolution"],
+                "points": len(result["ts"]),
+                "raw_telemetry_points": span // TELEMETRY_SECONDS,
+                "ms": round(seconds * 1e3, 3),
+            }
+        writer.close()
+        reader.close()
+        file_bytes = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+
+    print(json.dumps({
+        "fields": args.fields,
+        "days": args.days,
+        "ingest": {
+            "samples": count,
+            "seconds": round(ingest_seconds, 2),
+            "samples_per_sec": round(count / ingest_seconds),
+            "flushes": writer.flushes,
+        },
+        "query": report,
+        "file_bytes_per_field": round(file_bytes / args.fields),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Time-to-first-decision for a fleet, cold start vs warm restart from a checkpoint.
+
+Cold: every agent fetches its attributes from the local ThingsBoard
+stand-in before it can decide. Warm: the fleet is rebuilt from a checkpoint
+and decides from restored state immediately (flagged stale), with zero
+upstream requests at boot.
+
+    python benchmarks/bench_warm_restart.py --devices 10000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import decision_core
+from checkpoint import save_checkpoint, load_checkpoint
+from water_accounting import WaterLedger
+from water_balance import FieldWaterBalance
+from tb_standin import StandInServer
+
+CROPS = ["Rice (Paddy)", "Wheat", "Sugarcane", "Cotton"]
+SOILS = ["Loam (Balanced)", "Clay (Retains Water)", "Sandy (Drains Fast)"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--devices", type=int, default=10000)
+    args = parser.parse_args()
+
+    server = StandInServer().start()
+    decision_core.THINGSBOARD_SERVER = server.url
+    for i in range(args.devices):
+        server.devices[f"dev-{i}"] = {
+            "current_moisture": 25 + i % 70, "config_crop_type": CROPS[i % 4],
+            "config_soil_type": SOILS[i % 3], "config_field_size": 0.5 + i % 10,
+        }
+    path = os.path.join(tempfile.mkdtemp(), "checkpoint.json.gz")
+
+    # --- Cold start ---
+    requests_before = server.request_count
+    start = time.perf_counter()
+    water_balance = FieldWaterBalance(capacity=args.devices)
+    water_ledger = WaterLedger(capacity=args.devices)
+    agents = [decision_core.SmartIrrigationAgent(access_token=f"dev-{i}", device_name=f"Field-{i}",
+                                                 water_balance=water_balance, water_ledger=water_ledger)
+              for i in range(args.devices)]
+    first_decision = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for agent in agents:
+            agent.run_cycle()
+            first_decision.append(time.perf_counter() - start)
+    cold = {
+        "all_decided_s": round(first_decision[-1], 3),
+        "median_first_decision_s": round(statistics.median(first_decision), 3),
+        "boot_upstream_requests": server.request_count - requests_before,
+    }
+
+    save_start = time.perf_counter()
+    save_checkpoint(path, agents)
+    save_seconds = time.perf_counter() - save_start
+
+    # --- Warm restart ---
+    requests_before = server.request_count
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        restored = load_checkpoint(path)
+        loaded = time.perf_counter() - start
+        first_decision = []
+        for agent in restored:
+            decision = agent.resume_from_cache()  # what decision_core.py does on a warm start
+            assert decision is not None and decision["data_stale"]
+            first_decision.append(time.perf_counter() - start)
+    warm = {
+        "load_s": round(loaded, 3),
+        "all_decided_s": round(first_decision[-1], 3),
+        "median_first_decision_s": round(statistics.median(first_decision), 3),
+        "boot_upstream_requests": server.request_count - requests_before,
+    }
+    server.stop()
+
+    assert [a.export_state()["config"] for a in restored] == [a.export_state()["config"] for a in agents]
+    print(json.dumps({
+        "devices": args.devices,
+        "checkpoint_bytes": os.path.getsize(path),
+        "checkpoint_save_s": round(save_seconds, 3),
+        "cold_start": cold,
+        "warm_restart": warm,
+        "speedup": round(cold["all_decided_s"] / warm["all_decided_s"], 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Water ledger: event ingest throughput and dashboard query latency.
+
+Registers a fleet of fields across zones, replays a full season of pump
+cycles (a pump_state sample every poll while a cycle runs, plus the on/off
+edges), then times the queries a dashboard makes: one field's / zone's /
+the fleet's totals, a field's daily series, and the whole-fleet table.
+
+    python benchmarks/bench_water_accounting.py --fields 10000 --days 120
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from water_accounting import WaterLedger, FIELD, ZONE, FLEET, DAY, WEEK, SEASON, DAY_SECONDS
+
+ZONES = 50
+SEASON_START = 1_750_000_000 - 1_750_000_000 % DAY_SECONDS
+POLL_SECONDS = 300  # repeated ON samples while a cycle runs
+
+
+def season_events(fields: int, days: int, seed: int = 0):
+    """Time-ordered (field, ts, on, manual) samples: 0-2 cycles per field per day."""
+    rng = random.Random(seed)
+    for day in range(days):
+        events = []
+        for i in range(fields):
+            for _ in range(rng.choice((0, 0, 1, 1, 2))):
+                start = SEASON_START + day * DAY_SECONDS + rng.randrange(DAY_SECONDS)
+                minutes = rng.randrange(5, 45)
+                manual = rng.random() < 0.05
+                name = f"Field-{i:05d}"
+                for ts in range(start, start + minutes * 60, POLL_SECONDS):
+                    events.append((ts, name, True, manual))
+                events.append((start + minutes * 60, name, False, manual))
+        events.sort()
+        yield from events
+
+
+def build(fields: int, days: int, events):
+    ledger = WaterLedger(capacity=fields)
+    for i in range(fields):
+        ledger.register_field(f"Field-{i:05d}", zone=f"Zone-{i % ZONES:02d}",
+                              area_ha=0.5 + (i % 7) * 0.5, kc=0.7 + (i % 4) * 0.15, now=SEASON_START)
+    start = time.perf_counter()
+    pump_state = ledger.pump_state
+    for ts, name, on, manual in events:
+        pump_state(name, ts, on, manual)
+    return ledger, time.perf_counter() - start
+
+
+def query_us(fn, number=200):
+    return round(min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e6, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fields", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=120)
+    args = parser.parse_args()
+
+    events = list(season_events(args.fields, args.days))
+    ledger, ingest_seconds = build(args.fields, args.days, events)
+    now = SEASON_START + args.days * DAY_SECONDS - 3600
+
+    # Memory of the ledger itself (tracemalloc slows ingest, so a separate run)
+    tracemalloc.start()
+    small, _ = build(args.fields, 1, events[:1])
+    ledger_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del small
+
+    # Season totals must add up across levels
+    fleet = ledger.totals(FLEET, FLEET, SEASON, now)
+    table = ledger.field_table(SEASON, now)
+    assert abs(table["delivered"].sum() - fleet["delivered"]) < 1e-6 * max(1.0, fleet["delivered"])
+    assert abs(table["fixed"].sum() - fleet["fixed"]) < 1e-6 * max(1.0, fleet["fixed"])
+
+    print(json.dumps({
+        "fields": args.fields,
+        "days": args.days,
+        "ingest": {
+            "events": len(events),
+            "seconds": round(ingest_seconds, 3),
+            "events_per_sec": round(len(events) / ingest_seconds),
+            "us_per_event": round(ingest_seconds / len(events) * 1e6, 3),
+        },
+        "query_us": {
+            "field_today": query_us(lambda: ledger.totals(FIELD, "Field-00042", DAY, now)),
+            "field_week": query_us(lambda: ledger.totals(FIELD, "Field-00042", WEEK, now)),
+            "zone_season": query_us(lambda: ledger.totals(ZONE, "Zone-07", SEASON, now)),
+            "fleet_today": query_us(lambda: ledger.totals(FLEET, FLEET, DAY, now)),
+            "field_series_30d": query_us(lambda: ledger.series(FIELD, "Field-00042", 30, now), number=20),
+            "fleet_table_today": query_us(lambda: ledger.field_table(DAY, now), number=10),
+        },
+        "bytes_per_field": round(ledger_bytes / args.fields),
+        "season_fleet_liters": {k: round(v) for k, v in fleet.items()},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Water-balance update cost per field per tick.
+
+Builds a FieldWaterBalance for a large fleet (mixed soils and crops) and
+times the vectorized fleet tick (ET + drainage), a fleet-wide moisture
+assimilation, a rain event over a fraction of fields, the time-to-threshold
+query, and the single-field incremental path used by one agent.
+
+    python benchmarks/bench_water_balance.py --fields 100000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from water_balance import FieldWaterBalance, SOIL_PROPERTIES, CROP_ROOTING
+
+
+def per_field_ns(fn, fields, repeat=5):
+    seconds = min(timeit.repeat(fn, number=1, repeat=repeat))
+    return {"ms_per_tick": round(seconds * 1e3, 3), "ns_per_field": round(seconds / fields * 1e9, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fields", type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    soils, crops = list(SOIL_PROPERTIES), list(CROP_ROOTING)
+    now = time.time()
+
+    build_start = time.perf_counter()
+    model = FieldWaterBalance(capacity=args.fields)
+    for i in range(args.fields):
+        model.add_field(f"Field-{i}", soils[i % len(soils)], crops[i % len(crops)], kc=1.0, now=now)
+    build_seconds = time.perf_counter() - build_start
+
+    everyone = np.arange(args.fields)
+    raining = rng.choice(args.fields, size=args.fields // 10, replace=False)
+    moisture = rng.uniform(20, 90, size=args.fields)
+    clock = [now]
+
+    def tick():
+        clock[0] += 3600
+        model.advance_all(clock[0])
+
+    def assimilate():
+        clock[0] += 3600
+        model.assimilate_all(everyone, moisture, clock[0])
+
+    def rain():
+        clock[0] += 3600
+        model.add_water_all(raining, np.full(raining.size, 12.0), clock[0])
+
+    single = min(timeit.repeat(lambda: model.assimilate(7, 55.0, clock[0] + 60), number=1000, repeat=3)) / 1000
+
+    results = {
+        "fields": args.fields,
+        "build_seconds": round(build_seconds, 3),
+        "advance_all": per_field_ns(tick, args.fields),
+        "assimilate_all": per_field_ns(assimilate, args.fields),
+        "rain_event_10pct": per_field_ns(rain, args.fields),
+        "hours_to_threshold_all": per_field_ns(model.hours_to_threshold_all, args.fields),
+        "single_field_assimilate_us": round(single * 1e6, 2),
+    }
+
+    hours = model.hours_to_threshold_all()
+    assert np.all(hours >= 0) and np.all(model.depletion[:args.fields] <= model.taw[:args.fields] + 1e-9)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
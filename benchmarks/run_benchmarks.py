@@ -0,0 +1,474 @@
+"""
+Benchmark suite for the engine, agent loop and dashboards.
+
+Runs every case, writes JSON results and compares them with the stored
+baseline; exits non-zero if any metric regressed beyond the threshold.
+
+    python benchmarks/run_benchmarks.py                    # run + compare
+    python benchmarks/run_benchmarks.py --update-baseline  # accept current numbers
+    python benchmarks/run_benchmarks.py --only engine      # cases whose name contains "engine"
+
+Metric naming decides the comparison direction: names ending in `_us`,
+`_ms` or `_s` are timings (lower is better), names ending in `_per_sec` are
+throughputs (higher is better). Other metrics are informational.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+import decision_core
+import profiling
+from actuation_tracker import ActuationTracker
+from fault_detector import FaultDetector
+from horizon_planner import HorizonPlanner
+from moisture_model import MoistureModel, SOIL_CLASSES
+from irrigation_engine import generate_daily_plan, generate_weekly_impact, CROP_COEFFICIENTS, MOCK_WEATHER_DATA
+from water_balance import FieldWaterBalance
+from water_accounting import WaterLedger, FIELD, DAY, DAY_SECONDS
+from timeseries_store import TimeSeriesStore, MOISTURE, PUMP_ON
+from tb_standin import StandInServer
+
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(HERE, "results.json")
+DEFAULT_THRESHOLD = 0.25  # 25% slower (or lower throughput) counts as a regression
+
+CASES: Dict[str, Callable[[float], Dict[str, Any]]] = {}
+
+
+def case(name: str):
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+def best_of(fn: Callable[[], Any], number: int, repeat: int = 5) -> float:
+    """Best per-call seconds over `repeat` runs of `number` calls."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+    return min(timings)
+
+
+def field_configs(count: int):
+    crops = list(CROP_COEFFICIENTS)
+    stages = ["Vegetative", "Reproductive", "Ripening"]
+    for i in range(count):
+        yield {
+            "soil_correction": (i * 7) % 70 - 30,
+            "rain_correction": (i * 13) % 100 - 80,
+            "crop_type": crops[i % len(crops)],
+            "growth_stage": stages[i % len(stages)],
+            "field_size": 0.5 + (i % 20) * 0.25,
+        }
+
+
+# --- Engine ---
+@case("engine.daily_plan")
+def bench_daily_plan(scale: float):
+    configs = list(field_configs(64))
+    it = iter(configs * 10_000)
+    return {"per_call_us": best_of(lambda: generate_daily_plan(**next(it)), int(2000 * scale)) * 1e6}
+
+
+@case("engine.weekly_impact_fleet")
+def bench_weekly_impact(scale: float):
+    fields = int(10_000 * scale)
+    configs = list(field_configs(fields))
+
+    def run():
+        for config in configs:
+            generate_weekly_impact(**config)
+
+    seconds = best_of(run, 1, repeat=3)
+    return {"fields": fields, "fleet_s": seconds, "fields_per_sec": fields / seconds}
+
+
+@case("engine.horizon_plan_fleet")
+def bench_horizon_plan(scale: float):
+    fields = int(10_000 * scale)
+    model = FieldWaterBalance(capacity=fields)
+    for i, config in enumerate(field_configs(fields)):
+        kc = CROP_COEFFICIENTS[config["crop_type"]][config["growth_stage"]]
+        model.add_field(f"field-{i}", crop_type=config["crop_type"], kc=kc, now=0.0)
+        model.depletion[i] = model.raw[i] * (i % 10) / 10.0
+    planner = HorizonPlanner(model)
+    forecast = [day["rain_probability"] for day in MOCK_WEATHER_DATA]
+    return {"fields": fields, "nightly_solve_ms": best_of(lambda: planner.solve(forecast), 20) * 1e3}
+
+
+@case("engine.moisture_model_fleet")
+def bench_moisture_model(scale: float):
+    fields = int(100_000 * scale)
+    model = MoistureModel(capacity=fields)
+    for i in range(fields):
+        model.add_field(f"field-{i}", SOIL_CLASSES[i % len(SOIL_CLASSES)])
+    everyone = np.arange(fields)
+    moisture = 30 + everyone % 60.0
+    pump, etc, rain = (everyone % 5 == 0).astype(float), np.full(fields, 6.5), np.zeros(fields)
+    clock = [0.0]
+
+    def update():
+        clock[0] += 3600  # every call trains every field
+        model.observe_all(everyone, moisture, clock[0], pump, etc, rain)
+
+    update()
+    update_s = best_of(update, 1)
+    predict_s = best_of(lambda: model.predict_all(everyone, moisture, pump, etc, rain), 1)
+    return {"fields": fields, "update_fields_per_sec": fields / update_s,
+            "predict_fields_per_sec": fields / predict_s}
+
+
+# --- Agent ---
+@case("agent.analyze_and_decide")
+def bench_decide(scale: float):
+    agent = decision_core.SmartIrrigationAgent(access_token="bench-decide")
+    moistures = [20 + (i * 3) % 75 for i in range(256)]
+    it = iter(moistures * 10_000)
+    with contextlib.redirect_stdout(io.StringIO()):
+        per_call = best_of(lambda: agent.analyze_and_decide(next(it)), int(5000 * scale))
+    return {"per_decision_us": per_call * 1e6}
+
+
+@case("agent.fleet_cycle_http")
+def bench_fleet_cycle(scale: float):
+    devices = max(1, int(200 * scale))
+    server = StandInServer().start()
+    saved = decision_core.THINGSBOARD_SERVER
+    decision_core.THINGSBOARD_SERVER = server.url
+    try:
+        agents = []
+        for i in range(devices):
+            token = f"bench-fleet-{i}"
+            server.devices[token] = {"current_moisture": 25 + i % 70, "config_crop_type": "Wheat"}
+            agents.append(decision_core.SmartIrrigationAgent(access_token=token))
+        cycle_times = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(3):
+                start = time.perf_counter()
+                for agent in agents:
+                    agent.run_cycle()
+                cycle_times.append(time.perf_counter() - start)
+        best = min(cycle_times)
+        return {"devices": devices, "fleet_cycle_s": best, "decisions_per_sec": devices / best,
+                "upstream_requests": server.request_count}
+    finally:
+        decision_core.THINGSBOARD_SERVER = saved
+        server.stop()
+
+
+@case("agent.config_hot_path")
+def bench_config_hot_path(scale: float):
+    from bench_config_snapshots import run_agents, run_legacy, seed
+    fields = max(1, int(100 * scale))
+    server = StandInServer().start()
+    saved = decision_core.THINGSBOARD_SERVER
+    decision_core.THINGSBOARD_SERVER = server.url
+    try:
+        seed(server, fields)
+        legacy = run_legacy(server, fields, 5)
+        versioned = run_agents(server, fields, 5, 1)
+        return {"bytes_per_field_cycle": versioned["bytes"], "previous_bytes_per_field_cycle": legacy["bytes"],
+                "requests_per_field_cycle": versioned["requests"], "config_reloads": versioned["config_reloads"]}
+    finally:
+        decision_core.THINGSBOARD_SERVER = saved
+        server.stop()
+
+@case("agent.actuation_tracking")
+def bench_actuation_tracking(scale: float):
+    devices = max(1, int(1000 * scale))
+    tracker = ActuationTracker()
+    names = [f"Field-{i:05d}" for i in range(devices)]
+    state = {"ts": 1_000_000}
+
+    def cycle():
+        # Every device: a decision is pushed, then its ack and pump state come back
+        state["ts"] += 2000
+        ts, now = state["ts"], state["ts"] / 1000.0
+        on = (ts // 2000) % 3 == 0
+        for name in names:
+            tracker.pushed(name, ts, on, now)
+        for name in names:
+            tracker.observe(name, ts, "ON" if on else "OFF", now + 1.2)
+
+    per_cycle = best_of(cycle, 5)
+    return {"devices": devices, "per_decision_us": per_cycle / devices * 1e6,
+            "fleet_report_ms": best_of(tracker.report, 5) * 1e3, "ack_p50_ms": tracker.report()["ack"]["p50_ms"]}
+
+@case("agent.profiling_hooks_idle")
+def bench_profiling_idle(scale: float):
+    def hooks():
+        # What run_cycle pays per cycle while no profile is running
+        profiling.check()
+        profiling.set_stage("fetch")
+        profiling.set_stage("weather")
+        profiling.set_stage("decide")
+        profiling.set_stage("push")
+        profiling.set_stage(None)
+
+    return {"per_cycle_us": best_of(hooks, int(100_000 * scale)) * 1e6}
+
+
+@case("agent.fault_detector_ingest")
+def bench_fault_detector(scale: float):
+    devices, minutes = max(1, int(2000 * scale)), 60
+    rows = [(f"Field-{d}", m * 60.0, float(40 + (d + m // 7) % 20), m % 30 < 10)
+            for m in range(minutes) for d in range(devices)]
+
+    def ingest():
+        FaultDetector().observe_many(rows)
+
+    seconds = best_of(ingest, 1, repeat=3)
+    return {"samples": len(rows), "samples_per_sec": len(rows) / seconds}
+
+
+@case("agent.water_ledger")
+def bench_water_ledger(scale: float):
+    fields = max(1, int(10000 * scale))
+    start = 1_750_000_000 - 1_750_000_000 % DAY_SECONDS
+    ledger = WaterLedger(capacity=fields)
+    names = [f"Field-{i}" for i in range(fields)]
+    for i, name in enumerate(names):
+        ledger.register_field(name, zone=f"Zone-{i % 50}", area_ha=1.5, kc=1.1, now=start)
+    # Two days of 20-minute cycles sampled every 5 minutes
+    events = [(start + day * DAY_SECONDS + i % 3600 + minute * 60, name, minute < 20)
+              for day in range(2) for minute in range(0, 25, 5) for i, name in enumerate(names)]
+    events.sort()
+
+    begin = time.perf_counter()
+    for ts, name, on in events:
+        ledger.pump_state(name, ts, on)
+    ingest = time.perf_counter() - begin
+    now = start + 2 * DAY_SECONDS - 3600
+    return {
+        "fields": fields,
+        "events_per_sec": len(events) / ingest,
+        "field_today_us": best_of(lambda: ledger.totals(FIELD, "Field-0", DAY, now), 2000) * 1e6,
+        "fleet_table_ms": best_of(lambda: ledger.field_table(DAY, now), 5) * 1e3,
+    }
+
+
+@case("dashboard.history_query")
+def bench_history_query(scale: float):
+    import tempfile
+    days = max(1, int(180 * scale))
+    now = time.time()
+    with tempfile.TemporaryDirectory() as directory:
+        store = TimeSeriesStore(os.path.join(directory, "timeseries.sqlite"))
+        start = time.perf_counter()
+        for minute in range(days * 1440):
+            moisture = 50.0 + (minute % 700) / 50.0
+            store.record("Field-1", now - (days * 1440 - minute) * 60, {MOISTURE: moisture, PUMP_ON: moisture < 52})
+        store.flush()
+        ingest = time.perf_counter() - start
+        reader = TimeSeriesStore.open_readonly(store.path)
+        result = {
+            "samples_per_sec": days * 1440 / ingest,
+            "day_chart_ms": best_of(lambda: reader.query("Field-1", MOISTURE, now - 86400, now), 50) * 1e3,
+            "season_chart_ms": best_of(lambda: reader.query("Field-1", MOISTURE, now - days * 86400, now), 50) * 1e3,
+        }
+        store.close()
+        reader.close()
+    return result
+
+
+# --- Dashboards ---
+def run_streamlit(script: str, runs: int, env: Dict[str, str]) -> Dict[str, Any]:
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return {"skipped": "streamlit not installed"}
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        timings = []
+        for _ in range(runs):
+            app = AppTest.from_file(os.path.join(ROOT, script), default_timeout=60)
+            start = time.perf_counter()
+            app.run()
+            timings.append(time.perf_counter() - start)
+            if app.exception:
+                raise RuntimeError(f"{script} raised: {app.exception[0].message}")
+        return {"script_run_ms": statistics.median(timings) * 1e3}
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+@case("dashboard.app")
+def bench_app(scale: float):
+    return run_streamlit("app.py", max(3, int(5 * scale)), {})
+
+
+@case("dashboard.iot_dashboard")
+def bench_iot_dashboard(scale: float):
+    server = StandInServer().start()
+    server.devices["bench-dashboard"] = {
+        "current_moisture": 48, "pump_decision": "PUMP_ON", "pump_state": "ON",
+        "ai_reason_code": "NEED", "ai_moisture": 48.0, "last_decision_ts": 1_700_000_000_000,
+        "ai_weather_temp": 29.5, "ai_weather_rain": 10, "liters_total": 52000, "liters_per_ha": 34666,
+    }
+    try:
+        return run_streamlit("iot_dashboard.py", max(3, int(5 * scale)), {
+            "TB_SERVER": server.url, "TB_TOKEN": "bench-dashboard", "DASHBOARD_REFRESH_SECONDS": "0",
+        })
+    finally:
+        server.stop()
+
+
+@case("dashboard.fleet_dashboard")
+def bench_fleet_dashboard(scale: float):
+    import tempfile
+    from bench_fleet_dashboard import load_fleet
+    fields = max(1, int(10000 * scale))
+    server = StandInServer().start()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            env = {"TB_SERVER": server.url, "FLEET_DEVICES": load_fleet(server, fields, directory),
+                   "DASHBOARD_REFRESH_SECONDS": "0", "FLEET_REFRESH_SECONDS": "3600"}
+            with contextlib.redirect_stdout(io.StringIO()):
+                run_streamlit("fleet_dashboard.py", 1, env)  # initial snapshot load (shared cache)
+                result = run_streamlit("fleet_dashboard.py", max(3, int(5 * scale)), env)
+            return dict(result, fields=fields)
+    finally:
+        server.stop()
+
+
+@case("provision.bulk_fields")
+def bench_bulk_provision(scale: float):
+    import tempfile
+    from bench_bulk_provision import DEFAULT_DASHBOARD, load_fields, provision, write_inventory
+    fields = max(1, int(500 * scale))
+    server = StandInServer().start()
+    server.latency_seconds = 0.01
+    try:
+        with open(DEFAULT_DASHBOARD) as f:
+            template = json.load(f)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "fields.csv")
+            write_inventory(path, fields)
+            first, _ = provision(server, load_fields(path), template, 16, 0)
+            rerun, _ = provision(server, load_fields(path), template, 16, 0)
+        return {"fields": fields, "fields_per_sec": first["fields_per_sec"],
+                "rerun_fields_per_sec": rerun["fields_per_sec"],
+                "requests_per_field": first["requests"] / fields, "rerun_created": rerun["devices_created"]}
+    finally:
+        server.stop()
+
+
+@case("export.columnar")
+def bench_columnar_export(scale: float):
+    import argparse
+    import tempfile
+    from bench_columnar_export import export_columnar, export_csv, read_back
+    args = argparse.Namespace(rows=max(10000, int(500_000 * scale)), chunk=262_144, fields=5000)
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "decisions.csv")
+        parquet = export_columnar(os.path.join(directory, "parquet"), "parquet", args)
+        arrow = export_columnar(os.path.join(directory, "arrow"), "arrow", args)
+        csv = export_csv(csv_path, args)
+        read = read_back(os.path.join(directory, "parquet"), "parquet", csv_path, args)
+    return {"rows": args.rows, "parquet_rows_per_sec": parquet["rows_per_sec"],
+            "arrow_rows_per_sec": arrow["rows_per_sec"], "csv_rows_per_sec": csv["rows_per_sec"],
+            "parquet_size_vs_csv": round(parquet["bytes"] / csv["bytes"], 3),
+            "day_region_read_ms": read["day_region_ms"], "liters_scan_ms": read["liters_column_scan_ms"]}
+
+# --- Baseline Comparison ---
+def direction(metric: str) -> int:
+    """+1 if higher is better, -1 if lower is better, 0 if not compared."""
+    if metric.endswith("_per_sec"):
+        return 1
+    if metric.endswith(("_us", "_ms", "_s")):
+        return -1
+    return 0
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float):
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            sign = direction(metric)
+            base = baseline.get(name, {}).get(metric)
+            if not sign or not isinstance(base, (int, float)) or base <= 0:
+                continue
+            change = (value - base) / base * sign  # negative = worse
+            if change < -threshold:
+                regressions.append(f"{name}.{metric}: {base:.4g} -> {value:.4g} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--only", help="run only cases whose name contains this text")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply problem sizes (e.g. 0.1 for a smoke run)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = {}
+    for name, fn in CASES.items():
+        if args.only and args.only not in name:
+            continue
+        print(f"Running {name}...", file=sys.stderr)
+        results[name] = {k: round(v, 4) if isinstance(v, float) else v for k, v in fn(args.scale).items()}
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "scale": args.scale,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.setdefault("results", {}).update(results)
+        baseline.update({k: report[k] for k in ("python", "machine", "scale")})
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"Baseline updated: {args.baseline}", file=sys.stderr)
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline stored yet; run with --update-baseline.", file=sys.stderr)
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("scale") != args.scale:
+        print(f"Baseline was recorded at scale {baseline.get('scale')}; comparison skipped.", file=sys.stderr)
+        return
+    regressions = compare(results, baseline.get("results", {}), args.threshold)
+    if regressions:
+        print("REGRESSIONS:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        sys.exit(1)
+    print(f"No regressions beyond {args.threshold:.0%}.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
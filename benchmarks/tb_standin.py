@@ -0,0 +1,304 @@
+"""
+Local HTTP stand-in for the ThingsBoard device API, used by the benchmarks.
+
+Supports the endpoints the agent and simulator talk to:
+    GET  /api/v1/<token>/attributes?clientKeys=...&sharedKeys=...
+    POST /api/v1/<token>/attributes
+    POST /api/v1/<token>/telemetry
+    POST /api/v1/<token>/gateway/attributes   (gateway-API batch, keyed by device name)
+    POST /api/v1/<token>/gateway/telemetry
+
+and the tenant REST API used by scripts/bulk_provision.py (JWT in
+X-Authorization, tokens expire after `server.jwt_ttl_seconds`):
+    POST /api/auth/login, POST /api/auth/token      (login / refresh)
+    GET  /api/tenant/devices?deviceName=...         (404 if missing)
+    POST /api/device?accessToken=...
+    GET  /api/device/<id>/credentials
+    POST /api/plugins/telemetry/DEVICE/<id>/attributes/SHARED_SCOPE
+    GET  /api/plugins/telemetry/DEVICE/<id>/values/attributes/SHARED_SCOPE?keys=...
+    GET  /api/tenant/dashboards?pageSize=...&page=...&textSearch=...
+    POST /api/dashboard
+
+`server.rate_limit` (requests/second on the REST API, 0 = unlimited)
+answers excess requests with HTTP 429, like ThingsBoard's tenant limits.
+
+Fault injection is controlled through `server.fault`:
+    "ok"    - normal responses
+    "error" - every request returns HTTP 500
+    "hang"  - every request sleeps `server.hang_seconds` before failing
+"""
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict
+from urllib.parse import urlparse, parse_qs
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this every
+    # keep-alive request waits out the client's delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _inject_fault(self) -> bool:
+        server = self.server
+        server.request_count += 1
+        server.path_bytes += len(self.path)
+        if server.fault != "ok":
+            # Drain the body so the keep-alive connection stays usable
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if server.latency_seconds:
+            time.sleep(server.latency_seconds)
+        if server.fault == "hang":
+            time.sleep(server.hang_seconds)
+            self._reply(504, {"error": "upstream timeout"})
+            return True
+        if server.fault == "error":
+            self._reply(500, {"error": "injected failure"})
+            return True
+        return False
+
+    def _reply(self, status: int, body: Any):
+        raw = json.dumps(body).encode()
+        self.server.bytes_sent += len(raw)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _read_json(self) -> Any:
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length) if length else b"{}"
+        self.server.bytes_received += length
+        return json.loads(raw or b"{}")
+
+    def _token_and_resource(self, path: str):
+        parts = path.strip("/").split("/")
+        # api / v1 / <token> / <resource...>
+        if len(parts) >= 4 and parts[0] == "api" and parts[1] == "v1":
+            return parts[2], "/".join(parts[3:])
+        return None, None
+
+    def do_GET(self):
+        if self._inject_fault():
+            return
+        parsed = urlparse(self.path)
+        if not parsed.path.startswith("/api/v1/"):
+            self._rest("GET", parsed, None)
+            return
+        token, resource = self._token_and_resource(parsed.path)
+        if resource != "attributes":
+            self._reply(404, {"error": "not found"})
+            return
+        query = parse_qs(parsed.query)
+        device = self.server.devices.setdefault(token, {})
+        client_keys = query.get("clientKeys", [""])[0]
+        shared_keys = query.get("sharedKeys", [""])[0]
+        body: Dict[str, Any] = {}
+        if client_keys:
+            wanted = client_keys.split(",")
+            body["client"] = {k: device[k] for k in wanted if k in device}
+        if shared_keys:
+            wanted = shared_keys.split(",")
+            shared = dict(device, **self.server.shared.get(token, {}))
+            body["shared"] = {k: shared[k] for k in wanted if k in shared}
+        self._reply(200, body)
+
+    def do_POST(self):
+        if self._inject_fault():
+            return
+        parsed = urlparse(self.path)
+        payload = self._read_json()
+        if not parsed.path.startswith("/api/v1/"):
+            self._rest("POST", parsed, payload)
+            return
+        token, resource = self._token_and_resource(parsed.path)
+        if resource == "attributes":
+            self.server.devices.setdefault(token, {}).update(payload)
+        elif resource == "telemetry":
+            self.server.telemetry.setdefault(token, []).append(payload)
+        elif resource == "gateway/attributes":
+            for device, attributes in payload.items():
+                self.server.devices.setdefault(device, {}).update(attributes)
+        elif resource == "gateway/telemetry":
+            for device, samples in payload.items():
+                self.server.telemetry.setdefault(device, []).extend(samples)
+        else:
+            self._reply(404, {"error": "not found"})
+            return
+        self._reply(200, {})
+
+    # --- Tenant REST API ---
+    def _rest(self, method: str, parsed, payload):
+        server = self.server
+        path = parsed.path.rstrip("/")
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        with server.lock:
+            server.rest_requests += 1
+            if server.rate_limit and not server.rate_bucket.take():
+                server.throttled += 1
+                self._reply(429, {"status": 429, "message": "Too many requests"})
+                return
+
+            if method == "POST" and path == "/api/auth/login":
+                if server.users.get(payload.get("username")) != payload.get("password"):
+                    self._reply(401, {"status": 401, "message": "Invalid username or password"})
+                    return
+                self._reply(200, server.issue_tokens())
+                return
+            if method == "POST" and path == "/api/auth/token":
+                if payload.get("refreshToken") not in server.refresh_tokens:
+                    self._reply(401, {"status": 401, "message": "Invalid refresh token"})
+                    return
+                self._reply(200, server.issue_tokens())
+                return
+
+            auth = self.headers.get("X-Authorization", "")
+            expires = server.jwts.get(auth[len("Bearer "):]) if auth.startswith("Bearer ") else None
+            if expires is None or expires < time.time():
+                self._reply(401, {"status": 401, "errorCode": 11, "message": "Token has expired"})
+                return
+
+            parts = path.split("/")
+            if method == "GET" and path == "/api/tenant/devices":
+                device = server.rest_devices.get(query.get("deviceName"))
+                if device is None:
+                    self._reply(404, {"status": 404, "message": "Requested item wasn't found!"})
+                else:
+                    self._reply(200, device["device"])
+            elif method == "POST" and path == "/api/device":
+                name = payload.get("name")
+                if name in server.rest_devices:
+                    self._reply(400, {"status": 400, "message": "Device with such name already exists!"})
+                    return
+                device_id = str(uuid.uuid4())
+                device = {"id": {"entityType": "DEVICE", "id": device_id}, "name": name,
+                          "type": payload.get("type", "default"), "label": payload.get("label")}
+                token = query.get("accessToken") or uuid.uuid4().hex[:20]
+                server.rest_devices[name] = {"device": device, "token": token}
+                server.device_ids[device_id] = name
+                self._reply(200, device)
+            elif method == "GET" and len(parts) == 5 and parts[2] == "device" and parts[4] == "credentials":
+                name = server.device_ids.get(parts[3])
+                if name is None:
+                    self._reply(404, {"status": 404, "message": "Requested item wasn't found!"})
+                else:
+                    self._reply(200, {"credentialsType": "ACCESS_TOKEN",
+                                      "credentialsId": server.rest_devices[name]["token"]})
+            elif method == "POST" and path.startswith("/api/plugins/telemetry/DEVICE/") and path.endswith("/SHARED_SCOPE"):
+                name = server.device_ids.get(parts[5])
+                if name is None:
+                    self._reply(404, {"status": 404, "message": "Requested item wasn't found!"})
+                else:
+                    server.shared.setdefault(server.rest_devices[name]["token"], {}).update(payload)
+                    self._reply(200, {})
+            elif method == "GET" and path.startswith("/api/plugins/telemetry/DEVICE/") and path.endswith("/SHARED_SCOPE"):
+                name = server.device_ids.get(parts[5])
+                if name is None:
+                    self._reply(404, {"status": 404, "message": "Requested item wasn't found!"})
+                    return
+                shared = server.shared.get(server.rest_devices[name]["token"], {})
+                keys = query["keys"].split(",") if query.get("keys") else list(shared)
+                self._reply(200, [{"key": k, "value": shared[k], "lastUpdateTs": 0} for k in keys if k in shared])
+            elif method == "GET" and path == "/api/tenant/dashboards":
+                search = query.get("textSearch", "").lower()
+                size, page = int(query.get("pageSize", 100)), int(query.get("page", 0))
+                matching = [d for d in server.dashboards if d["title"].lower().startswith(search)]
+                chunk = matching[page * size:(page + 1) * size]
+                self._reply(200, {"data": [{"id": d["id"], "title": d["title"]} for d in chunk],
+                                  "totalElements": len(matching), "hasNext": (page + 1) * size < len(matching)})
+            elif method == "POST" and path == "/api/dashboard":
+                dashboard = dict(payload, id={"entityType": "DASHBOARD", "id": str(uuid.uuid4())})
+                server.dashboards.append(dashboard)
+                self._reply(200, dashboard)
+            else:
+                self._reply(404, {"status": 404, "message": "not found"})
+
+
+class _TokenBucket:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.fault = "ok"
+        self.hang_seconds = 1.0
+        self.latency_seconds = 0.0
+        self.request_count = 0
+        self.bytes_received = 0  # request bodies
+        self.path_bytes = 0      # request paths incl. query strings
+        self.bytes_sent = 0      # response bodies
+        self.devices: Dict[str, Dict[str, Any]] = {}
+        self.telemetry: Dict[str, list] = {}
+        # Tenant REST API state
+        self.lock = threading.Lock()
+        self.users = {"tenant@thingsboard.org": "tenant"}
+        self.jwt_ttl_seconds = 900.0
+        self.jwts: Dict[str, float] = {}
+        self.refresh_tokens = set()
+        self.rest_devices: Dict[str, Dict[str, Any]] = {}  # name -> {"device", "token"}
+        self.device_ids: Dict[str, str] = {}               # device id -> name
+        self.shared: Dict[str, Dict[str, Any]] = {}        # token -> shared attributes
+        self.dashboards: list = []
+        self.rest_requests = 0
+        self.throttled = 0
+        self.rate_limit = 0.0
+
+    @property
+    def rate_limit(self) -> float:
+        return self._rate_limit
+
+    @rate_limit.setter
+    def rate_limit(self, value: float):
+        self._rate_limit = value
+        self.rate_bucket = _TokenBucket(value) if value else None
+
+    def issue_tokens(self) -> Dict[str, str]:
+        token, refresh = uuid.uuid4().hex, uuid.uuid4().hex
+        self.jwts[token] = time.time() + self.jwt_ttl_seconds
+        self.refresh_tokens.add(refresh)
+        return {"token": token, "refreshToken": refresh}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    server = StandInServer(port=8080).start()
+    print(f"ThingsBoard stand-in listening on {server.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,140 @@
+import gzip
+import json
+import os
+import time
+from typing import List, Optional
+
+import decision_core
+from decision_core import SmartIrrigationAgent
+from actuation_tracker import ActuationTracker
+from fault_detector import FaultDetector
+from moisture_model import MoistureModel
+from water_accounting import WaterLedger
+from water_balance import FieldWaterBalance
+
+CHECKPOINT_PATH = "agent_checkpoint.json.gz"
+CHECKPOINT_INTERVAL = 60         # seconds between periodic saves
+MAX_CHECKPOINT_AGE = 24 * 3600   # older checkpoints are ignored (cold start)
+CHECKPOINT_VERSION = 1
+
+
+def save_checkpoint(path: str, agents: List[SmartIrrigationAgent]):
+    """
+    Atomically writes the fleet's state: device registry, config, override
+    state, last pushed attributes, cached moisture/weather, the shared
+    water-balance, water-ledger (and moisture-model) arrays and the fault
+    detector's active faults. Written to a temp file,
+    fsynced, then renamed so a crash mid-write never leaves a truncated
+    checkpoint behind.
+    """
+    water_balance = agents[0].water_balance if agents else FieldWaterBalance(capacity=1)
+    weather, weather_ts = decision_core.WEATHER_CACHE.value, decision_core.WEATHER_CACHE.updated_at
+    moisture_model = agents[0].moisture_model if agents else None
+    water_ledger = agents[0].water_ledger if agents else None
+    fault_detector = agents[0].fault_detector if agents else None
+    state = {
+        "version": CHECKPOINT_VERSION,
+        "saved_at": time.time(),
+        "agents": [agent.export_state() for agent in agents],
+        "weather": [weather, weather_ts],
+        "water_balance": water_balance.to_state(),
+        "moisture_model": moisture_model.to_state() if moisture_model is not None else None,
+        "water_ledger": water_ledger.to_state() if water_ledger is not None else None,
+        "fault_detector": fault_detector.to_state() if fault_detector is not None else None,
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as f:
+            f.write(json.dumps(state, separators=(",", ":")).encode())
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path: str, uploader=None, max_age: float = MAX_CHECKPOINT_AGE,
+                    water_ledger: WaterLedger = None, fault_detector: FaultDetector = None,
+                    actuation: ActuationTracker = None) -> Optional[List[SmartIrrigationAgent]]:
+    """
+    Rebuilds agents from a checkpoint, or returns None (cold start) if it is
+    missing, unreadable, from another version or older than max_age.
+    Restored moisture keeps its original timestamp, so agents resume with
+    data_stale set until their first successful fetch. The restored fleet
+    shares one ledger / fault detector / actuation tracker (the ones passed
+    in, or new ones), like agents built directly.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with gzip.open(path, "rb") as f:
+            state = json.loads(f.read())
+    except (OSError, ValueError, EOFError) as e:
+        print(f" ! Ignoring unreadable checkpoint {path}: {e}")
+        return None
+
+    if state.get("version") != CHECKPOINT_VERSION:
+        print(f" ! Ignoring checkpoint version {state.get('version')}")
+        return None
+    age = time.time() - state["saved_at"]
+    if age > max_age:
+        print(f" ! Ignoring checkpoint from {age / 3600:.1f}h ago")
+        return None
+
+    weather, weather_ts = state["weather"]
+    if weather is not None:
+        decision_core.WEATHER_CACHE.restore(weather, weather_ts)
+
+    water_balance = FieldWaterBalance.from_state(state["water_balance"])
+    moisture_model = None
+    if state.get("moisture_model") is not None:
+        moisture_model = MoistureModel.from_state(state["moisture_model"])
+    if water_ledger is None and state.get("water_ledger") is not None:
+        # Today's / this week's / the season's totals survive the restart
+        water_ledger = WaterLedger.from_state(state["water_ledger"])
+    water_ledger = water_ledger or WaterLedger(capacity=len(state["agents"]))
+    if fault_detector is None and state.get("fault_detector") is not None:
+        # Active lockouts survive the restart
+        fault_detector = FaultDetector.from_state(state["fault_detector"])
+    fault_detector = fault_detector or FaultDetector()
+    actuation = actuation or ActuationTracker()
+    agents = []
+    for agent_state in state["agents"]:
+        agent = SmartIrrigationAgent(access_token=agent_state["access_token"],
+                                     device_name=agent_state["device_name"],
+                                     uploader=uploader, water_balance=water_balance,
+                                     moisture_model=moisture_model, water_ledger=water_ledger,
+                                     fault_detector=fault_detector, actuation=actuation)
+        agent.restore_state(agent_state)
+        agents.append(agent)
+    print(f" > Restored {len(agents)} agent(s) from checkpoint ({age:.0f}s old)")
+    return agents
+
+
+class Checkpointer:
+    """Saves the fleet every `interval` seconds; call maybe_save() from the agent loop."""
+
+    def __init__(self, path: str, agents: List[SmartIrrigationAgent], interval: float = CHECKPOINT_INTERVAL):
+        if len({id(agent.water_balance) for agent in agents}) > 1:
+            raise ValueError("Checkpointed agents must share one FieldWaterBalance")
+        if len({id(agent.moisture_model) for agent in agents}) > 1:
+            raise ValueError("Checkpointed agents must share one MoistureModel")
+        if len({id(agent.water_ledger) for agent in agents}) > 1:
+            raise ValueError("Checkpointed agents must share one WaterLedger")
+        if len({id(agent.fault_detector) for agent in agents}) > 1:
+            raise ValueError("Checkpointed agents must share one FaultDetector")
+        self.path = path
+        self.agents = agents
+        self.interval = interval
+        self._last_save = time.monotonic()
+
+    def maybe_save(self) -> bool:
+        if time.monotonic() - self._last_save < self.interval:
+            return False
+        self.save()
+        return True
+
+    def save(self):
+        try:
+            save_checkpoint(self.path, self.agents)
+        except OSError as e:
+            print(f" ! Checkpoint failed: {e}")
+        self._last_save = time.monotonic()
@@ -0,0 +1,251 @@
+import time
+import random
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# --- Resilience Tuning ---
+FAILURE_THRESHOLD = 3          # consecutive failures before a breaker opens
+BASE_OPEN_SECONDS = 5.0        # first open period, doubled on every re-trip
+MAX_OPEN_SECONDS = 300.0       # cap for the exponential open period
+RETRY_BUDGET_RATIO = 0.2       # retries allowed per normal request
+RETRY_BUDGET_MIN_PER_SEC = 1.0 # retries always allowed, even with no traffic
+RETRY_BUDGET_MAX_TOKENS = 10.0
+RETRY_BACKOFF_SECONDS = 0.2    # first retry delay, doubled per attempt
+# 4xx responses the server may answer differently on a retry; every other
+# 4xx is the caller's fault (bad token, bad request) and says nothing
+# about the endpoint's health
+RETRYABLE_CLIENT_STATUSES = (408, 429)
+
+CLOSED = "CLOSED"
+OPEN = "OPEN"
+HALF_OPEN = "HALF_OPEN"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the endpoint's breaker is open."""
+
+
+_NETWORK_ERRORS: Optional[Tuple[type, ...]] = None
+
+
+def _network_errors() -> Tuple[type, ...]:
+    """Connection / timeout exception types: the builtins, plus requests' own when installed."""
+    global _NETWORK_ERRORS
+    if _NETWORK_ERRORS is None:
+        errors: Tuple[type, ...] = (ConnectionError, TimeoutError)
+        try:
+            import requests
+            errors += (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+        except ImportError:
+            pass
+        _NETWORK_ERRORS = errors
+    return _NETWORK_ERRORS
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    True for errors that reflect endpoint health: connection errors,
+    timeouts and HTTP 5xx / 408 / 429. Everything else (other 4xx, a body
+    that is not JSON, KeyError / TypeError from our own code) is not.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is not None:
+        return status >= 500 or status in RETRYABLE_CLIENT_STATUSES
+    return isinstance(error, _network_errors())
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint breaker. After FAILURE_THRESHOLD consecutive failures the
+    endpoint is skipped for an exponentially growing period, then a single
+    probe request is let through (HALF_OPEN) to check for recovery.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD,
+                 base_open_seconds: float = BASE_OPEN_SECONDS,
+                 max_open_seconds: float = MAX_OPEN_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_open_seconds = base_open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.opened_at = 0.0
+        self.open_seconds = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if self.clock() - self.opened_at < self.open_seconds:
+                    return False
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            # HALF_OPEN: only one probe at a time
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.trips = 0
+            self._probe_in_flight = False
+
+    def record_ignored(self):
+        """The call failed for a reason unrelated to the endpoint: frees the probe slot only."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._trip()
+
+    def _trip(self):
+        self.trips += 1
+        open_seconds = min(self.max_open_seconds, self.base_open_seconds * (2 ** (self.trips - 1)))
+        # Jitter so a fleet of agents does not probe in lockstep
+        self.open_seconds = open_seconds * random.uniform(0.8, 1.2)
+        self.opened_at = self.clock()
+        self.state = OPEN
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"state": self.state, "failures": self.failures, "trips": self.trips}
+
+
+class RetryBudget:
+    """
+    Process-wide token bucket limiting retries to a fraction of real traffic,
+    so a brown-out cannot multiply load on the upstream.
+    """
+
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO,
+                 min_per_sec: float = RETRY_BUDGET_MIN_PER_SEC,
+                 max_tokens: float = RETRY_BUDGET_MAX_TOKENS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ratio = ratio
+        self.min_per_sec = min_per_sec
+        self.max_tokens = max_tokens
+        self.clock = clock
+        self.tokens = max_tokens
+        self.last_refill = clock()
+        self.retries_denied = 0
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self.last_refill) * self.min_per_sec)
+        self.last_refill = now
+
+    def record_request(self):
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            self.retries_denied += 1
+            return False
+
+
+class LastKnownGood:
+    """Remembers the last successful value for an endpoint and its age."""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.value: Any = None
+        self.updated_at: Optional[float] = None
+
+    def update(self, value: Any):
+        self.value = value
+        self.updated_at = self.clock()
+
+    def restore(self, value: Any, updated_at: Optional[float]):
+        """Reloads a value saved elsewhere (e.g. a checkpoint) with its original timestamp."""
+        self.value = value
+        self.updated_at = updated_at
+
+    def get(self) -> Tuple[Any, Optional[float]]:
+        """Returns (value, age_seconds); age is None when nothing was ever stored."""
+        if self.updated_at is None:
+            return None, None
+        return self.value, self.clock() - self.updated_at
+
+
+class ResilientCaller:
+    """
+    Shared entry point for all outbound HTTP calls: one breaker per endpoint,
+    bounded exponential retries paid for out of a global retry budget.
+    """
+
+    def __init__(self, budget: Optional[RetryBudget] = None, max_retries: int = 2,
+                 backoff_seconds: float = RETRY_BACKOFF_SECONDS, enabled: bool = True,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.budget = budget or RetryBudget()
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.enabled = enabled
+        self.sleep = sleep
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        with self._lock:
+            if endpoint not in self.breakers:
+                self.breakers[endpoint] = CircuitBreaker(endpoint)
+            return self.breakers[endpoint]
+
+    def call(self, endpoint: str, fn: Callable[[], Any]) -> Any:
+        """
+        Runs fn() under the endpoint's breaker. Raises CircuitOpenError without
+        touching the network when the breaker is open, otherwise re-raises the
+        last error once retries (or the retry budget) are exhausted. Non-
+        transient errors (see is_transient) are re-raised at once.
+        """
+        if not self.enabled:
+            return fn()
+
+        breaker = self.breaker(endpoint)
+        if not breaker.allow_request():
+            raise CircuitOpenError(f"{endpoint} circuit open")
+
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_transient(e):
+                    # e.g. one device's bad token, or a bug: not retried, not held against the endpoint
+                    breaker.record_ignored()
+                    raise
+                breaker.record_failure()
+                if attempt >= self.max_retries or not self.budget.try_spend():
+                    raise
+                if not breaker.allow_request():
+                    raise
+                delay = self.backoff_seconds * (2 ** attempt)
+                self.sleep(delay * random.uniform(0.5, 1.0))
+                attempt += 1
+                continue
+            breaker.record_success()
+            return result
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: b.snapshot() for name, b in self.breakers.items()}
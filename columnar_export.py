@@ -0,0 +1,271 @@
+"""
+Columnar export of decisions, telemetry and daily water totals for analytics.
+
+Rows are buffered per table as columns and written out every `chunk_rows`
+rows (or FLUSH_SECONDS) as Parquet (zstd) or Arrow IPC files, hive-
+partitioned by local date and region (the field's zone):
+
+    <root>/decisions/date=2026-05-01/region=North/part-....parquet
+    <root>/telemetry/...
+    <root>/water/...
+
+Memory stays bounded by one chunk per table. Every flush writes complete,
+closed files, so readers (read_table, the Streamlit app, pandas / DuckDB /
+Spark pointed at the root) can query while the agent keeps exporting.
+
+Needs pyarrow (`pip install pyarrow`); without it ColumnarExporter raises
+ColumnarUnavailable and the agent runs without exporting.
+"""
+import os
+import time
+import uuid
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from urllib.parse import quote
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on environment
+    pa = None
+
+EXPORT_DIR = "exports"
+CHUNK_ROWS = 262144       # rows buffered per table before a flush
+FLUSH_SECONDS = 3600.0    # a slow agent still writes at least this often
+PARQUET = "parquet"
+ARROW = "arrow"
+EXTENSIONS = {PARQUET: ".parquet", ARROW: ".arrow"}
+COMPRESSION = "zstd"
+
+DECISIONS = "decisions"
+TELEMETRY = "telemetry"
+WATER = "water"
+
+
+class ColumnarUnavailable(RuntimeError):
+    pass
+
+
+def _schemas() -> Dict[str, "pa.Schema"]:
+    ts = pa.timestamp("ms", tz="UTC")
+    name = pa.dictionary(pa.int32(), pa.string())
+    return {
+        DECISIONS: pa.schema([
+            ("ts", ts), ("field", name), ("decision", pa.dictionary(pa.int8(), pa.string())),
+            ("reason_code", pa.dictionary(pa.int8(), pa.string())), ("moisture", pa.float32()),
+            ("duration_s", pa.int32()), ("liters", pa.int32()), ("rain_prob", pa.int16()),
+            ("temp_c", pa.float32()), ("stale", pa.bool_()),
+        ]),
+        TELEMETRY: pa.schema([("ts", ts), ("field", name), ("moisture", pa.float32()), ("pump_on", pa.bool_())]),
+        WATER: pa.schema([
+            ("day", pa.date32()), ("field", name), ("ai_liters", pa.float64()),
+            ("manual_liters", pa.float64()), ("fixed_liters", pa.float64()), ("saved_liters", pa.float64()),
+        ]),
+    }
+
+
+class ColumnarExporter:
+    """
+    Streaming writer. add_*() take one row (the agent); write_columns()
+    takes whole column arrays (backfills, bulk jobs) and is the fast path.
+    Every row also names its region, which becomes a partition directory.
+    """
+
+    def __init__(self, root: str = EXPORT_DIR, format: str = PARQUET, chunk_rows: int = CHUNK_ROWS,
+                 utc_offset_hours: float = 0.0, flush_seconds: float = FLUSH_SECONDS, clock=time.time):
+        if pa is None:
+            raise ColumnarUnavailable("columnar export needs pyarrow (pip install pyarrow)")
+        if format not in EXTENSIONS:
+            raise ValueError(f"format must be one of {sorted(EXTENSIONS)}")
+        self.root = root
+        self.format = format
+        self.chunk_rows = chunk_rows
+        self.offset_ms = int(utc_offset_hours * 3600 * 1000)
+        self.flush_seconds = flush_seconds
+        self.clock = clock
+        self.schemas = _schemas()
+        # table -> buffered column chunks ({column: array}) and their row count
+        self._chunks: Dict[str, List[Dict[str, Any]]] = {t: [] for t in self.schemas}
+        self._rows_buffered = {t: 0 for t in self.schemas}
+        # table -> single rows from add_*(), as lists per column (regions included)
+        self._rows: Dict[str, Dict[str, list]] = {t: self._empty_rows(t) for t in self.schemas}
+        self._last_flush = clock()
+        self._run_id = f"{int(clock() * 1000)}-{uuid.uuid4().hex[:6]}"
+        self._seq = 0
+        self.rows_written = {t: 0 for t in self.schemas}
+        self.files_written = 0
+        self.bytes_written = 0
+
+    def _empty_rows(self, table: str) -> Dict[str, list]:
+        return {name: [] for name in self.schemas[table].names + ["region"]}
+
+    # --- Ingest ---
+    def add_decision(self, field: str, region: str, result: Dict[str, Any]):
+        """One agent decision (the analyze_and_decide result)."""
+        weather = result.get("weather_summary", {})
+        self._add_row(DECISIONS, {
+            "ts": result["timestamp"], "field": field, "region": region,
+            "decision": result["decision"], "reason_code": result.get("reason_code"),
+            "moisture": result.get("soil_moisture_percent"), "duration_s": result.get("duration_seconds", 0),
+            "liters": result.get("liters_for_field", 0), "rain_prob": weather.get("rain_probability"),
+            "temp_c": weather.get("temperature"), "stale": bool(result.get("data_stale")),
+        })
+
+    def add_sample(self, field: str, region: str, ts: float, moisture: float, pump_on: Optional[bool]):
+        """One telemetry sample (ts in epoch seconds)."""
+        self._add_row(TELEMETRY, {"ts": int(ts * 1000), "field": field, "region": region,
+                                  "moisture": moisture, "pump_on": pump_on})
+
+    def add_water_day(self, field: str, region: str, day: date, totals: Dict[str, float]):
+        """One field-day of water totals (WaterLedger.totals)."""
+        self._add_row(WATER, {"day": day, "field": field, "region": region,
+                              "ai_liters": totals["ai"], "manual_liters": totals["manual"],
+                              "fixed_liters": totals["fixed"], "saved_liters": totals["saved"]})
+
+    def _add_row(self, table: str, row: Dict[str, Any]):
+        rows = self._rows[table]
+        for name, values in rows.items():
+            values.append(row.get(name))
+        self._rows_buffered[table] += 1
+        self._maybe_flush(table)
+
+    def write_columns(self, table: str, columns: Dict[str, Any]):
+        """
+        Appends whole columns (equal-length arrays; "ts" as epoch ms int64,
+        "day" as datetime64[D], plus "region"). Large inputs are split so no
+        more than one chunk is buffered.
+        """
+        length = len(columns["region"])
+        start = 0
+        while start < length:
+            take = min(length - start, self.chunk_rows - self._rows_buffered[table])
+            self._chunks[table].append({name: values[start:start + take] for name, values in columns.items()})
+            self._rows_buffered[table] += take
+            start += take
+            self._maybe_flush(table)
+
+    def _maybe_flush(self, table: str):
+        if self._rows_buffered[table] >= self.chunk_rows:
+            self._flush_table(table)
+        elif self.clock() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    # --- Writing ---
+    def flush(self):
+        """Writes every buffered row out (call before exit)."""
+        for table in self.schemas:
+            self._flush_table(table)
+        self._last_flush = self.clock()
+
+    close = flush
+
+    def _flush_table(self, table: str):
+        chunks = self._chunks[table]
+        rows = self._rows[table]
+        if rows["region"]:
+            chunks.append(rows)
+            self._rows[table] = self._empty_rows(table)
+        if not chunks:
+            return
+        self._chunks[table] = []
+        self._rows_buffered[table] = 0
+        schema = self.schemas[table]
+        arrays = {name: [] for name in schema.names}
+        regions = []
+        for chunk in chunks:
+            regions.append(np.asarray(chunk["region"], dtype=object))
+            for name in schema.names:
+                arrays[name].append(self._to_arrow(schema.field(name).type, chunk[name]))
+        data = pa.Table.from_arrays([pa.chunked_array(arrays[name], type=schema.field(name).type)
+                                     for name in schema.names], schema=schema)
+        self._write_partitions(table, data, np.concatenate(regions))
+
+    @staticmethod
+    def _to_arrow(arrow_type, values):
+        if pa.types.is_dictionary(arrow_type):
+            return pa.array(values, type=arrow_type.value_type).dictionary_encode().cast(arrow_type)
+        return pa.array(values, type=arrow_type)
+
+    def _write_partitions(self, table: str, data: "pa.Table", regions: np.ndarray):
+        if table == WATER:
+            days = data.column("day").cast(pa.int32()).to_numpy()
+        else:
+            days = (data.column("ts").cast(pa.int64()).to_numpy() + self.offset_ms) // 86_400_000
+        region_names, region_codes = np.unique(regions.astype(str), return_inverse=True)
+        keys = (days - days.min()) * len(region_names) + region_codes
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        data = data.take(pa.array(order))
+        bounds = np.flatnonzero(np.diff(keys)) + 1
+        for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(keys)]):
+            i = order[start]
+            day = date(1970, 1, 1) + timedelta(days=int(days[i]))
+            self._write_file(table, day, region_names[region_codes[i]], data.slice(start, end - start))
+        self.rows_written[table] += len(data)
+
+    def _write_file(self, table: str, day: date, region: str, part: "pa.Table"):
+        directory = os.path.join(self.root, table, f"date={day.isoformat()}", f"region={quote(region, safe='')}")
+        os.makedirs(directory, exist_ok=True)
+        self._seq += 1
+        path = os.path.join(directory, f"part-{self._run_id}-{self._seq:06d}{EXTENSIONS[self.format]}")
+        if self.format == PARQUET:
+            pq.write_table(part, path, compression=COMPRESSION)
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=COMPRESSION)
+            with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, part.schema, options=options) as writer:
+                writer.write_table(part)
+        self.files_written += 1
+        self.bytes_written += os.path.getsize(path)
+
+
+def export_ledger(exporter: ColumnarExporter, ledger, now: float, days: int = 1):
+    """
+    Writes every field's water totals for the `days` complete days before
+    today (WaterLedger.series), partitioned by the field's zone. Backfills
+    history; running agents export each finished day themselves.
+    """
+    from water_accounting import FIELD
+
+    for field in list(ledger.levels[FIELD].index):
+        zone = ledger.zone_of[field]
+        for row in ledger.series(FIELD, field, days + 1, now)[:-1]:
+            exporter.add_water_day(field, zone, date(1970, 1, 1) + timedelta(days=row["day"]), row)
+
+
+# --- Reading ---
+def read_table(root: str, table: str, start: Optional[date] = None, end: Optional[date] = None,
+               regions: Optional[Sequence[str]] = None, fields: Optional[Iterable[str]] = None,
+               columns: Optional[List[str]] = None, format: str = PARQUET):
+    """
+    Loads an exported table into pandas, reading only the date / region
+    partitions asked for (start / end inclusive). Adds "date" and "region"
+    columns from the partition paths. Empty DataFrame if nothing matches.
+    """
+    import pandas as pd
+
+    if pa is None:
+        raise ColumnarUnavailable("reading exports needs pyarrow (pip install pyarrow)")
+    path = os.path.join(root, table)
+    if not os.path.isdir(path):
+        return pd.DataFrame()
+    partitioning = ds.partitioning(pa.schema([("date", pa.string()), ("region", pa.string())]), flavor="hive")
+    dataset = ds.dataset(path, format="ipc" if format == ARROW else "parquet", partitioning=partitioning)
+    condition = None
+
+    def both(a, b):
+        return b if a is None else a & b
+
+    if start is not None:
+        condition = both(condition, ds.field("date") >= start.isoformat())
+    if end is not None:
+        condition = both(condition, ds.field("date") <= end.isoformat())
+    if regions:
+        condition = both(condition, ds.field("region").isin(list(regions)))
+    if fields:
+        condition = both(condition, ds.field("field").isin(list(fields)))
+    if columns is not None:
+        columns = list(columns) + [name for name in ("date", "region") if name not in columns]
+    return dataset.to_table(columns=columns, filter=condition).to_pandas()
@@ -1,9 +1,24 @@
-import json
+import os
 import time
-import random
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from typing import Dict, Any, List
 
+from circuit_breaker import ResilientCaller, CircuitOpenError, LastKnownGood
+from water_balance import BASE_ET0, FieldWaterBalance, et0_from_weather
+from moisture_model import MoistureModel
+from horizon_planner import HorizonPlanner, HORIZON_DAYS
+from fault_detector import FaultDetector
+from water_accounting import WaterLedger, FIELD, DAY, WEEK, SEASON, day_index
+from timeseries_store import TimeSeriesStore, TIMESERIES_PATH, MOISTURE, PUMP_ON, DECISION_ON
+from actuation_tracker import ActuationTracker
+from field_config import ConfigTracker, CONFIG_KEYS, CONFIG_VERSION, merged_config, version_of
+from poll_scheduler import next_check_seconds
+import profiling
+from payload_codec import (
+    DecisionEncoder, describe_reason, dumps,
+    REASON_MANUAL, REASON_STALE, REASON_FAULT, REASON_RAIN, REASON_DRY, REASON_NEED, REASON_OK,
+)
+
 # --- Configuration & Constants ---
 # TODO: USER to update these values
 THINGSBOARD_SERVER = "http://demo.thingsboard.io"
@@ -11,14 +26,45 @@ THINGSBOARD_ACCESS_TOKEN = "yktlt9lpxdqchp2dkfrd"
 OPENWEATHER_API_KEY = "YOUR_OPENWEATHER_API_KEY_HERE"
 OPENWEATHER_CITY = "Coimbatore,IN" # Example
 
+# Network Resilience
+HTTP_TIMEOUT_SECONDS = 5
+MAX_STALE_SECONDS = 900  # Beyond this, cached moisture is too old to irrigate on
+TREND_SMOOTHING = 0.5    # EWMA weight of the newest moisture slope
+
+# Decision Thresholds (poll_scheduler derives its decision boundaries from these)
+RAIN_LOCKOUT_PERCENT = 60      # rain probability above which the pump stays off
+CRITICAL_MOISTURE_PERCENT = 30 # emergency watering below this
+FORECAST_DRY_PERCENT = 30      # irrigate ahead if the moisture model forecasts this within 24h
+NEED_DEMAND_MM = 1.0           # net demand above which the agent irrigates
+RAIN_MM_AT_CERTAINTY = 15.0    # expected rain (mm) at 100% probability
+SOIL_CREDIT_FROM_PERCENT = 40  # soil water starts offsetting demand above this...
+SOIL_CREDIT_SPAN_PERCENT = 40  # ...reaching full credit this many points higher
+SOIL_CREDIT_MAX = 0.8          # share of demand the soil can cover at full credit
+
+# Shared by every agent in the process so a brown-out trips one breaker per
+# endpoint instead of every device timing out on its own.
+RESILIENCE = ResilientCaller()
+
+# Weather is per city, not per field: one cached reading serves the fleet.
+WEATHER_CACHE_SECONDS = 600
+WEATHER_CACHE = LastKnownGood()
+# Daily rain outlook for the horizon planner (OpenWeather 5-day / 3-hour forecast)
+RAIN_OUTLOOK_CACHE_SECONDS = 3 * 3600
+RAIN_OUTLOOK_CACHE = LastKnownGood()
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Read every cycle; the field config only when config_version changes (see field_config.py)
+# Operator fault reset: any new value (epoch ms) in either scope clears the field's faults
+FAULT_RESET = "fault_reset"
+HOT_KEYS = f"current_moisture,pump_state,manual_override,manual_state,decision_ack,decision_ack_ts,{CONFIG_VERSION}"
+
 # Irrigation Constants & Configuration
 # Default Fallbacks
 DEFAULT_CROP_TYPE = "Rice (Paddy)"
 DEFAULT_GROWTH_STAGE = "Vegetative"
 DEFAULT_FIELD_SIZE_HA = 1.5
 
-BASE_ET0 = 6.5  # mm/day Reference Evapotranspiration
-
 CROP_COEFFICIENTS = {
     "Rice (Paddy)": {"Vegetative": 1.1, "Reproductive": 1.25, "Ripening": 1.0},
     "Wheat": {"Vegetative": 0.7, "Reproductive": 1.15, "Ripening": 0.4},
@@ -26,14 +72,239 @@ CROP_COEFFICIENTS = {
     "Cotton": {"Vegetative": 0.35, "Reproductive": 1.2, "Ripening": 0.6},
 }
 
+def _http_get_json(url: str) -> Dict[str, Any]:
+    import requests
+    response = requests.get(url, timeout=HTTP_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return response.json()
+
+
+def _http_post_raw(url: str, body: bytes):
+    """POSTs an already-encoded JSON body (see payload_codec)."""
+    import requests
+    response = requests.post(url, data=body, headers=JSON_HEADERS, timeout=HTTP_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return response
+
+
+def daily_rain_probability(forecast: Dict[str, Any], days: int = HORIZON_DAYS) -> List[float]:
+    """
+    Highest 3-hourly rain probability (%) per local day from an OpenWeather
+    /forecast response, today first. Days past the forecast count as dry.
+    """
+    offset = forecast.get("city", {}).get("timezone", 0)
+    outlook = [0.0] * days
+    first = None
+    for entry in forecast["list"]:
+        day = (entry["dt"] + offset) // 86400
+        if first is None:
+            first = day
+        if day - first < days:
+            outlook[day - first] = max(outlook[day - first], entry.get("pop", 0.0) * 100.0)
+    return outlook
+
+
 class SmartIrrigationAgent:
-    def __init__(self):
+    def __init__(self, access_token: str = THINGSBOARD_ACCESS_TOKEN,
+                 device_name: str = None, uploader=None, water_balance: FieldWaterBalance = None,
+                 moisture_model: MoistureModel = None, fault_detector: FaultDetector = None,
+                 water_ledger: WaterLedger = None, timeseries: TimeSeriesStore = None,
+                 actuation: ActuationTracker = None, exporter=None, planner: HorizonPlanner = None):
+        self.access_token = access_token
+        # Name used in gateway batches; falls back to the token for single-device runs
+        self.device_name = device_name or access_token
+        # Optional GatewayBatcher: decisions are queued instead of POSTed one by one
+        self.uploader = uploader
         self.history = []
         # Initial defaults
         self.crop_type = DEFAULT_CROP_TYPE
         self.growth_stage = DEFAULT_GROWTH_STAGE
         self.field_size = DEFAULT_FIELD_SIZE_HA
+        self.soil_type = "Loam (Balanced)"
+        self.manual_mode = False
+        self.manual_cmd = "OFF"
+        self.encoder = DecisionEncoder(self.field_size)
+
+        # Root-zone water balance; a fleet shares one array-backed model
+        self.water_balance = water_balance or FieldWaterBalance(capacity=1)
+        self.field_index = self.water_balance.add_field(
+            self.device_name, self.soil_type, self.crop_type, self._kc())
+        self._balance_config = (self.soil_type, self.crop_type, self.growth_stage)
+
+        # Optional learned 24h moisture forecast; a fleet shares one model
+        self.moisture_model = None
+        self.set_moisture_model(moisture_model)
+        # Conditions until the next sample (pump, expected rain mm), fed to the model
+        self._pump_on = False
+        self._rain_mm = 0.0
+        # Rain actually measured (mm/h over the last hour), booked into the balance
+        self._observed_rain_mm_per_hour = 0.0
+        # Season water the ledger had delivered at the last balance update
+        self._delivered_liters = None
+
+        # Sensor / pump sanity checks on every fresh sample; a fleet may share one
+        self.fault_detector = fault_detector or FaultDetector()
+        self._fault_reset = None  # last fault_reset value seen
+        self._fault_reset_seen = False
+
+        # Delivered vs fixed-timer water per field / zone; a fleet shares one ledger
+        self.zone = "default"
+        self.water_ledger = water_ledger or WaterLedger(capacity=1)
+        if self.device_name not in self.water_ledger.zone_of:  # kept as is when restored from a checkpoint
+            self.water_ledger.register_field(self.device_name, self.zone, self.field_size, self._kc(),
+                                             now=time.time())
+        self.water_report = {}  # refreshed on every fetch, reported with each decision
+
+        # Config is reloaded only when its published version changes
+        self.config_tracker = ConfigTracker()
+
+        # Push -> device ack -> pump_state latency per decision; a fleet may share one
+        self.actuation = actuation or ActuationTracker()
+
+        # Optional chart history (rollups only); a fleet shares one store
+        self.timeseries = timeseries
+
+        # Optional columnar export for analytics (columnar_export.ColumnarExporter);
+        # a fleet shares one exporter
+        self.exporter = exporter
+        self._export_day = None
+
+        # Optional multi-day plan over the shared water balance (horizon_planner.HorizonPlanner);
+        # a fleet shares one planner, re-solved once a day
+        self.planner = planner
+
+        # Last known good values served while upstream is unavailable
+        self._moisture_lkg = LastKnownGood()
+        self.data_stale = False
+        self.data_age_seconds = 0.0
+
+        # Moisture trend (%/hour, smoothed) for adaptive polling
+        self.clock = time.time
+        self.moisture_trend = 0.0
+        self._last_sample = None
+        self.last_pushed = None
+
+
+    # --- Checkpointing (see checkpoint.py) ---
+    def export_state(self) -> Dict[str, Any]:
+        moisture, _ = self._moisture_lkg.get()
+        return {
+            "access_token": self.access_token,
+            "device_name": self.device_name,
+            "config": [self.crop_type, self.growth_stage, self.field_size, self.soil_type],
+            "manual": [self.manual_mode, self.manual_cmd],
+            "moisture": [moisture, self._moisture_lkg.updated_at],
+            "trend": [self.moisture_trend, self._last_sample],
+            "last_pushed": self.last_pushed,
+            "zone": self.zone,
+            "config_version": [self.config_tracker.version, self.config_tracker.loaded_at],
+            "fault_reset": [self._fault_reset, self._fault_reset_seen],
+        }
+
+    def restore_state(self, state: Dict[str, Any]):
+        self.crop_type, self.growth_stage, self.field_size, self.soil_type = state["config"]
+        self.manual_mode, self.manual_cmd = state["manual"]
+        moisture, updated_at = state["moisture"]
+        if moisture is not None:
+            self._moisture_lkg.restore(moisture, updated_at)
+        self.moisture_trend, last_sample = state["trend"]
+        self._last_sample = tuple(last_sample) if last_sample else None
+        self.last_pushed = state.get("last_pushed")
+        self.zone = state.get("zone", self.zone)
+        # The restored config stays valid until its published version changes
+        version, loaded_at = state.get("config_version", [None, None])
+        if loaded_at is not None:
+            self.config_tracker.version = tuple(version)
+            self.config_tracker.loaded_at = loaded_at
+        # A reset issued while the agent was down still clears restored faults
+        self._fault_reset, self._fault_reset_seen = state.get("fault_reset", [None, False])
+        self.encoder.set_field_size(self.field_size)
+        self._balance_config = (self.soil_type, self.crop_type, self.growth_stage)
+
+    def set_moisture_model(self, moisture_model: MoistureModel = None):
+        """Attaches (or with None, detaches) the learned moisture forecast."""
+        self.moisture_model = moisture_model
+        if moisture_model is not None:
+            self.model_index = moisture_model.add_field(self.device_name, self.soil_type)
+
+    def decide_from_cache(self):
+        """
+        Decision from restored/cached state only, flagged stale; lets a
+        restarted agent act before its first fetch completes. A checkpoint
+        can be hours old, so it only ever holds the pump: a restored manual
+        override is ignored until the first fetch re-reads it, and PUMP_ON
+        becomes PUMP_OFF (STALE).
+        """
+        moisture = self._cached_moisture()
+        if moisture is None:
+            return None
+        manual_mode, self.manual_mode = self.manual_mode, False
+        try:
+            result = self.analyze_and_decide(moisture)
+        finally:
+            self.manual_mode = manual_mode
+        if result["decision"] == "PUMP_ON":
+            result.update(decision="PUMP_OFF", duration_seconds=0, reason_code=REASON_STALE)
+            result["alerts"].append("Holding pump OFF until fresh sensor data arrives")
+            self._pump_on = False
+        return result
+
+    def resume_from_cache(self):
+        """Warm restart: pushes a decision from the restored state before the first fetch."""
+        result = self.decide_from_cache()
+        if result is not None:
+            self.push_decision_to_thingsboard(result)
+        return result
+
+    def _model_conditions(self):
+        """
+        (crop ET mm/day, expected rain mm) for the moisture model: the
+        weather-scaled ETc from the water balance and the forecast rain.
+        Training and prediction must both use these.
+        """
+        return float(self.water_balance.etc[self.field_index]), self._rain_mm
+
+    def _kc(self) -> float:
+        return CROP_COEFFICIENTS.get(self.crop_type, {}).get(self.growth_stage, 1.0)
+
+    def update_water_balance(self, moisture: float):
+        """Folds a fresh moisture sample into the field's water-balance state."""
+        config = (self.soil_type, self.crop_type, self.growth_stage)
+        if config != self._balance_config:
+            self.water_balance.configure(self.field_index, self.soil_type, self.crop_type, self._kc())
+            if self.moisture_model is not None:
+                self.moisture_model.set_soil(self.model_index, self.soil_type)
+            self._balance_config = config
+        now = self.clock()
+        self._book_water(now)
+        self.water_balance.assimilate(self.field_index, moisture, now)
+        if self.moisture_model is not None:
+            self.moisture_model.observe(self.model_index, moisture, now, self._pump_on, *self._model_conditions())
 
+        if self._last_sample is not None:
+            last_ts, last_moisture = self._last_sample
+            if now > last_ts:
+                slope = (moisture - last_moisture) / ((now - last_ts) / 3600.0)
+                self.moisture_trend += TREND_SMOOTHING * (slope - self.moisture_trend)
+        self._last_sample = (now, moisture)
+
+    def _book_water(self, now: float):
+        """
+        Adds the water that reached the field since the last update to the
+        balance: measured rain (the weather station's last-hour rate over the
+        elapsed time) and the irrigation the ledger booked from pump on-time
+        x flow. Forecast rain never enters the balance; it only shapes the
+        decision and the model's forecast.
+        """
+        idx = self.field_index
+        elapsed_hours = max(0.0, now - self.water_balance.updated_at[idx]) / 3600.0
+        mm = self._observed_rain_mm_per_hour * elapsed_hours
+        delivered = self.water_ledger.totals(FIELD, self.device_name, SEASON, now)["delivered"]
+        if self._delivered_liters is not None and self.field_size > 0:
+            mm += max(0.0, delivered - self._delivered_liters) / (self.field_size * 10000.0)  # 1 mm/ha = 10,000 L
+        self._delivered_liters = delivered
+        if mm > 0:
+            self.water_balance.add_water(idx, mm, now)
 
     def calibrate_moisture(self, raw_value: int, soil_type: str = "loam") -> float:
         """
@@ -62,226 +333,569 @@ class SmartIrrigationAgent:
             # Fallback to mock if key is not set
             return self._get_mock_weather()
 
+        cached, age = WEATHER_CACHE.get()
+        if cached is not None and age < WEATHER_CACHE_SECONDS:
+            return cached
+
         url = f"http://api.openweathermap.org/data/2.5/weather?q={OPENWEATHER_CITY}&appid={OPENWEATHER_API_KEY}&units=metric"
         
         try:
-            import requests
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    "temperature": data["main"]["temp"],
-                    "humidity": data["main"]["humidity"],
-                    "rain_probability": 0 if "rain" not in data else 90, # Simplified logic as current weather API doesn't give probability easily without "One Call"
-                    "rain_forecast_24h": 0.0 # Standard API doesn't allow easy forecast, keeping 0 for safety in free tier standard call
-                }
-            else:
-                print(f"Weather API Error: {response.status_code}")
-                return self._get_mock_weather()
+            data = RESILIENCE.call("openweather.weather", lambda: _http_get_json(url))
+            weather = {
+                "temperature": data["main"]["temp"],
+                "humidity": data["main"]["humidity"],
+                "rain_probability": 0 if "rain" not in data else 90, # Simplified logic as current weather API doesn't give probability easily without "One Call"
+                "rain_forecast_24h": 0.0, # Standard API doesn't allow easy forecast, keeping 0 for safety in free tier standard call
+                "rain_1h_mm": data.get("rain", {}).get("1h", 0.0)  # measured, not forecast
+            }
+            WEATHER_CACHE.update(weather)
+            return weather
+        except CircuitOpenError:
+            pass
         except Exception as e:
             print(f"Weather Fetch Failed: {e}")
+
+        cached, age = WEATHER_CACHE.get()
+        if cached is None:
             return self._get_mock_weather()
+        return dict(cached, stale=True, age_seconds=round(age))
+
+    def get_rain_outlook(self, weather: Dict[str, Any]) -> List[float]:
+        """
+        Daily rain probability (%) over the planner's horizon, today first.
+        Without a forecast only today's weather is known and the rest of the
+        horizon counts as dry, so the plan never defers on imagined rain.
+        """
+        dry = [weather["rain_probability"]] + [0.0] * (HORIZON_DAYS - 1)
+        if "YOUR_" in OPENWEATHER_API_KEY:
+            return dry
+
+        cached, age = RAIN_OUTLOOK_CACHE.get()
+        if cached is not None and age < RAIN_OUTLOOK_CACHE_SECONDS:
+            return cached
+
+        url = f"http://api.openweathermap.org/data/2.5/forecast?q={OPENWEATHER_CITY}&appid={OPENWEATHER_API_KEY}&units=metric"
+        try:
+            outlook = daily_rain_probability(RESILIENCE.call("openweather.forecast", lambda: _http_get_json(url)))
+            RAIN_OUTLOOK_CACHE.update(outlook)
+            return outlook
+        except CircuitOpenError:
+            pass
+        except Exception as e:
+            print(f"Forecast Fetch Failed: {e}")
+        return dry
+
+    def _plan_defers(self, weather: Dict[str, Any], moisture: float) -> bool:
+        """
+        True when the fleet's horizon plan has no irrigation for this field
+        today (forecast rain or a later day covers it). Re-solves the plan on
+        the first decision of each local day; a plan made overnight only
+        counts while the sensor still reads the field above its threshold.
+        """
+        if self.planner is None:
+            return False
+        now = self.clock()
+        day = day_index(now, self.water_ledger.utc_offset_hours)
+        if day != self.planner.solved_day:
+            self.water_balance.advance_all(now)
+            self.planner.maybe_resolve(day, self.get_rain_outlook(weather))
+        idx = self.field_index
+        taw, raw = self.water_balance.taw[idx], self.water_balance.raw[idx]
+        return self.planner.planned_mm(idx) == 0.0 and taw * (1.0 - moisture / 100.0) < raw
 
     def _get_mock_weather(self):
         return {
             "temperature": 28.5,
             "humidity": 65,
             "rain_probability": 10, 
-            "rain_forecast_24h": 0.0
+            "rain_forecast_24h": 0.0,
+            "rain_1h_mm": 0.0
         }
 
     def fetch_attributes(self):
         """
-        Fetches moisture, config, AND manual override status.
+        Fetches moisture, pump state AND manual override status, plus the
+        config version; the config itself is reloaded only when that changed.
         """
-        keys = "current_moisture,config_crop_type,config_growth_stage,config_field_size,manual_override,manual_state,config_soil_type"
-        url = f"{THINGSBOARD_SERVER}/api/v1/{THINGSBOARD_ACCESS_TOKEN}/attributes?clientKeys={keys}"
+        url = (f"{THINGSBOARD_SERVER}/api/v1/{self.access_token}/attributes"
+               f"?clientKeys={HOT_KEYS},{FAULT_RESET}&sharedKeys={CONFIG_VERSION},{FAULT_RESET}")
         try:
-            import requests
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                client_data = data.get("client", {})
-                
-                # Debug: Print everything we got
-                print(f" [Debug] Raw Attributes: {client_data}")
-
-                # ... (Manual Override Check) ...
-                self.manual_mode = False
-                self.manual_cmd = "OFF"
-                
-                mo_val = client_data.get("manual_override", False)
-                if str(mo_val).lower() == "true":
-                     self.manual_mode = True
-                elif isinstance(mo_val, bool) and mo_val:
-                     self.manual_mode = True
-                     
-                if self.manual_mode:
-                     self.manual_cmd = client_data.get("manual_state", "OFF")
-                     print(f" [Debug] Manual Mode DETECTED! Cmd: {self.manual_cmd}")
-                
-                # specific moisture
-                moisture = None
-                if "current_moisture" in client_data:
-                    moisture = float(client_data["current_moisture"])
-                    
-                # Update Config if changed
-                if "config_crop_type" in client_data:
-                    self.crop_type = client_data["config_crop_type"]
-                if "config_growth_stage" in client_data:
-                    self.growth_stage = client_data["config_growth_stage"]
-                if "config_field_size" in client_data:
-                    self.field_size = float(client_data["config_field_size"])
-                # New: Soil Type
-                self.soil_type = client_data.get("config_soil_type", "Loam (Balanced)")
-                    
-                return moisture
-            else:
-                return None
+            data = RESILIENCE.call("thingsboard.attributes", lambda: _http_get_json(url))
+        except CircuitOpenError:
+            return self._cached_moisture()
         except Exception as e:
             print(f" ! Fetch Connection Error: {e}")
+            return self._cached_moisture()
+
+        client_data = data.get("client", {})
+        now = self.clock()
+        if self.config_tracker.needs_reload(version_of(data), now):
+            self.reload_config(now)
+        self._check_fault_reset(data)
+
+        # Debug: Print everything we got
+        print(f" [Debug] Raw Attributes: {client_data}")
+
+        # ... (Manual Override Check) ...
+        self.manual_mode = False
+        self.manual_cmd = "OFF"
+
+        mo_val = client_data.get("manual_override", False)
+        if str(mo_val).lower() == "true":
+             self.manual_mode = True
+        elif isinstance(mo_val, bool) and mo_val:
+             self.manual_mode = True
+
+        if self.manual_mode:
+             self.manual_cmd = client_data.get("manual_state", "OFF")
+             print(f" [Debug] Manual Mode DETECTED! Cmd: {self.manual_cmd}")
+
+        # specific moisture
+        moisture = None
+        if "current_moisture" in client_data:
+            moisture = float(client_data["current_moisture"])
+
+        # Water accounting: config is a no-op unless it changed; every
+        # pump_state sample books the on-time since the previous one
+        self.water_ledger.configure(self.device_name, self.field_size, self._kc(), self.zone, now=now)
+        if "pump_state" in client_data:
+            self.water_ledger.pump_state(self.device_name, now, client_data["pump_state"] == "ON",
+                                         manual=self.manual_mode)
+        self.water_report = self.water_usage()
+        self._observe_ack(client_data, now)
+
+        if moisture is None:
+            return self._cached_moisture()
+        self._moisture_lkg.update(moisture)
+        self.fault_detector.observe(self.device_name, self.clock(), moisture,
+                                    client_data.get("pump_state") == "ON")
+        if self.timeseries is not None:
+            pump_on = client_data["pump_state"] == "ON" if "pump_state" in client_data else None
+            self.timeseries.record(self.device_name, now, {MOISTURE: moisture, PUMP_ON: pump_on})
+        if self.exporter is not None:
+            pump_on = client_data["pump_state"] == "ON" if "pump_state" in client_data else None
+            self.exporter.add_sample(self.device_name, self.zone, now, moisture, pump_on)
+            self._export_water_day(now)
+        self.update_water_balance(moisture)
+        self.data_stale = False
+        self.data_age_seconds = 0.0
+        return moisture
+
+    def reload_config(self, now: float):
+        """
+        Downloads the field config snapshot (shared scope from provisioning,
+        client scope from the dashboard, which wins). On failure the current
+        config is kept and the reload retried next cycle.
+        """
+        keys = f"{CONFIG_KEYS},{CONFIG_VERSION}"
+        url = f"{THINGSBOARD_SERVER}/api/v1/{self.access_token}/attributes?clientKeys={keys}&sharedKeys={keys}"
+        try:
+            data = RESILIENCE.call("thingsboard.attributes", lambda: _http_get_json(url))
+        except CircuitOpenError:
+            return
+        except Exception as e:
+            print(f" ! Config Fetch Error: {e}")
+            return
+
+        config = merged_config(data)
+        if "config_crop_type" in config:
+            self.crop_type = config["config_crop_type"]
+        if "config_growth_stage" in config:
+            self.growth_stage = config["config_growth_stage"]
+        if "config_field_size" in config:
+            self.field_size = float(config["config_field_size"])
+        self.soil_type = config.get("config_soil_type", "Loam (Balanced)")
+        self.zone = config.get("config_zone", self.zone)
+        version = version_of(data)
+        self.config_tracker.loaded(version, now)
+        print(f" > Config loaded (version {version}): {self.crop_type}, {self.growth_stage}, "
+              f"{self.field_size} ha, {self.soil_type}, zone {self.zone}")
+
+    def _cached_moisture(self):
+        """
+        Fast-fail path: serve the last known good moisture with a staleness
+        flag. Returns None only if nothing was ever fetched.
+        """
+        moisture, age = self._moisture_lkg.get()
+        if moisture is None:
             return None
+        self.data_stale = True
+        self.data_age_seconds = age
+        return moisture
+
+    def water_usage(self) -> Dict[str, int]:
+        """Today's / this week's delivered water and savings vs the fixed timer (liters)."""
+        now = self.clock()
+        today = self.water_ledger.totals(FIELD, self.device_name, DAY, now)
+        week = self.water_ledger.totals(FIELD, self.device_name, WEEK, now)
+        return {
+            "water_today_liters": round(today["delivered"]),
+            "water_saved_today_liters": round(today["saved"]),
+            "water_week_liters": round(week["delivered"]),
+            "water_saved_week_liters": round(week["saved"]),
+        }
 
     def analyze_and_decide(self, current_moisture: float) -> Dict[str, Any]:
         # Always fetch weather for Dashboard visibility
+        profiling.set_stage("weather")
         weather = self.get_weather_forecast()
+        profiling.set_stage("decide")
+        self._rain_mm = (weather["rain_probability"] / 100.0) * RAIN_MM_AT_CERTAINTY
+        # A stale cached observation says nothing about rain falling now
+        self._observed_rain_mm_per_hour = 0.0 if weather.get("stale") else weather.get("rain_1h_mm", 0.0)
+        # Crop ET for the balance follows the day's weather
+        self.water_balance.set_et0(self.field_index, et0_from_weather(weather), self._kc())
         
         # --- PRIORITY 1: Manual Override ---
         if getattr(self, 'manual_mode', False):
              decision = "PUMP_" + self.manual_cmd
+             self._pump_on = decision == "PUMP_ON"
              return {
                 "decision": decision,
                 "duration_seconds": 60, 
-                "reason": f"MANUAL OVERRIDE: User forced Pump {self.manual_cmd}",
+                "reason_code": REASON_MANUAL,
                 "soil_moisture_percent": current_moisture,
                 "weather_summary": weather,
                 "alerts": ["⚠️ Manual Control Active"],
-                "timestamp": datetime.now().isoformat(),
-                "liters_for_field": 0
+                "timestamp": int(time.time() * 1000),
+                "liters_for_field": 0,
+                "data_stale": self.data_stale,
+                **self.water_report
              }
 
         # Initialize Defaults
         decision = "PUMP_OFF"
         duration = 0
-        reason = "Monitoring..."
+        reason_code = REASON_OK
         alerts = []
         
         # Recalculate Kc based on dynamic settings
-        kc = CROP_COEFFICIENTS.get(self.crop_type, {}).get(self.growth_stage, 1.0)
+        kc = self._kc()
         water_demand_mm = BASE_ET0 * kc
-        soil_factor = max(0.0, min(1.0, (current_moisture - 40) / 40.0))
-        expected_rain_mm = (weather["rain_probability"] / 100.0) * 15.0
-        net_demand_mm = max(0.0, water_demand_mm * (1 - (soil_factor * 0.8)) - expected_rain_mm)
+        soil_factor = max(0.0, min(1.0, (current_moisture - SOIL_CREDIT_FROM_PERCENT) / SOIL_CREDIT_SPAN_PERCENT))
+        expected_rain_mm = (weather["rain_probability"] / 100.0) * RAIN_MM_AT_CERTAINTY
+        net_demand_mm = max(0.0, water_demand_mm * (1 - (soil_factor * SOIL_CREDIT_MAX)) - expected_rain_mm)
         liters_needed = round(net_demand_mm * 10000 * self.field_size) 
 
+        # Learned 24h forecast if the pump stays off (None until the field's model is trained)
+        moisture_forecast = None
+        if self.moisture_model is not None:
+            moisture_forecast = self.moisture_model.predict(
+                self.model_index, current_moisture, False, *self._model_conditions())
+
+        forecast_dry = moisture_forecast is not None and moisture_forecast < FORECAST_DRY_PERCENT
+
         print(f" [Calc] Moisture: {current_moisture}% | Rain Prob: {weather['rain_probability']}% | Demand: {net_demand_mm:.2f}mm")
 
-        # --- PRIORITY 2: Rain Lockout ---
+        if self.data_stale:
+             alerts.append(f"⚠️ Using cached sensor data ({self.data_age_seconds:.0f}s old)")
+        faults = self.fault_detector.faults(self.device_name)
+        alerts.extend(f"⚠️ {text}" for text in faults.values())
+
+        # --- PRIORITY 2: Sensor / Pump Fault Lockout ---
+        # An invalid reading or a pump that doesn't wet the soil would have us
+        # order water forever. Rail / flatline faults are alerts only: the
+        # firmware's self-calibration reports a truly dry field as 0%.
+        if self.fault_detector.lockout(self.device_name):
+             decision = "PUMP_OFF"
+             reason_code = REASON_FAULT
+
+        # --- PRIORITY 3: Stale Data Lockout ---
+        # Never start the pump on a reading we can no longer trust.
+        elif self.data_stale and self.data_age_seconds > MAX_STALE_SECONDS:
+             decision = "PUMP_OFF"
+             reason_code = REASON_STALE
+
+        # --- PRIORITY 4: Rain Lockout ---
         # If High Rain Chance (>60%), STOP everything (unless manual).
-        if weather['rain_probability'] > 60:
+        elif weather['rain_probability'] > RAIN_LOCKOUT_PERCENT:
              decision = "PUMP_OFF"
-             reason = f"Rain likely ({weather['rain_probability']}%). Skipping irrigation."
+             reason_code = REASON_RAIN
         
-        # --- PRIORITY 3: Critical Dryness ---
+        # --- PRIORITY 5: Critical Dryness ---
         # If no rain risk, but soil is unbelievably dry (<30%), EMERGENCY WATERING.
-        elif current_moisture < 30:
+        elif current_moisture < CRITICAL_MOISTURE_PERCENT:
              decision = "PUMP_ON"
              duration = 30 
-             reason = f"EMERGENCY: Soil dangerously dry ({current_moisture}%). Forcing irrigation."
-             alerts.append("Critical: Soil < 30%")
+             reason_code = REASON_DRY
+             alerts.append(f"Critical: Soil < {CRITICAL_MOISTURE_PERCENT}%")
 
-        # --- PRIORITY 4: Standard AI Logic ---
-        # Normal operation range
-        elif net_demand_mm > 1.0: 
+        # --- PRIORITY 6: Standard AI Logic ---
+        # Normal operation range, unless the day's horizon plan defers the
+        # water to forecast rain or a later day (and no dry spell is forecast)
+        elif net_demand_mm > NEED_DEMAND_MM and not forecast_dry and self._plan_defers(weather, current_moisture):
+             decision = "PUMP_OFF"
+             reason_code = REASON_OK
+             alerts.append("Plan: irrigation deferred (forecast rain / later days cover demand)")
+        elif net_demand_mm > NEED_DEMAND_MM: 
              decision = "PUMP_ON"
              duration = int(net_demand_mm * 300) 
-             reason = f"Need {net_demand_mm:.1f}mm for {self.crop_type}. Input: {liters_needed}L"
+             reason_code = REASON_NEED
+
+        # --- PRIORITY 7: Forecast Dryness ---
+        # Formula says wait, but this field's learned behaviour says it will be
+        # critically dry by tomorrow: start a short cycle now.
+        elif forecast_dry:
+             decision = "PUMP_ON"
+             duration = int(max(net_demand_mm, NEED_DEMAND_MM) * 300)
+             reason_code = REASON_NEED
+             alerts.append(f"Forecast: soil {moisture_forecast:.0f}% within 24h")
         else:
              decision = "PUMP_OFF"
-             reason = f"Moisture sufficient ({current_moisture}%). {self.crop_type} is happy."
+             reason_code = REASON_OK
+
+        self._pump_on = decision == "PUMP_ON"
 
         # 3. Construct Output
         result = {
             "decision": decision,
             "duration_seconds": duration,
-            "reason": reason,
+            "reason_code": reason_code,
             "soil_moisture_percent": current_moisture,
             "weather_summary": weather,
             "alerts": alerts,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": int(time.time() * 1000),
             "liters_for_field": liters_needed,
+            "data_stale": self.data_stale,
+            # Time until the root zone reaches its irrigation trigger (RAW)
+            "hours_to_threshold": self.water_balance.hours_to_threshold(self.field_index),
+            "moisture_forecast_24h": moisture_forecast,
+            **self.water_report,
             "config_used": {
                 "crop": self.crop_type,
                 "stage": self.growth_stage,
+                "soil": self.soil_type,
                 "kc": kc
             }
         }
         
         return result
 
-    def run_forever(self, interval=60):
+    def run_cycle(self):
+        """
+        One fetch -> decide -> push pass. Returns the decision, or None when
+        no moisture reading has ever been available.
+        """
+        profiling.check()
+        profiling.set_stage("fetch")
+        real_moisture = self.fetch_attributes()
+
+        if real_moisture is None:
+            profiling.set_stage(None)
+            print(f"\n--- Cycle Skipped ({datetime.now().strftime('%H:%M:%S')}): no moisture data yet ---")
+            return None
+
+        print(f"\n--- Cycle Start ({datetime.now().strftime('%H:%M:%S')}) ---")
+        # Log all config including new Soil Type
+        print(f"Config: {self.crop_type} | {self.growth_stage} | {self.soil_type} | {self.field_size}ha")
+        if self.data_stale:
+            print(f"Input Moisture (Cached, {self.data_age_seconds:.0f}s old): {real_moisture}%")
+        else:
+            print(f"Input Moisture (From Cloud): {real_moisture}%")
+        result = self.analyze_and_decide(real_moisture)
+        if self.timeseries is not None:
+            self.timeseries.record(self.device_name, self.clock(), {DECISION_ON: result["decision"] == "PUMP_ON"})
+        if self.exporter is not None:
+            self.exporter.add_decision(self.device_name, self.zone, result)
+
+        profiling.set_stage("push")
+        self.push_decision_to_thingsboard(result)
+        profiling.set_stage(None)
+
+        print(f"Decision: {result['decision']}")
+        for alert in result['alerts']:
+            print(f" ! {alert}")
+        if self.actuation.unconfirmed(self.device_name):
+            print(" ! Device is not acknowledging decisions (check connectivity / firmware)")
+        attributes = dict(self.build_decision_payload(result), manual_state=self.manual_cmd)
+        print(f"Reason: {describe_reason(result['reason_code'], attributes, self.crop_type)}")
+        if result['decision'] == 'PUMP_ON':
+            print(f"Duration: {result['duration_seconds']}s")
+        if 'hours_to_threshold' in result:
+            print(f"Root zone reaches trigger in ~{result['hours_to_threshold']:.1f}h")
+        if 'water_saved_today_liters' in result:
+            print(f"Water today: {result['water_today_liters']:,} L (saved {result['water_saved_today_liters']:,} L vs timer)")
+        if result.get('moisture_forecast_24h') is not None:
+            print(f"Model forecast (24h, pump off): {result['moisture_forecast_24h']:.1f}%")
+        return result
+
+    def run_forever(self, interval=60, adaptive=False, checkpointer=None):
         print(f"--- Smart Irrigation Agent v2.2 (Low Latency) ---")
-        print(f"Starting Poll Loop (Interval: {interval}s)")
+        if adaptive:
+            print(f"Starting Adaptive Poll Loop (Min Interval: {interval}s)")
+        else:
+            print(f"Starting Poll Loop (Interval: {interval}s)")
         print(f"Press Ctrl+C to stop.")
         
         try:
             while True:
-                real_moisture = self.fetch_attributes()
-                
-                if real_moisture is not None:
-                     print(f"\n--- Cycle Start ({datetime.now().strftime('%H:%M:%S')}) ---")
-                     # Log all config including new Soil Type
-                     print(f"Config: {self.crop_type} | {self.growth_stage} | {self.soil_type} | {self.field_size}ha")
-                     print(f"Input Moisture (From Cloud): {real_moisture}%")
-                     result = self.analyze_and_decide(real_moisture)
+                result = self.run_cycle()
+                if checkpointer is not None:
+                    checkpointer.maybe_save()
+                if adaptive:
+                    wait = next_check_seconds(self, result, min_interval=interval)
+                    print(f"Next check in {wait:.0f}s")
+                    self.wait(wait)
                 else:
-                    # Fallback
-                    import random
-                    mock_moisture = random.randint(30, 90)
-                    print(f"\n--- Cycle Start (Simulated) ---")
-                    print(f"Using Config: {self.crop_type}")
-                    result = self.analyze_and_decide(mock_moisture)
-                
-                self.push_decision_to_thingsboard(result)
-                
-                print(f"Decision: {result['decision']}")
-                if result['decision'] == 'PUMP_ON':
-                    print(f"Duration: {result['duration_seconds']}s")
-                
-                time.sleep(interval)
+                    self.wait(interval)
                 
         except KeyboardInterrupt:
             print("\nStopping Agent...")
+            if checkpointer is not None:
+                checkpointer.save()
+            if self.timeseries is not None:
+                self.timeseries.flush()
+            if self.exporter is not None:
+                self.exporter.flush()
+            if self.uploader is not None:
+                self.uploader.close()
+
+    def _export_water_day(self, now: float):
+        """Exports yesterday's water totals once the ledger's day rolls over."""
+        today = day_index(now, self.water_ledger.utc_offset_hours)
+        if self._export_day is not None and today > self._export_day:
+            totals = self.water_ledger.totals(FIELD, self.device_name, DAY, now, at=now - 86400)
+            self.exporter.add_water_day(self.device_name, self.zone, date(1970, 1, 1) + timedelta(days=today - 1),
+                                        totals)
+        self._export_day = today
+
+    def _check_fault_reset(self, data: Dict[str, Any]):
+        """Clears the field's faults when fault_reset changed since the last fetch."""
+        values = [data.get(scope, {}).get(FAULT_RESET) for scope in ("client", "shared")]
+        reset = max((v for v in values if v is not None), default=None)
+        # The first fetch of a cold start only records the value: it starts without faults
+        if self._fault_reset_seen and reset is not None and reset != self._fault_reset:
+            self.fault_detector.clear(self.device_name)
+            print(" > Faults cleared by operator reset.")
+        self._fault_reset, self._fault_reset_seen = reset, True
+
+    def _observe_ack(self, client_data: Dict[str, Any], now: float):
+        ack, acked_at = client_data.get("decision_ack"), client_data.get("decision_ack_ts")
+        self.actuation.observe(self.device_name, int(ack) if ack is not None else None,
+                               client_data.get("pump_state"), now,
+                               acked_at=acked_at / 1000.0 if acked_at is not None else None)
+
+    def wait(self, seconds: float):
+        """Sleeps until the next cycle, waking early to confirm / re-send an unacknowledged decision."""
+        deadline = time.time() + seconds
+        while True:
+            remaining = deadline - time.time()
+            due = self.actuation.resend_due_in(self.device_name, self.clock())
+            if due is None or due >= remaining:
+                profiling.sleep(max(0.0, remaining))
+                return
+            profiling.sleep(due)
+            self.confirm_or_resend()
+
+    def confirm_or_resend(self):
+        """Re-reads the device's ack; re-sends the last decision if it is still unacknowledged."""
+        url = f"{THINGSBOARD_SERVER}/api/v1/{self.access_token}/attributes?clientKeys=decision_ack,decision_ack_ts,pump_state"
+        try:
+            client_data = RESILIENCE.call("thingsboard.attributes", lambda: _http_get_json(url)).get("client", {})
+            self._observe_ack(client_data, self.clock())
+        except Exception:
+            pass  # re-send anyway: the decision may never have arrived
+        now = self.clock()
+        if self.actuation.resend_due_in(self.device_name, now) != 0 or self.last_pushed is None:
+            return
+        if self.actuation.resent(self.device_name, now):
+            print(" ! Device has not acknowledged the last decision after all re-sends")
+        if self.uploader is not None:
+            self.uploader.add_attributes(self.device_name, self.last_pushed)
+            return
+        url = f"{THINGSBOARD_SERVER}/api/v1/{self.access_token}/attributes"
+        try:
+            RESILIENCE.call("thingsboard.push", lambda: _http_post_raw(url, dumps(self.last_pushed)))
+            print(" > Unacknowledged decision re-sent.")
+        except Exception as e:
+            print(f" ! Re-send failed: {e}")
+
+    def build_decision_payload(self, decision_data) -> Dict[str, Any]:
+        # Compact payload: short reason code + epoch-ms timestamp, text is
+        # derived dashboard-side (payload_codec.describe_reason)
+        if self.encoder.field_size != self.field_size:
+            self.encoder.set_field_size(self.field_size)
+        return self.encoder.encode_dict(decision_data)
 
     def push_decision_to_thingsboard(self, decision_data):
+        self.last_pushed = self.build_decision_payload(decision_data)
+        # Tracked from the first attempt; a failed push is re-sent like an unacknowledged one
+        self.actuation.pushed(self.device_name, decision_data["timestamp"], decision_data["decision"] == "PUMP_ON",
+                              self.clock())
+
+        if self.uploader is not None:
+            self.uploader.add_attributes(self.device_name, self.last_pushed)
+            print(" > Decision queued for batched upload.")
+            return
+
+        if self.encoder.field_size != self.field_size:
+            self.encoder.set_field_size(self.field_size)
+        body = self.encoder.encode(decision_data)
+
         # Use the new access key in the URL
-        url = f"{THINGSBOARD_SERVER}/api/v1/{THINGSBOARD_ACCESS_TOKEN}/attributes"
-        
-        # Construct rich payload
-        payload = {
-            "pump_decision": decision_data["decision"],
-            "pump_duration": decision_data["duration_seconds"],
-            "ai_reason": decision_data["reason"],
-            # Flatten weather for direct dashboard access
-            "ai_weather_temp": decision_data["weather_summary"]["temperature"],
-            "ai_weather_rain": decision_data["weather_summary"]["rain_probability"],
-            "last_decision_ts": decision_data["timestamp"],
-            # New Water Stats
-            "liters_total": decision_data["liters_for_field"],
-            "liters_per_ha": int(decision_data["liters_for_field"] / self.field_size) if self.field_size > 0 else 0
-        }
+        url = f"{THINGSBOARD_SERVER}/api/v1/{self.access_token}/attributes"
         
         try:
-            import requests # Import here to ensure it's available
-            response = requests.post(url, json=payload)
-            if response.status_code == 200:
-                print(" > Command & Context sent to Cloud.")
-            else:
-                print(f" ! Failed to send command: {response.text}")
+            RESILIENCE.call("thingsboard.push", lambda: _http_post_raw(url, body))
+            print(" > Command & Context sent to Cloud.")
+        except CircuitOpenError:
+            print(" ! ThingsBoard circuit open, decision not sent.")
         except Exception as e:
-            print(f" ! Connection Error: {e}")
+            print(f" ! Failed to send command: {e}")
 
 if __name__ == "__main__":
-    agent = SmartIrrigationAgent()
-    # Run every 2 seconds for ultra-low latency
-    agent.run_forever(interval=2)
+    # On-demand profiling: `kill -USR1 <pid>` (sampling) / `-USR2` (cProfile),
+    # or set AGENT_ADMIN_PORT for http://127.0.0.1:<port>/profile/start
+    import logging
+    logging.basicConfig(format="%(message)s")
+    profiling.log.setLevel(logging.INFO)
+    profiling.install_signal_handlers()
+    if os.environ.get("AGENT_ADMIN_PORT"):
+        profiling.start_admin_server(int(os.environ["AGENT_ADMIN_PORT"]))
+
+    # Warm restart: resume from the last checkpoint when one is fresh enough.
+    # checkpoint.py works on the importable `decision_core` module (not this
+    # __main__ copy), so build the agent from there to share its caches.
+    import decision_core
+    from checkpoint import CHECKPOINT_PATH, Checkpointer, load_checkpoint
+    checkpoint_path = os.environ.get("AGENT_CHECKPOINT", CHECKPOINT_PATH)
+    # AGENT_GATEWAY_TOKEN=<gateway access token> sends decisions as gateway-API batches
+    # (spilled to disk during outages) under the device name AGENT_DEVICE_NAME
+    uploader = None
+    if os.environ.get("AGENT_GATEWAY_TOKEN"):
+        from gateway_batcher import GatewayBatcher, http_transport
+        uploader = GatewayBatcher(http_transport(THINGSBOARD_SERVER, os.environ["AGENT_GATEWAY_TOKEN"])).start()
+    restored = load_checkpoint(checkpoint_path, uploader=uploader)
+    # AGENT_MOISTURE_MODEL=1 adds the learned 24h moisture forecast to decisions
+    use_model = bool(os.environ.get("AGENT_MOISTURE_MODEL"))
+    if restored:
+        agent = restored[0]
+        # Keep the restored model's training, but honour the setting either way
+        if not use_model:
+            agent.set_moisture_model(None)
+        elif agent.moisture_model is None:
+            agent.set_moisture_model(MoistureModel())
+        agent.resume_from_cache()
+    else:
+        agent = decision_core.SmartIrrigationAgent(device_name=os.environ.get("AGENT_DEVICE_NAME"), uploader=uploader,
+                                                   moisture_model=MoistureModel() if use_model else None)
+    # Chart history for the dashboards (AGENT_TIMESERIES="" turns it off)
+    timeseries_path = os.environ.get("AGENT_TIMESERIES", TIMESERIES_PATH)
+    if timeseries_path:
+        agent.timeseries = TimeSeriesStore(timeseries_path)
+    # Decision ack / actuation latency percentiles and histograms on /metrics
+    profiling.register_metrics("actuation", agent.actuation.report)
+    # AGENT_EXPORT_DIR=exports writes decisions / telemetry / water use as Parquet for analytics
+    # (needs the optional pyarrow; without it the agent runs on and exports nothing)
+    if os.environ.get("AGENT_EXPORT_DIR"):
+        from columnar_export import ColumnarExporter, ColumnarUnavailable
+        try:
+            agent.exporter = ColumnarExporter(os.environ["AGENT_EXPORT_DIR"],
+                                              utc_offset_hours=agent.water_ledger.utc_offset_hours)
+        except ColumnarUnavailable as e:
+            print(f" ! Export disabled: {e}")
+    # 2 seconds while pumping / in override, backing off as moisture allows
+    # AGENT_HORIZON_PLANNER=1 defers irrigation the 7-day plan covers with forecast rain / later days
+    if os.environ.get("AGENT_HORIZON_PLANNER"):
+        agent.planner = HorizonPlanner(agent.water_balance)
+    agent.run_forever(interval=2, adaptive=True, checkpointer=Checkpointer(checkpoint_path, [agent]))
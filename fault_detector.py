@@ -0,0 +1,226 @@
+"""
+Streaming sensor / pump fault detection.
+
+Consumes (device, timestamp, moisture %, pump on) samples one at a time and
+keeps a small fixed amount of state per device, so it can sit on the fleet's
+telemetry path. Detects:
+
+    STUCK        reading pinned at 0/100 % (or out of range / not a number)
+    FLATLINE     reading has not changed at all for hours
+    JUMP         reading far from the recent median within minutes
+    NO_RESPONSE  pump has run (over one or many cycles) without moisture rising
+
+Faults latch until the data shows they are gone (the reading moves, leaves
+the rail, stays consistent, or rises again) or clear() is called (the
+agent does so when the `fault_reset` attribute changes).
+
+Only LOCKOUT_FAULTS hold the pump OFF (lockout()). STUCK at a rail and
+FLATLINE are alerts: the ESP32 firmware rescales on the fly
+(map(raw, soilMax, soilMin, 0, 100)), so a field that really is the
+driest it has been reads exactly 0 %, and integer-percent readings can
+sit unchanged for hours. Whether such a sensor is broken shows once the
+pump runs: no rise raises NO_RESPONSE. Readings that are not a number or
+out of range raise INVALID, which does lock out.
+
+While a device is locked out the agent holds its pump OFF, so a pump
+fault could never disprove itself: NO_RESPONSE expires after
+NO_RESPONSE_RETRY_SECONDS instead, which lets the pump run one more
+RESPONSE_SECONDS probe. If that still does not wet the soil, the fault
+is raised again.
+"""
+import math
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+STUCK = "STUCK"
+INVALID = "INVALID"
+FLATLINE = "FLATLINE"
+JUMP = "JUMP"
+NO_RESPONSE = "NO_RESPONSE"
+
+# Faults that hold the pump OFF; the rest are alerts only
+LOCKOUT_FAULTS = (INVALID, JUMP, NO_RESPONSE)
+
+FAULT_TEXT = {
+    STUCK: "Sensor stuck at {value:.0f}% (check YL-69 wiring)",
+    INVALID: "Sensor reading invalid ({value}) (check YL-69 wiring)",
+    FLATLINE: "Sensor flatlined at {value:.1f}% for {hours:.1f}h",
+    JUMP: "Implausible moisture jump to {value:.0f}% (recent median {median:.0f}%)",
+    NO_RESPONSE: "Pump ran {minutes:.0f} min but moisture not rising (leak / dry well?)",
+}
+
+# --- Detector Tuning ---
+WINDOW_SIZE = 8                # recent samples kept per device for the jump median
+RAIL_LOW, RAIL_HIGH = 0.5, 99.5
+STUCK_SECONDS = 600            # pinned at a rail this long = stuck
+FLATLINE_SECONDS = 3 * 3600    # no change at all this long = flatline
+FLATLINE_EPSILON = 0.01
+MAX_JUMP_PERCENT = 30.0        # deviation from the recent median...
+JUMP_SECONDS = 300             # ...within this many seconds of the previous sample
+JUMP_CLEAR_SAMPLES = 5         # consistent samples before a jump fault clears
+RESPONSE_SECONDS = 900         # pump run time (summed over cycles) that must raise moisture...
+MIN_RESPONSE_PERCENT = 2.0     # ...by at least this much above its lowest point
+NO_RESPONSE_RETRY_SECONDS = 6 * 3600  # pump fault lockout before the pump is probed again
+
+
+class _DeviceState:
+    __slots__ = ("window", "last_ts", "last_value", "changed_ts", "rail_since",
+                 "pump_on", "pump_seconds", "pump_base", "clean_samples", "faults", "no_response_at")
+
+    def __init__(self):
+        self.window = deque(maxlen=WINDOW_SIZE)
+        self.last_ts = None
+        self.last_value = None
+        self.changed_ts = None
+        self.rail_since = None
+        self.pump_on = False
+        self.pump_seconds = 0.0  # pump run time since moisture last rose
+        self.pump_base = None    # lowest moisture since it last rose
+        self.clean_samples = 0
+        self.faults: Dict[str, str] = {}
+        self.no_response_at = None  # when NO_RESPONSE was raised
+
+
+class FaultDetector:
+    """Per-device streaming fault detector; one instance can serve a whole fleet."""
+
+    def __init__(self):
+        self.devices: Dict[str, _DeviceState] = {}
+        self.samples = 0
+        self.raised = 0
+
+    def observe(self, device: str, ts: float, moisture: float, pump_on: bool) -> List[str]:
+        """Processes one sample; returns fault codes newly raised by it."""
+        state = self.devices.get(device)
+        if state is None:
+            state = self.devices[device] = _DeviceState()
+        self.samples += 1
+        faults = state.faults
+        new = []
+
+        # --- Invalid: non-numbers or out of range ---
+        if moisture is None or math.isnan(moisture) or not -1.0 <= moisture <= 101.0:
+            if INVALID not in faults:
+                faults[INVALID] = FAULT_TEXT[INVALID].format(value=moisture)
+                new.append(INVALID)
+                self.raised += 1
+            state.last_ts = ts
+            return new
+        faults.pop(INVALID, None)
+
+        # --- Stuck: pinned at a rail ---
+        if moisture <= RAIL_LOW or moisture >= RAIL_HIGH:
+            if state.rail_since is None:
+                state.rail_since = ts
+            elif ts - state.rail_since >= STUCK_SECONDS and STUCK not in faults:
+                faults[STUCK] = FAULT_TEXT[STUCK].format(value=moisture)
+                new.append(STUCK)
+        else:
+            state.rail_since = None
+            faults.pop(STUCK, None)
+
+        # --- Flatline: no change at all for hours ---
+        if state.last_value is None or abs(moisture - state.last_value) > FLATLINE_EPSILON:
+            state.changed_ts = ts
+            faults.pop(FLATLINE, None)
+        elif ts - state.changed_ts >= FLATLINE_SECONDS and FLATLINE not in faults:
+            faults[FLATLINE] = FAULT_TEXT[FLATLINE].format(value=moisture, hours=(ts - state.changed_ts) / 3600)
+            new.append(FLATLINE)
+
+        # --- Jump: far from the recent median, too fast to be physical ---
+        window = state.window
+        if len(window) >= 3 and state.last_ts is not None and ts - state.last_ts <= JUMP_SECONDS:
+            median = sorted(window)[len(window) // 2]
+            if abs(moisture - median) > MAX_JUMP_PERCENT:
+                state.clean_samples = 0
+                if JUMP not in faults:
+                    faults[JUMP] = FAULT_TEXT[JUMP].format(value=moisture, median=median)
+                    new.append(JUMP)
+            elif JUMP in faults:
+                state.clean_samples += 1
+                if state.clean_samples >= JUMP_CLEAR_SAMPLES:
+                    del faults[JUMP]
+        window.append(moisture)
+
+        # --- Pumping without response ---
+        if NO_RESPONSE in faults and ts - state.no_response_at >= NO_RESPONSE_RETRY_SECONDS:
+            # Lockout over: let the agent probe with one more pump window
+            del faults[NO_RESPONSE]
+            state.pump_seconds = 0.0
+            state.pump_base = moisture
+        if state.pump_base is None or moisture < state.pump_base:
+            state.pump_base = moisture
+        if moisture - state.pump_base >= MIN_RESPONSE_PERCENT:
+            # Soil took water (pump, repair, manual watering or rain): start over
+            state.pump_seconds = 0.0
+            state.pump_base = moisture
+            faults.pop(NO_RESPONSE, None)
+        elif state.pump_on and state.last_ts is not None:
+            # The pump state reported last time covers the interval since then
+            state.pump_seconds += ts - state.last_ts
+            if state.pump_seconds >= RESPONSE_SECONDS and NO_RESPONSE not in faults:
+                faults[NO_RESPONSE] = FAULT_TEXT[NO_RESPONSE].format(minutes=state.pump_seconds / 60)
+                state.no_response_at = ts
+                new.append(NO_RESPONSE)
+        state.pump_on = pump_on
+
+        state.last_ts = ts
+        state.last_value = moisture
+        self.raised += len(new)
+        return new
+
+    def observe_many(self, samples: Iterable[Tuple[str, float, float, bool]]) -> int:
+        """Ingest path: processes (device, ts, moisture, pump_on) rows; returns faults raised."""
+        raised = 0
+        observe = self.observe
+        for device, ts, moisture, pump_on in samples:
+            if observe(device, ts, moisture, pump_on):
+                raised += 1
+        return raised
+
+    def faults(self, device: str) -> Dict[str, str]:
+        """Active faults for a device: code -> alert text."""
+        state = self.devices.get(device)
+        return dict(state.faults) if state is not None else {}
+
+    def lockout(self, device: str) -> Dict[str, str]:
+        """Active faults that must hold the pump OFF (LOCKOUT_FAULTS)."""
+        state = self.devices.get(device)
+        if state is None:
+            return {}
+        return {code: text for code, text in state.faults.items() if code in LOCKOUT_FAULTS}
+
+    def suppress_irrigation(self, device: str) -> bool:
+        return bool(self.lockout(device))
+
+    def clear(self, device: str, code: Optional[str] = None):
+        """Operator reset after a repair; clears one fault or all of them."""
+        state = self.devices.get(device)
+        if state is None:
+            return
+        if code is None:
+            state.faults.clear()
+        else:
+            state.faults.pop(code, None)
+        # Give the pump a fresh response window from the latest reading
+        state.pump_seconds = 0.0
+        state.pump_base = state.last_value
+
+    # --- Persistence (checkpoint.py) ---
+    def to_state(self) -> Dict[str, list]:
+        """JSON-safe per-device state, so active faults and lockouts survive a restart."""
+        return {device: [list(state.window) if name == "window" else getattr(state, name)
+                         for name in _DeviceState.__slots__]
+                for device, state in self.devices.items()}
+
+    @classmethod
+    def from_state(cls, devices: Dict[str, list]) -> "FaultDetector":
+        detector = cls()
+        for device, values in devices.items():
+            state = detector.devices[device] = _DeviceState()
+            for name, value in zip(_DeviceState.__slots__, values):
+                if name == "window":
+                    state.window.extend(value)
+                else:
+                    setattr(state, name, value)
+        return detector
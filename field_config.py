@@ -0,0 +1,77 @@
+"""
+Versioned field configuration snapshots.
+
+A field's config (crop, growth stage, size, soil, zone) is written as one
+snapshot: the config_* attributes plus `config_version`, a number that
+increases with every write. Agents read only config_version alongside
+moisture each cycle and download the full config when it changes, instead
+of re-fetching every config key every cycle.
+
+Config can live in both attribute scopes (shared: bulk provisioning,
+client: the dashboard), so the version an agent tracks is the pair
+(shared version, client version), and each key is taken from the scope
+whose snapshot is newer.
+"""
+import time
+from typing import Any, Dict, Optional, Tuple
+
+CONFIG_VERSION = "config_version"
+CONFIG_KEYS = "config_crop_type,config_growth_stage,config_field_size,config_soil_type,config_zone"
+# Writers that predate versioning publish no config_version; their config
+# is re-read on this interval instead
+UNVERSIONED_RELOAD_SECONDS = 300
+
+Version = Tuple[Optional[int], Optional[int]]
+
+
+def next_version(previous: Optional[int] = None) -> int:
+    """Epoch milliseconds, bumped past `previous` so versions never repeat or go back."""
+    version = int(time.time() * 1000)
+    if previous is not None:
+        version = max(version, int(previous) + 1)
+    return version
+
+
+def snapshot(config: Dict[str, Any], previous_version: Optional[int] = None) -> Dict[str, Any]:
+    """Attributes to post for a config write: the config_* keys plus the next version."""
+    return dict(config, **{CONFIG_VERSION: next_version(previous_version)})
+
+
+def version_of(data: Dict[str, Any]) -> Version:
+    """(shared, client) config_version from an attributes response."""
+    return (data.get("shared", {}).get(CONFIG_VERSION), data.get("client", {}).get(CONFIG_VERSION))
+
+
+def merged_config(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Config from an attributes response. Each key comes from the scope with
+    the higher config_version, so a provisioning run after a dashboard edit
+    takes effect (and vice versa); keys only one scope has come from it. A
+    scope without a version counts as older; on a tie client scope wins.
+    """
+    shared, client = data.get("shared", {}), data.get("client", {})
+    shared_version, client_version = version_of(data)
+    if shared_version is not None and (client_version is None or int(shared_version) > int(client_version)):
+        return dict(client, **shared)
+    return dict(shared, **client)
+
+
+class ConfigTracker:
+    """Decides when an agent has to reload its config."""
+
+    def __init__(self, unversioned_reload_seconds: float = UNVERSIONED_RELOAD_SECONDS):
+        self.unversioned_reload_seconds = unversioned_reload_seconds
+        self.version: Optional[Version] = None
+        self.loaded_at: Optional[float] = None
+        self.reloads = 0
+
+    def needs_reload(self, version: Version, now: float) -> bool:
+        if self.loaded_at is None or version != self.version:
+            return True
+        # Nothing versioned to compare: fall back to a slow periodic re-read
+        return version == (None, None) and now - self.loaded_at >= self.unversioned_reload_seconds
+
+    def loaded(self, version: Version, now: float):
+        self.version = version
+        self.loaded_at = now
+        self.reloads += 1
@@ -20,6 +20,7 @@ LiquidCrystal_I2C lcd(0x27, 16, 2); // I2C address 0x27, 16x2 LCD
 
 int soilMin = 4095; // wettest observed
 int soilMax = 0;     // driest observed
+String decisionAck = ""; // last_decision_ts of the newest cloud decision applied (echoed as decision_ack)
 
 void setup() {
   Serial.begin(115200);
@@ -69,8 +70,8 @@ void loop() {
   
   if (WiFi.status() == WL_CONNECTED) {
      HTTPClient http;
-     // Poll for 'pump_decision' attribute
-     String attrUrl = String(TB_SERVER) + "/api/v1/" + String(TB_TOKEN) + "/attributes?clientKeys=pump_decision";
+     // Poll for 'pump_decision' attribute (+ its id, to acknowledge it)
+     String attrUrl = String(TB_SERVER) + "/api/v1/" + String(TB_TOKEN) + "/attributes?clientKeys=pump_decision,last_decision_ts";
      http.begin(attrUrl);
      int httpCode = http.GET();
      
@@ -93,6 +94,15 @@ void loop() {
            lcd.setCursor(0, 1); lcd.print("Pump: OFF (Cloud)");
            cloudControl = true;
         }
+
+        // Remember which decision was applied: digits after "last_decision_ts":
+        int idPos = response.indexOf("\"last_decision_ts\":");
+        if (cloudControl && idPos != -1) {
+           int start = idPos + 19;
+           int end = start;
+           while (end < (int)response.length() && isDigit(response.charAt(end))) end++;
+           if (end > start) decisionAck = response.substring(start, end);
+        }
      } else {
         Serial.print("Attr fetch failed: ");
         Serial.println(httpCode);
@@ -116,7 +126,9 @@ void loop() {
      http.addHeader("Content-Type", "application/json");
      // Fix: Send pump_state here so Dashboard sees it!
      String attrPayload = "{\"current_moisture\":" + String(soilPercent) + 
-                          ", \"pump_state\":\"" + realState + "\"}";
+                          ", \"pump_state\":\"" + realState + "\"";
+     if (decisionAck.length() > 0) attrPayload += ", \"decision_ack\":" + decisionAck;
+     attrPayload += "}";
      http.POST(attrPayload);
      http.end();
   }
@@ -0,0 +1,135 @@
+import os
+import time
+import streamlit as st
+import pandas as pd
+from payload_codec import format_ts
+from fleet_snapshot import source_from_env, STATUS_ORDER, SORTABLE, PAGE_SIZE
+
+# --- CONFIGURATION ---
+# FLEET_DEVICES: inventory file (CSV name,token,zone or JSON); TB_SERVER as in iot_dashboard
+# Seconds between automatic reruns; 0 disables auto-refresh (benchmarks, tests)
+REFRESH_SECONDS = float(os.environ.get("DASHBOARD_REFRESH_SECONDS", "10"))
+ALERT_STATUSES = ("FAULT", "STALE", "DRY")
+
+st.set_page_config(
+    page_title="Irrigation Fleet Overview",
+    page_icon=None,
+    layout="wide"
+)
+
+
+# One source per server process: every viewer reads the same snapshot, and
+# ThingsBoard is polled by one background refresher, not by each session.
+@st.cache_resource
+def get_source():
+    return source_from_env()
+
+
+if not os.environ.get("FLEET_DEVICES"):
+    st.title("Irrigation Fleet Overview")
+    st.warning("Set FLEET_DEVICES to the fleet inventory file (CSV: name,token,zone).")
+    st.stop()
+
+source = get_source()
+snapshot = source.get()
+if snapshot is None:
+    # First fetch of the fleet is still running (in the background)
+    st.title("Irrigation Fleet Overview")
+    st.progress(source.progress, text=f"Loading fleet snapshot: {source.fetched:,} of {len(source.devices):,} fields")
+    time.sleep(1)
+    st.rerun()
+totals = snapshot.totals
+counts = snapshot.status_counts
+
+# --- SIDEBAR FILTERS ---
+with st.sidebar:
+    st.header("Filter")
+    statuses = st.multiselect("Status", list(STATUS_ORDER))
+    zones = st.multiselect("Zone", snapshot.zone_names)
+    search = st.text_input("Field name contains")
+
+    st.header("Sort")
+    sort_by = st.selectbox("Sort by", list(SORTABLE))
+    descending = st.checkbox("Descending", value=sort_by != "status")
+    page_size = st.selectbox("Rows per page", [25, PAGE_SIZE, 100, 250], index=1)
+
+    st.divider()
+    if st.button("Refresh Data"):
+        st.rerun()
+
+# --- HEADER & SUMMARY ---
+st.title("Irrigation Fleet Overview")
+st.caption(f"Snapshot of {totals['fields']:,} fields, {snapshot.age_seconds:.0f}s old "
+           f"(fetched in {snapshot.build_seconds:.1f}s)")
+if totals["fetch_failed"]:
+    st.warning(f"{totals['fetch_failed']:,} fields could not be fetched; showing their previous data.")
+
+m1, m2, m3, m4, m5 = st.columns(5)
+with m1:
+    st.metric("Irrigating", f"{counts['IRRIGATING']:,}")
+with m2:
+    st.metric("Alerts", f"{sum(counts[s] for s in ALERT_STATUSES):,}",
+              delta=f"{counts['FAULT']:,} faults", delta_color="off")
+with m3:
+    mean = totals["mean_moisture"]
+    st.metric("Mean Moisture", f"{mean:.1f}%" if mean is not None else "-")
+with m4:
+    st.metric("Water Today", f"{totals['water_today']:,.0f} L")
+with m5:
+    st.metric("Saved Today vs Timer", f"{totals['water_saved_today']:,.0f} L",
+              delta=f"{totals['water_saved_week']:,.0f} L this week", delta_color="off")
+
+s_left, s_right = st.columns([1, 2])
+with s_left:
+    st.markdown("### Status")
+    status_df = pd.DataFrame({"Status": list(counts), "Fields": list(counts.values())})
+    st.bar_chart(status_df.set_index("Status"))
+with s_right:
+    st.markdown("### Zones")
+    st.dataframe(
+        snapshot.zones,
+        hide_index=True,
+        width="stretch",
+        column_config={
+            "mean_moisture": st.column_config.NumberColumn("Mean Moisture %", format="%.1f"),
+            "water_today": st.column_config.NumberColumn("Water Today (L)", format="%d"),
+            "water_saved_today": st.column_config.NumberColumn("Saved Today (L)", format="%d"),
+        },
+    )
+
+st.divider()
+
+# --- FIELD TABLE (one page only) ---
+page_key = (tuple(statuses), tuple(zones), search, sort_by, descending, page_size)
+if st.session_state.get("page_key") != page_key:
+    # Filters changed: back to the first page
+    st.session_state["page_key"] = page_key
+    st.session_state["page"] = 1
+result = snapshot.query(statuses, zones, search, sort_by, descending, st.session_state.get("page", 1), page_size)
+# Clamped to the pages that exist (the fleet or the filter may have shrunk)
+st.session_state["page"] = result["page"]
+
+p1, p2 = st.columns([3, 1])
+with p1:
+    st.markdown(f"### Fields ({result['matched']:,} matching, page {result['page']:,} of {result['pages']:,})")
+with p2:
+    st.number_input("Page", min_value=1, max_value=result["pages"], step=1, key="page")
+
+rows = result["rows"]
+rows = rows.assign(last_decision=[format_ts(ts) if ts else "Never" for ts in rows["last_decision_ts"]])
+st.dataframe(
+    rows[["name", "zone", "status", "moisture", "decision", "pump_state", "water_today",
+          "water_saved_today", "last_decision", "alert"]],
+    hide_index=True,
+    width="stretch",
+    column_config={
+        "moisture": st.column_config.ProgressColumn("Moisture", format="%.0f%%", min_value=0, max_value=100),
+        "water_today": st.column_config.NumberColumn("Water Today (L)", format="%d"),
+        "water_saved_today": st.column_config.NumberColumn("Saved Today (L)", format="%d"),
+    },
+)
+
+# Auto-refresh
+if REFRESH_SECONDS > 0:
+    time.sleep(REFRESH_SECONDS)
+    st.rerun()
@@ -0,0 +1,286 @@
+"""
+Shared fleet snapshot for the fleet overview dashboard.
+
+One background refresher pulls every device's attributes from ThingsBoard
+(concurrently, on a fixed interval) into a single columnar table with
+pre-aggregated summaries. Every viewer queries that snapshot: filtering,
+sorting and pagination happen here, so a page render costs one slice of a
+table that is already in memory, and ThingsBoard load does not grow with
+the number of people watching.
+
+Devices whose fetch fails keep their previous row, flagged `fetch_failed`.
+"""
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from field_config import merged_config
+from payload_codec import (
+    describe_reason,
+    REASON_MANUAL, REASON_STALE, REASON_FAULT, REASON_RAIN, REASON_DRY, REASON_NEED, REASON_OK,
+)
+
+FLEET_KEYS = (
+    "current_moisture,pump_state,pump_decision,ai_reason_code,ai_moisture,ai_weather_rain,"
+    "last_decision_ts,ai_data_stale,manual_override,manual_state,liters_total,liters_per_ha,"
+    "water_today,water_saved_today,water_week,water_saved_week,config_crop_type,config_zone,config_version"
+)
+# Provisioned fields keep their config in shared scope (scripts/bulk_provision.py)
+FLEET_SHARED_KEYS = "config_crop_type,config_zone,config_version"
+
+REFRESH_SECONDS = 30       # snapshot age before a background refresh starts
+FETCH_WORKERS = 32         # concurrent attribute requests during a refresh
+FETCH_TIMEOUT_SECONDS = 5
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Field status, most urgent first (also the default sort order)
+STATUS_ORDER = ("FAULT", "STALE", "DRY", "NO DATA", "IRRIGATING", "MANUAL", "RAIN", "OK")
+STATUS_BY_REASON = {
+    REASON_FAULT: "FAULT",
+    REASON_STALE: "STALE",
+    REASON_DRY: "DRY",
+    REASON_NEED: "IRRIGATING",
+    REASON_MANUAL: "MANUAL",
+    REASON_RAIN: "RAIN",
+    REASON_OK: "OK",
+}
+
+COLUMNS = ("name", "zone", "crop", "status", "moisture", "decision", "pump_state", "reason_code",
+           "rain", "last_decision_ts", "water_today", "water_saved_today", "water_week",
+           "water_saved_week", "liters_total", "fetch_failed")
+SORTABLE = ("status", "name", "zone", "moisture", "water_today", "water_saved_today",
+            "water_week", "water_saved_week", "last_decision_ts")
+
+
+def load_inventory(path: str) -> List[Dict[str, str]]:
+    """
+    Fleet devices from a CSV (name,token[,zone]) or JSON list of
+    {"name", "token", "zone"} objects.
+    """
+    with open(path, newline="") as f:
+        if path.endswith(".json"):
+            devices = json.load(f)
+        else:
+            devices = list(csv.DictReader(f))
+    return [{"name": d.get("name") or d["token"], "token": d["token"], "zone": d.get("zone") or "default"}
+            for d in devices]
+
+
+def _number(value, default=np.nan) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def device_row(device: Dict[str, str], attributes: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """One table row from a device's attributes, shared and client merged (None = no data yet)."""
+    attributes = attributes or {}
+    code = attributes.get("ai_reason_code")
+    status = STATUS_BY_REASON.get(code, "NO DATA")
+    if status == "IRRIGATING" and attributes.get("pump_decision") != "PUMP_ON":
+        status = "OK"
+    moisture = attributes.get("ai_moisture", attributes.get("current_moisture"))
+    return {
+        "name": device["name"],
+        "zone": attributes.get("config_zone") or device.get("zone", "default"),
+        "crop": attributes.get("config_crop_type", ""),
+        "status": status,
+        "moisture": _number(moisture),
+        "decision": attributes.get("pump_decision", ""),
+        "pump_state": attributes.get("pump_state", "UNKNOWN"),
+        "reason_code": code or "",
+        "rain": _number(attributes.get("ai_weather_rain"), 0.0),
+        "last_decision_ts": _number(attributes.get("last_decision_ts"), 0.0),
+        "water_today": _number(attributes.get("water_today"), 0.0),
+        "water_saved_today": _number(attributes.get("water_saved_today"), 0.0),
+        "water_week": _number(attributes.get("water_week"), 0.0),
+        "water_saved_week": _number(attributes.get("water_saved_week"), 0.0),
+        "liters_total": _number(attributes.get("liters_total"), 0.0),
+        "fetch_failed": False,
+    }
+
+
+class FleetSnapshot:
+    """An immutable fleet table plus summaries computed once when it is built."""
+
+    def __init__(self, rows: List[Dict[str, Any]], built_at: Optional[float] = None,
+                 build_seconds: float = 0.0):
+        self.built_at = time.time() if built_at is None else built_at
+        self.build_seconds = build_seconds
+        table = pd.DataFrame(rows, columns=list(COLUMNS))
+        table["status"] = pd.Categorical(table["status"], categories=STATUS_ORDER, ordered=True)
+        self.table = table
+        self._name_lower = table["name"].str.lower()
+        self._summarize()
+
+    def _summarize(self):
+        table = self.table
+        counts = table["status"].value_counts()
+        self.status_counts = {status: int(counts.get(status, 0)) for status in STATUS_ORDER}
+        self.totals = {
+            "fields": len(table),
+            "mean_moisture": float(table["moisture"].mean()) if table["moisture"].notna().any() else None,
+            "water_today": float(table["water_today"].sum()),
+            "water_saved_today": float(table["water_saved_today"].sum()),
+            "water_week": float(table["water_week"].sum()),
+            "water_saved_week": float(table["water_saved_week"].sum()),
+            "fetch_failed": int(table["fetch_failed"].sum()),
+        }
+        zones = table.groupby("zone", sort=True).agg(
+            fields=("name", "size"),
+            mean_moisture=("moisture", "mean"),
+            irrigating=("status", lambda s: int((s == "IRRIGATING").sum())),
+            alerts=("status", lambda s: int(s.isin(("FAULT", "STALE", "DRY")).sum())),
+            water_today=("water_today", "sum"),
+            water_saved_today=("water_saved_today", "sum"),
+        )
+        self.zones = zones.reset_index()
+        self.zone_names = self.zones["zone"].tolist()
+
+    @property
+    def age_seconds(self) -> float:
+        return time.time() - self.built_at
+
+    def query(self, statuses=None, zones=None, search: str = "", sort_by: str = "status",
+              descending: bool = False, page: int = 1, page_size: int = PAGE_SIZE) -> Dict[str, Any]:
+        """
+        Filter -> sort -> one page. Returns {"rows" (DataFrame of the page
+        only, with an "alert" text column), "matched", "page", "pages"}.
+        """
+        table = self.table
+        mask = np.ones(len(table), dtype=bool)
+        if statuses:
+            mask &= table["status"].isin(statuses).to_numpy()
+        if zones:
+            mask &= table["zone"].isin(zones).to_numpy()
+        if search:
+            mask &= self._name_lower.str.contains(search.lower(), regex=False).to_numpy()
+        matched = table[mask] if not mask.all() else table
+
+        if sort_by not in SORTABLE:
+            sort_by = "status"
+        # Stable sort, ties broken by name so paging is deterministic
+        keys = [sort_by, "name"] if sort_by != "name" else ["name"]
+        matched = matched.sort_values(keys, ascending=[not descending] + [True] * (len(keys) - 1),
+                                      kind="stable", na_position="last")
+
+        page_size = max(1, min(MAX_PAGE_SIZE, int(page_size)))
+        pages = max(1, -(-len(matched) // page_size))
+        page = max(1, min(pages, int(page)))
+        rows = matched.iloc[(page - 1) * page_size:page * page_size].copy()
+        rows["alert"] = [self._alert(row) for row in rows.itertuples(index=False)]
+        return {"rows": rows, "matched": len(matched), "page": page, "pages": pages}
+
+    @staticmethod
+    def _alert(row) -> str:
+        if row.fetch_failed:
+            return "Last fetch failed; showing previous data"
+        if row.status in ("OK", "NO DATA"):
+            return ""
+        attributes = {"ai_moisture": row.moisture, "ai_weather_rain": int(row.rain),
+                      "liters_total": int(row.liters_total), "manual_state": row.decision[5:]}
+        return describe_reason(row.reason_code, attributes, row.crop or "crop")
+
+
+class FleetSource:
+    """
+    Pulls the fleet from ThingsBoard into FleetSnapshots. get() never waits
+    on the network: it returns None while the first snapshot is loading,
+    then serves the current snapshot while one background refresh (at most)
+    replaces it.
+    """
+
+    def __init__(self, server: str, devices: List[Dict[str, str]], refresh_seconds: float = REFRESH_SECONDS,
+                 workers: int = FETCH_WORKERS):
+        self.server = server
+        self.devices = devices
+        self.refresh_seconds = refresh_seconds
+        self.workers = workers
+        self.snapshot: Optional[FleetSnapshot] = None
+        self.refreshes = 0
+        self.last_error = None
+        self.fetched = 0  # devices fetched by the refresh in progress
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._local = threading.local()
+
+    def get(self) -> Optional[FleetSnapshot]:
+        if self.snapshot is None or self.snapshot.age_seconds >= self.refresh_seconds:
+            self._refresh_in_background()
+        return self.snapshot
+
+    @property
+    def progress(self) -> float:
+        return self.fetched / len(self.devices) if self.devices else 1.0
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.snapshot = self.build()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f" ! Fleet snapshot refresh failed: {e}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+            session = self._local.session = requests.Session()
+        return session
+
+    def _fetch(self, device: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        url = f"{self.server}/api/v1/{device['token']}/attributes?clientKeys={FLEET_KEYS}&sharedKeys={FLEET_SHARED_KEYS}"
+        try:
+            response = self._session().get(url, timeout=FETCH_TIMEOUT_SECONDS)
+            response.raise_for_status()
+            return merged_config(response.json())
+        except Exception:
+            return None
+
+    def build(self) -> FleetSnapshot:
+        start = time.perf_counter()
+        self.fetched = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            fetched = []
+            for attributes in pool.map(self._fetch, self.devices):
+                fetched.append(attributes)
+                self.fetched += 1  # counted on this thread only; += from the workers loses updates
+        previous = {}
+        if self.snapshot is not None:
+            previous = {row["name"]: row for row in self.snapshot.table.to_dict("records")}
+        rows = []
+        for device, attributes in zip(self.devices, fetched):
+            if attributes is None and device["name"] in previous:
+                row = dict(previous[device["name"]], fetch_failed=True)
+            else:
+                row = device_row(device, attributes)
+                row["fetch_failed"] = attributes is None
+            rows.append(row)
+        self.refreshes += 1
+        return FleetSnapshot(rows, build_seconds=time.perf_counter() - start)
+
+
+def source_from_env() -> FleetSource:
+    """FleetSource from TB_SERVER and FLEET_DEVICES (inventory file path)."""
+    server = os.environ.get("TB_SERVER", "http://demo.thingsboard.io")
+    devices = load_inventory(os.environ["FLEET_DEVICES"])
+    refresh = float(os.environ.get("FLEET_REFRESH_SECONDS", REFRESH_SECONDS))
+    return FleetSource(server, devices, refresh_seconds=refresh)
@@ -0,0 +1,292 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from payload_codec import dumps
+
+# --- Batching Defaults ---
+MAX_BATCH_ENTRIES = 500      # device updates per gateway message
+MAX_BATCH_DELAY = 1.0        # seconds before a partial batch is flushed
+MAX_BUFFERED_ENTRIES = 5000  # in-memory bound before spilling to disk
+DEFAULT_SPILL_PATH = "upload_spill.jsonl"
+MAX_SPILL_BYTES = 64 * 1024 * 1024  # spill file cap; the oldest messages are dropped past it
+SPILL_TRIM_FRACTION = 0.8           # trimmed down to this share of the cap, so trims stay rare
+
+TELEMETRY = "telemetry"
+ATTRIBUTES = "attributes"
+
+# transport(kind, message) sends one gateway message; kind is TELEMETRY or ATTRIBUTES.
+Transport = Callable[[str, Dict[str, Any]], None]
+
+
+def http_transport(server: str, gateway_token: str, timeout: float = 5.0) -> Transport:
+    """
+    Posts gateway-API shaped messages to {server}/api/v1/{token}/gateway/{kind}
+    over a single keep-alive session (HTTP integration / local stand-in).
+    """
+    import requests
+    session = requests.Session()
+    session.headers["Content-Type"] = "application/json"
+
+    def send(kind: str, message: Dict[str, Any]):
+        url = f"{server}/api/v1/{gateway_token}/gateway/{kind}"
+        response = session.post(url, data=dumps(message), timeout=timeout)
+        response.raise_for_status()
+
+    return send
+
+
+def mqtt_transport(client) -> Transport:
+    """Publishes to the standard ThingsBoard gateway topics with a paho-mqtt client."""
+    def send(kind: str, message: Dict[str, Any]):
+        info = client.publish(f"v1/gateway/{kind}", dumps(message), qos=1)
+        info.wait_for_publish()
+
+    return send
+
+
+class GatewayBatcher:
+    """
+    Coalesces telemetry and attribute updates for many devices into
+    ThingsBoard gateway-API messages:
+
+        telemetry:  {"Field-1": [{"ts": 1700000000000, "values": {...}}, ...], ...}
+        attributes: {"Field-1": {"pump_decision": "PUMP_ON", ...}, ...}
+
+    Batches are flushed when they reach MAX_BATCH_ENTRIES or MAX_BATCH_DELAY.
+    Repeated attribute updates for a device are merged (latest value wins).
+    If upstream fails or falls behind, pending messages are spilled to a
+    JSON-lines file and replayed, oldest first, before the next send. The
+    file is capped at max_spill_bytes: in a long outage the oldest messages
+    are dropped (counted in stats["entries_dropped"]).
+    """
+
+    def __init__(self, transport: Transport, max_batch: int = MAX_BATCH_ENTRIES,
+                 max_delay: float = MAX_BATCH_DELAY, max_buffered: int = MAX_BUFFERED_ENTRIES,
+                 spill_path: Optional[str] = DEFAULT_SPILL_PATH, max_spill_bytes: Optional[int] = MAX_SPILL_BYTES):
+        self.transport = transport
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_buffered = max_buffered
+        self.spill_path = spill_path
+        self.max_spill_bytes = max_spill_bytes
+
+        self._telemetry: Dict[str, List[Dict[str, Any]]] = {}
+        self._attributes: Dict[str, Dict[str, Any]] = {}
+        self._pending = 0
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {"messages_sent": 0, "entries_sent": 0, "send_failures": 0,
+                      "entries_spilled": 0, "entries_replayed": 0, "entries_superseded": 0,
+                      "entries_dropped": 0}
+
+    # --- Producer API ---
+    def add_telemetry(self, device: str, values: Dict[str, Any], ts_ms: Optional[int] = None):
+        if ts_ms is None:
+            ts_ms = int(time.time() * 1000)
+        with self._lock:
+            self._telemetry.setdefault(device, []).append({"ts": ts_ms, "values": values})
+            self._mark_pending()
+        self._maybe_flush()
+
+    def add_attributes(self, device: str, attributes: Dict[str, Any]):
+        with self._lock:
+            if device not in self._attributes:
+                self._attributes[device] = {}
+                self._mark_pending()
+            self._attributes[device].update(attributes)
+        self._maybe_flush()
+
+    def _mark_pending(self):
+        self._pending += 1
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+
+    # --- Flushing ---
+    def _due(self) -> bool:
+        if self._pending == 0:
+            return False
+        if self._pending >= self.max_batch:
+            return True
+        return time.monotonic() - self._oldest >= self.max_delay
+
+    def _maybe_flush(self):
+        with self._lock:
+            due = self._due()
+        if not due:
+            return
+        # Another thread is already sending: keep buffering, spill if that gets out of hand
+        if not self._send_lock.acquire(blocking=False):
+            with self._lock:
+                if self._pending > self.max_buffered:
+                    self._spill(self._drain())
+            return
+        try:
+            self._send(self._take())
+        finally:
+            self._send_lock.release()
+
+    def flush(self):
+        """Sends everything buffered now, regardless of size or age."""
+        with self._send_lock:
+            self._send(self._take())
+
+    def _take(self) -> List[tuple]:
+        with self._lock:
+            return self._drain()
+
+    def _drain(self) -> List[tuple]:
+        """Splits the buffer into (kind, message, entry_count) chunks of at most max_batch entries."""
+        chunks = []
+        for kind, buffer in ((TELEMETRY, self._telemetry), (ATTRIBUTES, self._attributes)):
+            message, count = {}, 0
+            for device, payload in buffer.items():
+                message[device] = payload
+                count += len(payload) if kind == TELEMETRY else 1
+                if count >= self.max_batch:
+                    chunks.append((kind, message, count))
+                    message, count = {}, 0
+            if message:
+                chunks.append((kind, message, count))
+        self._telemetry = {}
+        self._attributes = {}
+        self._pending = 0
+        self._oldest = None
+        return chunks
+
+    def _send(self, chunks: List[tuple]):
+        # Spilled messages are older than anything buffered now: they go first
+        # (minus attributes the new chunks overwrite anyway), or the new
+        # chunks queue up behind them on disk
+        if not self._replay_spill(self._pending_attributes(chunks)):
+            if chunks:
+                print(f" ! Gateway still failing; spilling {len(chunks)} message(s) behind the earlier ones.")
+                self._spill(chunks)
+            return
+        for i, (kind, message, count) in enumerate(chunks):
+            try:
+                self.transport(kind, message)
+            except Exception as e:
+                print(f" ! Gateway upload failed ({e}); spilling {len(chunks) - i} message(s) to disk.")
+                self.stats["send_failures"] += 1
+                self._spill(chunks[i:])
+                return
+            self.stats["messages_sent"] += 1
+            self.stats["entries_sent"] += count
+
+    @staticmethod
+    def _pending_attributes(chunks: List[tuple]) -> Dict[str, set]:
+        keys: Dict[str, set] = {}
+        for kind, message, _ in chunks:
+            if kind == ATTRIBUTES:
+                for device, attributes in message.items():
+                    keys.setdefault(device, set()).update(attributes)
+        return keys
+
+    # --- Disk Spill ---
+    # All spill file I/O happens under _spill_lock. A replay first moves the
+    # spill file aside (.replay), so producers spilling meanwhile append to a
+    # fresh file instead of one about to be deleted.
+    def _spill(self, chunks: List[tuple]):
+        if not chunks:
+            return
+        if self.spill_path is None:
+            print(f" ! No spill file configured, dropping {len(chunks)} message(s).")
+            return
+        with self._spill_lock:
+            with open(self.spill_path, "a") as f:
+                for kind, message, count in chunks:
+                    f.write(json.dumps({"kind": kind, "count": count, "message": message}) + "\n")
+                    self.stats["entries_spilled"] += count
+            self._trim_spill()
+
+    def _trim_spill(self):
+        """Drops the oldest spilled messages once the file passes max_spill_bytes (holding _spill_lock)."""
+        if self.max_spill_bytes is None or os.path.getsize(self.spill_path) <= self.max_spill_bytes:
+            return
+        with open(self.spill_path) as f:
+            lines = f.readlines()
+        size = sum(len(line) for line in lines)  # json.dumps output is ASCII: characters == bytes
+        target = self.max_spill_bytes * SPILL_TRIM_FRACTION
+        drop, dropped = 0, 0
+        while drop < len(lines) and size > target:
+            size -= len(lines[drop])
+            dropped += json.loads(lines[drop])["count"]
+            drop += 1
+        with open(self.spill_path, "w") as f:
+            f.writelines(lines[drop:])
+        self.stats["entries_dropped"] += dropped
+        print(f" ! Spill file over {self.max_spill_bytes:,} bytes; dropped the {dropped:,} oldest entries.")
+
+    def _replay_spill(self, newer_attributes: Dict[str, set]) -> bool:
+        """
+        Re-sends spilled messages oldest first, skipping attribute values
+        that `newer_attributes` (device -> keys about to be sent) supersede.
+        False if upstream failed again; what is left stays spilled, ahead
+        of anything spilled in the meantime.
+        """
+        if self.spill_path is None:
+            return True
+        replay_path = self.spill_path + ".replay"
+        with self._spill_lock:
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.spill_path):
+                    return True
+                os.replace(self.spill_path, replay_path)
+            with open(replay_path) as f:
+                lines = f.readlines()
+        for i, line in enumerate(lines):
+            record = json.loads(line)
+            message, count = record["message"], record["count"]
+            if record["kind"] == ATTRIBUTES:
+                message = {device: {k: v for k, v in attributes.items() if k not in newer_attributes.get(device, ())}
+                           for device, attributes in message.items()}
+                message = {device: attributes for device, attributes in message.items() if attributes}
+                self.stats["entries_superseded"] += count - len(message)
+                count = len(message)
+                if not message:
+                    continue
+            try:
+                self.transport(record["kind"], message)
+            except Exception as e:
+                print(f" ! Spill replay failed ({e}); {len(lines) - i} message(s) kept on disk.")
+                self.stats["send_failures"] += 1
+                with self._spill_lock:
+                    newer = []
+                    if os.path.exists(self.spill_path):
+                        with open(self.spill_path) as f:
+                            newer = f.readlines()
+                    with open(self.spill_path, "w") as f:
+                        f.writelines(lines[i:] + newer)
+                    os.remove(replay_path)
+                    self._trim_spill()
+                return False
+            self.stats["messages_sent"] += 1
+            self.stats["entries_replayed"] += count
+        with self._spill_lock:
+            os.remove(replay_path)
+        return True
+
+    # --- Background Timer ---
+    def start(self) -> "GatewayBatcher":
+        """Starts a daemon thread that enforces max_delay when producers go quiet."""
+        def loop():
+            while not self._stop.wait(self.max_delay / 2):
+                self._maybe_flush()
+
+        self._thread = threading.Thread(target=loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
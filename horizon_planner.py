@@ -0,0 +1,141 @@
+"""
+Multi-day irrigation planner.
+
+Chooses daily irrigation depths per field over a forecast horizon so the
+root zone never passes its readily-available-water threshold, using as
+little water (and so pump time) as possible. Meant to be re-solved every
+day from the latest state and forecast (receding horizon): only today's
+amounts are applied, tomorrow's plan is made with tomorrow's forecast.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+
+from water_balance import FieldWaterBalance
+
+HORIZON_DAYS = 7
+MAX_IRRIGATION_MM_PER_DAY = 25.0  # pump capacity expressed as depth over the field
+RAIN_MM_AT_FULL_PROBABILITY = 15.0  # same convention as the agent's expected_rain_mm
+# Only rain this likely is counted on when deferring irrigation (the agent's
+# rain lockout threshold). Planning on every drizzle chance rides the
+# threshold and breaches it whenever the rain doesn't come.
+RAIN_CREDIT_MIN_PROBABILITY = 60
+
+
+def expected_rain_mm(rain_probability: np.ndarray) -> np.ndarray:
+    return np.clip(rain_probability, 0, 100) / 100.0 * RAIN_MM_AT_FULL_PROBABILITY
+
+
+def plannable_rain_mm(rain_probability: np.ndarray) -> np.ndarray:
+    """Forecast rain the planner may rely on: expected depth on likely-rain days, else 0."""
+    rain_probability = np.asarray(rain_probability, dtype=float)
+    return np.where(rain_probability >= RAIN_CREDIT_MIN_PROBABILITY, expected_rain_mm(rain_probability), 0.0)
+
+
+def plan_irrigation(depletion0: np.ndarray, raw: np.ndarray, etc: np.ndarray, rain: np.ndarray,
+                    max_daily_mm: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Batched multi-day irrigation plan for F fields over H days.
+
+        depletion0    (F,)    root-zone depletion now, mm below field capacity
+        raw           (F,)    readily available water: depletion must stay <= raw
+        etc           (F, H)  crop ET per day, mm; (F,) = same every day
+        rain          (F, H)  expected effective rain per day, mm; (H,) = shared forecast
+        max_daily_mm  (F,)    pump capacity per day, mm
+
+    Minimizes total applied water subject to 0 <= depletion <= raw every day
+    and the daily pump capacity. Pump-hours are applied depth times area over
+    flow rate, so the same plan minimizes both. Solved exactly in O(F * H):
+
+      1. Backward pass: the highest depletion each day can start from and
+         still stay feasible for the rest of the horizon at full pump capacity.
+      2. Forward pass: irrigate as late and as little as those ceilings allow,
+         so forecast rain is used before pumped water (water above field
+         capacity drains away, so pumping early can only waste it).
+
+    Returns irrigation (F, H), depletion (F, H+1) and feasible (F,) -- False
+    where even full capacity cannot hold the threshold (plan then pumps max).
+    """
+    depletion0 = np.asarray(depletion0, dtype=float)
+    fields = depletion0.shape[0]
+    raw = np.broadcast_to(np.asarray(raw, dtype=float), (fields,))
+    rain = np.asarray(rain, dtype=float)
+    horizon = rain.shape[-1]
+    rain = np.broadcast_to(rain, (fields, horizon))
+    etc = np.asarray(etc, dtype=float)
+    if etc.ndim == 1:
+        etc = etc[:, None]
+    etc = np.broadcast_to(etc, (fields, horizon))
+    if max_daily_mm is None:
+        max_daily_mm = np.full(fields, MAX_IRRIGATION_MM_PER_DAY)
+    cap = np.broadcast_to(np.asarray(max_daily_mm, dtype=float), (fields,))
+
+    # Backward pass: ceiling[d] = max depletion at the start of day d that is still feasible
+    ceiling = np.empty((fields, horizon + 1))
+    ceiling[:, horizon] = raw
+    for d in range(horizon - 1, -1, -1):
+        ceiling[:, d] = np.minimum(raw, ceiling[:, d + 1] - etc[:, d] + rain[:, d] + cap)
+
+    # Forward pass: minimal irrigation keeping tomorrow under its ceiling
+    irrigation = np.zeros((fields, horizon))
+    depletion = np.empty((fields, horizon + 1))
+    depletion[:, 0] = depletion0
+    feasible = depletion0 <= ceiling[:, 0] + 1e-9
+    for d in range(horizon):
+        unirrigated = depletion[:, d] + etc[:, d] - rain[:, d]
+        need = np.clip(unirrigated - ceiling[:, d + 1], 0.0, cap)
+        irrigation[:, d] = need
+        # Anything above field capacity drains (depletion floors at 0)
+        depletion[:, d + 1] = np.maximum(0.0, unirrigated - need)
+        feasible &= depletion[:, d + 1] <= raw + 1e-9
+
+    return {"irrigation": irrigation, "depletion": depletion, "feasible": feasible}
+
+
+class HorizonPlanner:
+    """
+    Receding-horizon planner over a FieldWaterBalance: each day re-solve the
+    whole horizon from the current state and latest forecast, apply only
+    today's amounts, repeat tomorrow. A fleet's agents share one planner
+    (like the balance): the first of them to decide on a new day re-solves
+    every field in one batch (maybe_resolve), the rest read planned_mm().
+    """
+
+    def __init__(self, water_balance: FieldWaterBalance, horizon_days: int = HORIZON_DAYS,
+                 max_daily_mm: Optional[np.ndarray] = None):
+        self.water_balance = water_balance
+        self.horizon_days = horizon_days
+        self.max_daily_mm = max_daily_mm
+        self.plan_today = np.zeros(0)  # today's irrigation mm per field index
+        self.solved_day = None         # local day index of the last solve
+        self.solves = 0
+
+    def solve(self, rain_probability: np.ndarray, et0_scale: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """
+        rain_probability: (H,) shared forecast or (F, H) per-field forecast, %.
+        et0_scale: optional (H,) multiplier on each field's ETc (hot/cool days).
+        """
+        n = self.water_balance.size
+        rain = plannable_rain_mm(rain_probability)[..., :self.horizon_days]
+        etc = self.water_balance.etc[:n]
+        if et0_scale is not None:
+            etc = etc[:, None] * np.asarray(et0_scale, dtype=float)[:rain.shape[-1]]
+        cap = self.max_daily_mm[:n] if self.max_daily_mm is not None else None
+        return plan_irrigation(self.water_balance.depletion[:n], self.water_balance.raw[:n], etc, rain, cap)
+
+    def today(self, rain_probability: np.ndarray, et0_scale: Optional[np.ndarray] = None) -> np.ndarray:
+        """Irrigation depth (mm) to apply today for every field."""
+        return self.solve(rain_probability, et0_scale)["irrigation"][:, 0]
+
+    def maybe_resolve(self, day: int, rain_probability, et0_scale: Optional[np.ndarray] = None) -> bool:
+        """Re-solves the whole fleet once per (local) day; returns True if it solved."""
+        if day == self.solved_day:
+            return False
+        self.plan_today = self.today(np.asarray(rain_probability, dtype=float), et0_scale)
+        self.solved_day = day
+        self.solves += 1
+        return True
+
+    def planned_mm(self, idx: int) -> Optional[float]:
+        """Today's planned irrigation for a field; None if it joined after the last solve."""
+        return float(self.plan_today[idx]) if idx < len(self.plan_today) else None
@@ -1,12 +1,20 @@
+import os
 import streamlit as st
 import requests
 import time
 import pandas as pd
 from datetime import datetime
+from payload_codec import describe_reason, format_ts
+from field_config import CONFIG_KEYS, CONFIG_VERSION, merged_config, snapshot, version_of
+from timeseries_store import TimeSeriesStore, TIMESERIES_PATH, HISTORY_RANGES, history_frame
 
 # --- CONFIGURATION ---
-TB_SERVER = "http://demo.thingsboard.io"
-TB_TOKEN = "yktlt9lpxdqchp2dkfrd"
+TB_SERVER = os.environ.get("TB_SERVER", "http://demo.thingsboard.io")
+TB_TOKEN = os.environ.get("TB_TOKEN", "yktlt9lpxdqchp2dkfrd")
+# Seconds between automatic reruns; 0 disables auto-refresh (benchmarks, tests)
+REFRESH_SECONDS = float(os.environ.get("DASHBOARD_REFRESH_SECONDS", "2"))
+# Rollup store the agent records into (see timeseries_store.py)
+HISTORY_PATH = os.environ.get("AGENT_TIMESERIES", TIMESERIES_PATH)
 
 # Configure Page
 st.set_page_config(
@@ -29,7 +37,7 @@ st.markdown("""
 
 # --- FUNCTIONS ---
 def get_attributes():
-    url = f"{TB_SERVER}/api/v1/{TB_TOKEN}/attributes?clientKeys=current_moisture,pump_decision,pump_duration,ai_reason,pump_state,last_decision_ts,ai_weather_temp,ai_weather_rain,manual_override,manual_state,liters_total,liters_per_ha"
+    url = f"{TB_SERVER}/api/v1/{TB_TOKEN}/attributes?clientKeys=current_moisture,pump_decision,pump_duration,ai_reason,ai_reason_code,ai_moisture,pump_state,last_decision_ts,ai_weather_temp,ai_weather_rain,manual_override,manual_state,liters_total,liters_per_ha,water_today,water_saved_today,water_week,water_saved_week"
     try:
         requests.get(url, timeout=2) # warmup
         response = requests.get(url, timeout=2)
@@ -39,18 +47,60 @@ def get_attributes():
     except:
         return {}
 
-def push_config(crop, stage, size, soil):
+# Keyed on the file existing, so the dashboard picks the store up once the agent creates it
+@st.cache_resource
+def get_history_store(exists: bool):
+    return TimeSeriesStore.open_readonly(HISTORY_PATH) if exists else None
+
+def get_config():
+    """The field's current config and its newest config_version in either scope (None if never written)."""
+    keys = f"{CONFIG_KEYS},{CONFIG_VERSION}"
+    url = f"{TB_SERVER}/api/v1/{TB_TOKEN}/attributes?clientKeys={keys}&sharedKeys={keys}"
+    try:
+        response = requests.get(url, timeout=2)
+        if response.status_code == 200:
+            data = response.json()
+            versions = [int(v) for v in version_of(data) if v is not None]
+            return merged_config(data), max(versions, default=None)
+    except:
+        pass
+    return {}, None
+
+def push_config(crop, stage, size, soil, previous_version):
+    """Posts a new config snapshot; returns its version, or None if the post failed."""
     url = f"{TB_SERVER}/api/v1/{TB_TOKEN}/attributes"
-    payload = {
+    payload = snapshot({
         "config_crop_type": crop,
         "config_growth_stage": stage,
         "config_field_size": size,
         "config_soil_type": soil
-    }
+    }, previous_version)
     try:
-        requests.post(url, json=payload, timeout=2)
+        requests.post(url, json=payload, timeout=2).raise_for_status()
+        return payload[CONFIG_VERSION]
     except:
-        pass
+        return None
+
+def option_index(options, value):
+    return options.index(value) if value in options else 0
+
+# Config is read once per session (to show the field's current settings)
+# and pushed only when a setting actually changes
+if "config_synced" not in st.session_state:
+    current, version = get_config()
+    st.session_state.config_current = current
+    st.session_state.config_version = version
+    st.session_state.config_synced = None
+    if "config_crop_type" in current:
+        st.session_state.config_synced = (
+            current.get("config_crop_type"), current.get("config_growth_stage"),
+            float(current.get("config_field_size", 1.5)), current.get("config_soil_type"),
+        )
+current_config = st.session_state.config_current
+
+CROP_OPTIONS = ["Rice (Paddy)", "Wheat", "Sugarcane", "Cotton"]
+STAGE_OPTIONS = ["Vegetative", "Reproductive", "Ripening"]
+SOIL_OPTIONS = ["Loam (Balanced)", "Clay (Retains Water)", "Sandy (Drains Fast)"]
 
 # --- SIDEBAR CONFIGURATION ---
 with st.sidebar:
@@ -58,30 +108,41 @@ with st.sidebar:
     
     crop_type = st.selectbox(
         "Crop Type",
-        ["Rice (Paddy)", "Wheat", "Sugarcane", "Cotton"]
+        CROP_OPTIONS,
+        index=option_index(CROP_OPTIONS, current_config.get("config_crop_type"))
     )
     
     growth_stage = st.selectbox(
         "Growth Stage",
-        ["Vegetative", "Reproductive", "Ripening"]
+        STAGE_OPTIONS,
+        index=option_index(STAGE_OPTIONS, current_config.get("config_growth_stage"))
     )
 
     soil_type = st.selectbox(
         "Soil Type",
-        ["Loam (Balanced)", "Clay (Retains Water)", "Sandy (Drains Fast)"]
+        SOIL_OPTIONS,
+        index=option_index(SOIL_OPTIONS, current_config.get("config_soil_type"))
     )
     
     field_size = st.number_input(
         "Field Size (Hectares)",
         min_value=0.1,
-        value=1.5,
+        value=max(0.1, float(current_config.get("config_field_size", 1.5))),
         step=0.1
     )
     
-    # Sync Config to Cloud immediately
-    push_config(crop_type, growth_stage, field_size, soil_type)
+    # Sync Config to Cloud as soon as it changes
+    config = (crop_type, growth_stage, float(field_size), soil_type)
+    if config != st.session_state.config_synced:
+        version = push_config(crop_type, growth_stage, field_size, soil_type, st.session_state.config_version)
+        if version is not None:
+            st.session_state.config_synced = config
+            st.session_state.config_version = version
     
-    st.success("Settings Synced to AI Agent")
+    if config == st.session_state.config_synced:
+        st.success("Settings Synced to AI Agent")
+    else:
+        st.warning("Settings not synced yet (ThingsBoard unreachable)")
     
     st.divider()
     
@@ -103,6 +164,12 @@ with st.sidebar:
         url = f"{TB_SERVER}/api/v1/{TB_TOKEN}/attributes"
         requests.post(url, json={"manual_override": False})
         st.toast("AI Control Resumed")
+
+    # Clears a sensor / pump fault lockout after a repair (agent reads fault_reset)
+    if st.button("Reset Fault Lockout"):
+        url = f"{TB_SERVER}/api/v1/{TB_TOKEN}/attributes"
+        requests.post(url, json={"fault_reset": int(time.time() * 1000)})
+        st.toast("Fault reset sent to AI Agent")
     
     st.divider()
     
@@ -116,8 +183,13 @@ data = get_attributes()
 moisture = data.get('current_moisture', 0)
 pump_decision = data.get('pump_decision', 'OFF')
 pump_state = data.get('pump_state', 'UNKNOWN') 
-ai_reason = data.get('ai_reason', 'Waiting for AI...')
-last_ts = data.get('last_decision_ts', 'Never')
+# Agent pushes a short reason code; expand it here. ThingsBoard keeps the
+# ai_reason text older agents wrote, so it is only used when there is no code
+if data.get('ai_reason_code'):
+    ai_reason = describe_reason(data['ai_reason_code'], data, crop_type)
+else:
+    ai_reason = data.get('ai_reason') or describe_reason(None, data, crop_type)
+last_ts = format_ts(data.get('last_decision_ts', 'Never'))
 
 # Manual Status
 # Robust boolean parsing
@@ -177,6 +249,11 @@ if data:
     
     liters_ha = data.get('liters_per_ha', 0)
     liters_total = data.get('liters_total', 0)
+    # Booked by the agent's water ledger (pump on-time vs the fixed timer)
+    water_today = data.get('water_today', 0)
+    saved_today = data.get('water_saved_today', 0)
+    water_week = data.get('water_week', 0)
+    saved_week = data.get('water_saved_week', 0)
     
     d1, d2, d3 = st.columns(3)
     with d1:
@@ -188,8 +265,7 @@ if data:
     with d3:
         st.markdown("**Total Volume**")
         st.markdown(f"## {liters_total:,} L")
-        if liters_total > 0:
-            st.caption(f"Saved {int(liters_total * 0.4):,} L vs Timer")
+        st.caption(f"Delivered today {water_today:,} L · Saved {saved_today:,} L vs Timer")
 
     st.divider()
 
@@ -241,17 +317,39 @@ if data:
             chart_data = chart_data.rename(columns={"name": "Day", "fixed": "Standard (Fixed)", "ai": "AI Smart System"})
             st.bar_chart(chart_data.set_index("Day"), color=["#95a5a6", "#2ecc71"])
             
-            st.caption("AI saves approximately 40% water vs standard timer-based systems.")
+            if water_week or saved_week:
+                timer_week = water_week + saved_week
+                share = saved_week / timer_week if timer_week else 0.0
+                st.caption(f"This week: {water_week:,} L delivered, {saved_week:,} L ({share:.0%}) saved vs the fixed timer.")
+            else:
+                st.caption("Savings vs the fixed timer appear once the agent has booked pump runs.")
             
         except ImportError:
             st.error("Could not load irrigation_engine.py")
         except Exception as e:
             st.error(f"Error generating report: {e}")
 
+    st.divider()
+
+    # --- MOISTURE HISTORY (from the local rollup store) ---
+    st.markdown("### Moisture History")
+    history_range = st.radio("Range", list(HISTORY_RANGES), index=1, horizontal=True)
+    store = get_history_store(os.path.exists(HISTORY_PATH))
+    if store is None:
+        st.caption("No history recorded yet. Run decision_core.py on this machine to start recording.")
+    else:
+        history, resolution = history_frame(store, TB_TOKEN, HISTORY_RANGES[history_range])
+        if history.empty:
+            st.caption("No history for this device in the selected range yet.")
+        else:
+            st.line_chart(history, color=["#2ecc71", "#a9dfbf", "#1e8449", "#3498db"])
+            st.caption(f"{len(history):,} points at {resolution} resolution (min/max/mean per bucket).")
+
 else:
     st.warning("Waiting for data from ThingsBoard...")
     st.info("Ensure decision_core.py and ESP32 are running.")
 
 # Auto-refresh
-time.sleep(2)
-st.rerun()
+if REFRESH_SECONDS > 0:
+    time.sleep(REFRESH_SECONDS)
+    st.rerun()
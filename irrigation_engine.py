@@ -1,8 +1,8 @@
 import datetime
 from typing import List, Dict, Any, Optional
 
-# Constants
-BASE_ET0 = 6.5  # mm/day
+from horizon_planner import HorizonPlanner, HORIZON_DAYS, RAIN_CREDIT_MIN_PROBABILITY
+from water_balance import BASE_ET0, FieldWaterBalance
 
 MOCK_WEATHER_DATA = [
     {"date": "2025-12-29", "rain_probability": 85, "temperature": 24, "wind_speed": 12},
@@ -30,7 +30,8 @@ def generate_daily_plan(
     rain_correction: int = 0,
     crop_type: str = "Rice (Paddy)",
     growth_stage: str = "Vegetative",
-    field_size: float = 1.5
+    field_size: float = 1.5,
+    soil_type: str = "Loam"
 ) -> Dict[str, Any]:
     
     current_soil = max(0, min(100, MOCK_SOIL_DATA[0]["moisture_level_percentage"] + soil_correction))
@@ -135,16 +136,41 @@ def generate_daily_plan(
     if soil_status == "Wet":
         final_action = "Skip"
         amount_liters_per_ha = 0
-        
+
+    # --- Look Ahead: don't irrigate today if forecast rain can carry the field ---
+    deferred_mm = 0.0
+    if final_action == "Irrigate":
+        horizon = generate_horizon_plan(soil_correction, rain_correction, crop_type, growth_stage, field_size, soil_type)
+        if horizon[0]["irrigation_mm"] == 0:
+            final_action = "Skip"
+            amount_liters_per_ha = 0
+            deferred_mm, required_mm = required_mm, 0.0
+            # Only the days the planner credited rain for
+            rain_days = [day["name"] for day in horizon[1:]
+                         if day["rain_probability"] >= RAIN_CREDIT_MIN_PROBABILITY]
+            details = "Soil stays above the crop threshold today; irrigation deferred."
+            if rain_days:
+                details = f"Forecast rain ({', '.join(rain_days)}) covers demand before the crop threshold; irrigation deferred."
+            trace.append({
+                "step": step,
+                "description": f"Plan Ahead ({len(horizon)} days)",
+                "result": "SKIP",
+                "details": details
+            })
+            step += 1
+
     total_amount = amount_liters_per_ha * field_size
     fixed_total = fixed_liters_per_ha * field_size
     savings = max(0, fixed_total - total_amount)
     
+    net_needs = f"Net Needs: {required_mm:.2f}mm"
+    if deferred_mm:
+        net_needs += f" ({deferred_mm:.2f}mm deferred)"
     trace.append({
         "step": step,
         "description": "Final Calculation",
         "result": "WATER" if final_action == "Irrigate" else "SKIP",
-        "details": f"Net Needs: {required_mm:.2f}mm. Action: {final_action}. Total Volume: {total_amount:,.0f} L."
+        "details": f"{net_needs}. Action: {final_action}. Total Volume: {total_amount:,.0f} L."
     })
     
     return {
@@ -199,3 +225,39 @@ def generate_weekly_impact(
         })
         
     return data
+
+
+def generate_horizon_plan(
+    soil_correction: int = 0,
+    rain_correction: int = 0,
+    crop_type: str = "Rice (Paddy)",
+    growth_stage: str = "Vegetative",
+    field_size: float = 1.5,
+    soil_type: str = "Loam"
+) -> List[Dict[str, Any]]:
+    """
+    Day-by-day irrigation plan over the forecast horizon: the least water that
+    keeps the root zone above the crop's threshold, using forecast rain first.
+    """
+    forecast = MOCK_WEATHER_DATA[:HORIZON_DAYS]
+    rain_probability = [max(0, min(100, day["rain_probability"] + rain_correction)) for day in forecast]
+    current_soil = max(0, min(100, MOCK_SOIL_DATA[0]["moisture_level_percentage"] + soil_correction))
+    kc = CROP_COEFFICIENTS.get(crop_type, {}).get(growth_stage, 1.0)
+
+    field = FieldWaterBalance(capacity=1)
+    idx = field.add_field("plan", soil_type, crop_type, kc, BASE_ET0)
+    field.depletion[idx] = field.taw[idx] * (1.0 - current_soil / 100.0)
+    plan = HorizonPlanner(field).solve(rain_probability)
+
+    data = []
+    for i, day in enumerate(forecast):
+        irrigation_mm = float(plan["irrigation"][idx, i])
+        data.append({
+            "date": day["date"],
+            "name": datetime.datetime.strptime(day["date"], "%Y-%m-%d").strftime("%a"),
+            "rain_probability": rain_probability[i],
+            "irrigation_mm": round(irrigation_mm, 2),
+            "liters": round(irrigation_mm * 10000 * field_size),
+            "moisture_percent": round(100.0 * (1.0 - plan["depletion"][idx, i + 1] / field.taw[idx]), 1),
+        })
+    return data
@@ -0,0 +1,202 @@
+"""
+Online soil-moisture forecaster.
+
+A small linear model per field predicts the moisture rate (%/hour) from the
+current moisture, the last observed rate, pump state, crop ET and expected
+rain. It is trained online by normalized LMS on every sample pair at least
+MIN_TRAIN_SECONDS apart (O(features) per update), and rolled forward in
+ROLLOUT_STEPS linear steps for a 24h forecast.
+
+New fields start from their soil class's weights, which are trained on every
+field of that class, so a field is useful before it has history of its own.
+Memory is fixed per field: weights, one anchor sample and a few counters.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+
+from water_balance import SOIL_PROPERTIES, soil_key
+
+FEATURES = ("bias", "moisture", "last_rate", "pump_on", "etc", "rain")
+LEARNING_RATE = 0.15         # NLMS step size (0..2, lower = smoother)
+CLASS_LEARNING_RATE = 0.05   # soil-class prior learns more slowly
+MIN_TRAIN_SECONDS = 3600     # shorter gaps are dominated by sensor noise
+MAX_TRAIN_SECONDS = 6 * 3600 # longer gaps (outages) are not a clean rate sample
+MIN_SAMPLES = 12             # hourly updates before a field's own forecast is used
+ERROR_SMOOTHING = 0.1
+FORECAST_HOURS = 24.0
+ROLLOUT_STEPS = 4
+INITIAL_CAPACITY = 16
+
+SOIL_CLASSES = tuple(SOIL_PROPERTIES)
+
+
+def _features(moisture, last_rate, pump_on, etc, rain) -> np.ndarray:
+    """Feature rows, scaled to similar magnitudes: (..., len(FEATURES))."""
+    moisture, last_rate, pump_on, etc, rain = np.broadcast_arrays(
+        *(np.asarray(v, dtype=float) for v in (moisture, last_rate, pump_on, etc, rain)))
+    return np.stack([np.ones_like(moisture), moisture / 100.0, last_rate, pump_on,
+                     etc / 10.0, rain / 10.0], axis=-1)
+
+
+class MoistureModel:
+    """
+    Per-field online moisture forecaster for a fleet, array-backed like
+    FieldWaterBalance. Single-field calls serve one agent; the *_all
+    variants update or predict many fields in one vectorized step.
+    """
+
+    COLUMNS = ("anchor_moisture", "anchor_time", "last_rate", "samples", "abs_error", "soil_class")
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.index: Dict[str, int] = {}
+        self.size = 0
+        k = len(FEATURES)
+        self.class_weights = np.zeros((len(SOIL_CLASSES), k))
+        self._alloc(max(1, capacity))
+
+    def _alloc(self, capacity: int):
+        k = len(FEATURES)
+        weights = np.zeros((capacity, k))
+        anchor_x = np.zeros((capacity, k))
+        columns = {name: np.zeros(capacity) for name in self.COLUMNS}
+        columns["anchor_time"][:] = np.nan
+        if self.size:
+            weights[:self.size] = self.weights[:self.size]
+            anchor_x[:self.size] = self.anchor_x[:self.size]
+            for name in self.COLUMNS:
+                columns[name][:self.size] = getattr(self, name)[:self.size]
+        self.weights, self.anchor_x = weights, anchor_x
+        for name, column in columns.items():
+            setattr(self, name, column)
+        self.capacity = capacity
+
+    # --- Persistence ---
+    def to_state(self) -> Dict:
+        n = self.size
+        columns = {name: getattr(self, name)[:n].tolist() for name in self.COLUMNS}
+        columns["anchor_time"] = [None if np.isnan(t) else t for t in self.anchor_time[:n]]
+        return {"index": self.index, "columns": columns, "weights": self.weights[:n].tolist(),
+                "anchor_x": self.anchor_x[:n].tolist(), "class_weights": self.class_weights.tolist()}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "MoistureModel":
+        model = cls(capacity=max(INITIAL_CAPACITY, len(state["index"])))
+        model.index = dict(state["index"])
+        n = model.size = len(model.index)
+        for name in cls.COLUMNS:
+            values = state["columns"][name]
+            if name == "anchor_time":
+                values = [np.nan if t is None else t for t in values]
+            getattr(model, name)[:n] = values
+        if n:
+            model.weights[:n] = state["weights"]
+            model.anchor_x[:n] = state["anchor_x"]
+        model.class_weights[:] = state["class_weights"]
+        return model
+
+    # --- Registry ---
+    def add_field(self, name: str, soil_type: str = "") -> int:
+        if name in self.index:
+            return self.index[name]
+        if self.size == self.capacity:
+            self._alloc(self.capacity * 2)
+        idx = self.size
+        self.size += 1
+        self.index[name] = idx
+        self.set_soil(idx, soil_type)
+        return idx
+
+    def set_soil(self, idx: int, soil_type: str):
+        soil_class = SOIL_CLASSES.index(soil_key(soil_type))
+        if self.samples[idx] == 0 or self.soil_class[idx] != soil_class:
+            # No (or no longer relevant) history: start from the class prior
+            self.weights[idx] = self.class_weights[soil_class]
+            self.samples[idx] = 0
+        self.soil_class[idx] = soil_class
+
+    # --- Online Training ---
+    def observe(self, idx: int, moisture: float, now: float, pump_on: bool = False,
+                etc: float = 0.0, rain: float = 0.0):
+        """
+        Records a moisture sample. Once MIN_TRAIN_SECONDS have passed since
+        the anchor sample, the observed rate trains the field and its soil
+        class and this sample becomes the new anchor. pump_on/etc/rain
+        describe conditions from now until the next sample.
+        """
+        sel = np.array([idx])
+        self.observe_all(sel, np.array([moisture], dtype=float), now,
+                         np.array([pump_on], dtype=float), np.array([etc], dtype=float),
+                         np.array([rain], dtype=float))
+
+    def observe_all(self, indices: np.ndarray, moisture: np.ndarray, now: float,
+                    pump_on: np.ndarray, etc: np.ndarray, rain: np.ndarray):
+        elapsed = now - self.anchor_time[indices]
+        first = np.isnan(elapsed)
+        due = ~first & (elapsed >= MIN_TRAIN_SECONDS)
+        train = due & (elapsed <= MAX_TRAIN_SECONDS)
+
+        if train.any():
+            idx = indices[train]
+            classes = self.soil_class[idx].astype(int)
+            fresh = self.samples[idx] == 0
+            self.weights[idx[fresh]] = self.class_weights[classes[fresh]]
+            x = self.anchor_x[idx]
+            rate = (moisture[train] - self.anchor_moisture[idx]) / (elapsed[train] / 3600.0)
+            norm = 1.0 + np.einsum("ij,ij->i", x, x)
+            error = rate - np.einsum("ij,ij->i", self.weights[idx], x)
+            self.weights[idx] += (LEARNING_RATE * error / norm)[:, None] * x
+
+            class_error = rate - np.einsum("ij,ij->i", self.class_weights[classes], x)
+            step = (CLASS_LEARNING_RATE * class_error / norm)[:, None] * x
+            # Average the class step over the fields that contributed to it
+            counts = np.maximum(1, np.bincount(classes, minlength=len(SOIL_CLASSES)))
+            for k in range(step.shape[1]):
+                self.class_weights[:, k] += np.bincount(classes, weights=step[:, k],
+                                                        minlength=len(SOIL_CLASSES)) / counts
+
+            self.abs_error[idx] += ERROR_SMOOTHING * (np.abs(error) - self.abs_error[idx])
+            self.samples[idx] += 1
+            self.last_rate[idx] = rate
+
+        # Outage gaps reset the rate memory rather than training on it
+        self.last_rate[indices[due & ~train]] = 0.0
+
+        anchor = first | due
+        if anchor.any():
+            idx = indices[anchor]
+            self.anchor_moisture[idx] = moisture[anchor]
+            self.anchor_time[idx] = now
+            self.anchor_x[idx] = _features(moisture[anchor], self.last_rate[idx],
+                                           pump_on[anchor], etc[anchor], rain[anchor])
+
+    # --- Inference ---
+    def predict(self, idx: int, moisture: float, pump_on: bool = False, etc: float = 0.0,
+                rain: float = 0.0, hours: float = FORECAST_HOURS) -> Optional[float]:
+        """Moisture (%) expected `hours` from now, or None until the field is trained."""
+        if self.samples[idx] < MIN_SAMPLES:
+            return None
+        # Scalar rollout: a handful of multiply-adds, no array overhead
+        weights = self.weights[idx].tolist()
+        rate = float(self.last_rate[idx])
+        step_hours = hours / ROLLOUT_STEPS
+        for _ in range(ROLLOUT_STEPS):
+            x = (1.0, moisture / 100.0, rate, float(pump_on), etc / 10.0, rain / 10.0)
+            rate = sum(w * v for w, v in zip(weights, x))
+            moisture = min(100.0, max(0.0, moisture + rate * step_hours))
+        return moisture
+
+    def predict_all(self, indices: np.ndarray, moisture: np.ndarray, pump_on: np.ndarray,
+                    etc: np.ndarray, rain: np.ndarray, hours: float = FORECAST_HOURS) -> np.ndarray:
+        """Vectorized forecast; untrained fields are predicted from their class weights."""
+        trained = (self.samples[indices] >= MIN_SAMPLES)[:, None]
+        weights = np.where(trained, self.weights[indices],
+                           self.class_weights[self.soil_class[indices].astype(int)])
+        step_hours = hours / ROLLOUT_STEPS
+        predicted = np.asarray(moisture, dtype=float).copy()
+        rate = self.last_rate[indices]
+        for _ in range(ROLLOUT_STEPS):
+            x = _features(predicted, rate, pump_on, etc, rain)
+            rate = np.einsum("ij,ij->i", weights, x)
+            predicted = np.clip(predicted + rate * step_hours, 0.0, 100.0)
+        return predicted
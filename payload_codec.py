@@ -0,0 +1,125 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# Optional fast JSON backend; falls back to the stdlib encoder.
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+# --- Reason Codes ---
+# The agent pushes only these short codes; dashboards expand them to text.
+REASON_MANUAL = "MAN"
+REASON_STALE = "STALE"
+REASON_FAULT = "FAULT"
+REASON_RAIN = "RAIN"
+REASON_DRY = "DRY"
+REASON_NEED = "NEED"
+REASON_OK = "OK"
+
+REASON_TEXT = {
+    REASON_MANUAL: "MANUAL OVERRIDE: User forced Pump {manual_state}",
+    REASON_STALE: "Sensor data stale. Holding pump OFF.",
+    REASON_FAULT: "Sensor/pump fault suspected. Holding pump OFF.",
+    REASON_RAIN: "Rain likely ({rain}%). Skipping irrigation.",
+    REASON_DRY: "EMERGENCY: Soil dangerously dry ({moisture}%). Forcing irrigation.",
+    REASON_NEED: "Need {demand_mm:.1f}mm for {crop}. Input: {liters}L",
+    REASON_OK: "Moisture sufficient ({moisture}%). {crop} is happy.",
+}
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def describe_reason(code: Optional[str], attributes: Dict[str, Any], crop: str = "crop") -> str:
+    """Expands a reason code into the human text, from the pushed attributes."""
+    template = REASON_TEXT.get(code)
+    if template is None:
+        return "Waiting for AI..."
+    liters = attributes.get("liters_total", 0)
+    return template.format(
+        manual_state=attributes.get("manual_state", "OFF"),
+        rain=attributes.get("ai_weather_rain", 0),
+        moisture=attributes.get("ai_moisture", attributes.get("current_moisture", 0)),
+        demand_mm=attributes.get("liters_per_ha", 0) / 10000.0,
+        crop=crop,
+        liters=liters,
+    )
+
+
+def format_ts(ts_ms) -> str:
+    """Dashboard-side rendering of the integer epoch-millisecond timestamp."""
+    if not isinstance(ts_ms, (int, float)):
+        return str(ts_ms)
+    return datetime.fromtimestamp(ts_ms / 1000.0).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class DecisionEncoder:
+    """
+    Per-device encoder for pushed decisions. The JSON layout is built once as
+    a %-template; each push only formats numbers and enum strings into it,
+    skipping dict construction and generic JSON encoding on the hot path.
+    """
+
+    TEMPLATE = (
+        '{"pump_decision":"%s","pump_duration":%d,"ai_reason_code":"%s",'
+        '"ai_moisture":%.1f,"ai_weather_temp":%.1f,"ai_weather_rain":%d,'
+        '"last_decision_ts":%d,"ai_data_stale":%s,"liters_total":%d,"liters_per_ha":%d,'
+        '"water_today":%d,"water_saved_today":%d,"water_week":%d,"water_saved_week":%d}'
+    )
+
+    def __init__(self, field_size: float):
+        self.set_field_size(field_size)
+
+    def set_field_size(self, field_size: float):
+        self.field_size = field_size
+        self._inv_size = 1.0 / field_size if field_size > 0 else 0.0
+
+    def _fields(self, result: Dict[str, Any]) -> tuple:
+        weather = result["weather_summary"]
+        liters = result["liters_for_field"]
+        return (
+            result["decision"],
+            result["duration_seconds"],
+            result["reason_code"],
+            result["soil_moisture_percent"],
+            weather["temperature"],
+            weather["rain_probability"],
+            result["timestamp"],
+            "true" if result.get("data_stale") else "false",
+            liters,
+            liters * self._inv_size,
+            result.get("water_today_liters", 0),
+            result.get("water_saved_today_liters", 0),
+            result.get("water_week_liters", 0),
+            result.get("water_saved_week_liters", 0),
+        )
+
+    def encode(self, result: Dict[str, Any]) -> bytes:
+        return (self.TEMPLATE % self._fields(result)).encode()
+
+    def encode_dict(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Same payload as encode(), as a dict for batched uploads that merge attributes."""
+        (decision, duration, code, moisture, temp, rain, ts, stale, liters, per_ha,
+         water_today, saved_today, water_week, saved_week) = self._fields(result)
+        return {
+            "pump_decision": decision,
+            "pump_duration": duration,
+            "ai_reason_code": code,
+            "ai_moisture": moisture,
+            "ai_weather_temp": temp,
+            "ai_weather_rain": rain,
+            "last_decision_ts": ts,
+            "ai_data_stale": stale == "true",
+            "liters_total": liters,
+            "liters_per_ha": int(per_ha),
+            "water_today": water_today,
+            "water_saved_today": saved_today,
+            "water_week": water_week,
+            "water_saved_week": saved_week,
+        }
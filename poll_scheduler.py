@@ -0,0 +1,192 @@
+import heapq
+import itertools
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import profiling
+from payload_codec import REASON_FAULT
+from water_balance import BASE_ET0
+
+# --- Adaptive Polling Limits ---
+MIN_INTERVAL = 2          # seconds; manual override / first reading
+PUMPING_INTERVAL = 30     # seconds; upper bound while the pump is ordered ON
+MAX_INTERVAL = 300        # seconds; also bounds how late a new override is seen
+STALE_INTERVAL = 30       # seconds; upstream unhealthy, breaker decides the rest
+FAULT_INTERVAL = 30       # seconds; sensor/pump fault, watch for it to clear
+RAIN_INTERVAL = 120       # seconds; rain lockout holds only while the forecast does
+SAFETY_FACTOR = 0.5       # check again halfway to the predicted change
+
+
+def decision_boundaries(agent, weather: Dict[str, Any], moisture: float) -> List[float]:
+    """
+    Moisture levels (%) at which analyze_and_decide would flip its decision
+    for the agent's current crop, forecast and moisture model, from the
+    thresholds decision_core decides with.
+    """
+    # Imported here: decision_core imports this module
+    from decision_core import (
+        CRITICAL_MOISTURE_PERCENT, FORECAST_DRY_PERCENT, NEED_DEMAND_MM, RAIN_MM_AT_CERTAINTY,
+        SOIL_CREDIT_FROM_PERCENT, SOIL_CREDIT_MAX, SOIL_CREDIT_SPAN_PERCENT,
+    )
+
+    boundaries = [float(CRITICAL_MOISTURE_PERCENT)]
+    demand = BASE_ET0 * agent._kc()
+    expected_rain = (weather.get("rain_probability", 0) / 100.0) * RAIN_MM_AT_CERTAINTY
+    if demand > 0:
+        # net_demand = demand * (1 - SOIL_CREDIT_MAX * soil_factor) - rain crosses NEED_DEMAND_MM here
+        soil_factor = (1.0 - (NEED_DEMAND_MM + expected_rain) / demand) / SOIL_CREDIT_MAX
+        if 0.0 < soil_factor < 1.0:
+            boundaries.append(SOIL_CREDIT_FROM_PERCENT + SOIL_CREDIT_SPAN_PERCENT * soil_factor)
+
+    # Forecast dryness: the moisture where the model's 24h forecast reaches
+    # FORECAST_DRY_PERCENT. The rollout is affine in the starting moisture
+    # (until it clips at 0/100), so two forecasts locate it.
+    if agent.moisture_model is not None:
+        conditions = agent._model_conditions()
+        here = agent.moisture_model.predict(agent.model_index, moisture, False, *conditions)
+        if here is not None:
+            step = 1.0 if moisture < 50.0 else -1.0
+            there = agent.moisture_model.predict(agent.model_index, moisture + step, False, *conditions)
+            slope = (there - here) / step
+            if slope > 0:
+                boundaries.append(moisture + (FORECAST_DRY_PERCENT - here) / slope)
+    return boundaries
+
+
+def seconds_until_change(moisture: float, trend_per_hour: float, boundaries: Iterable[float]) -> float:
+    """Time until the moisture trend carries the reading across the nearest boundary."""
+    if trend_per_hour == 0:
+        return float("inf")
+    best = float("inf")
+    for boundary in boundaries:
+        distance = boundary - moisture
+        # Only boundaries in the direction the soil is moving
+        if distance * trend_per_hour > 0:
+            best = min(best, distance / trend_per_hour * 3600.0)
+    return best
+
+
+def next_check_seconds(agent, result: Optional[Dict[str, Any]],
+                       min_interval: float = MIN_INTERVAL, max_interval: float = MAX_INTERVAL) -> float:
+    """
+    Earliest time the agent's decision could plausibly change, from its
+    moisture trend, pump decision, forecast rain, override status and
+    water-balance prediction.
+    """
+    if result is None:
+        return min_interval
+    if agent.manual_mode:
+        return min_interval
+    if result.get("data_stale"):
+        return max(min_interval, STALE_INTERVAL)
+    if result.get("reason_code") == REASON_FAULT:
+        return max(min_interval, min(max_interval, FAULT_INTERVAL))
+
+    from decision_core import RAIN_LOCKOUT_PERCENT
+
+    weather = result["weather_summary"]
+    if weather.get("rain_probability", 0) > RAIN_LOCKOUT_PERCENT:
+        return max(min_interval, min(max_interval, RAIN_INTERVAL))
+
+    moisture = result["soil_moisture_percent"]
+    horizon = seconds_until_change(moisture, agent.moisture_trend, decision_boundaries(agent, weather, moisture))
+    if result["decision"] == "PUMP_ON":
+        # Soil is rising toward the OFF boundary; keep watching closely
+        return max(min_interval, min(PUMPING_INTERVAL, max_interval, horizon * SAFETY_FACTOR))
+
+    # 0 means the root zone is already past its trigger, which says nothing
+    # about when the decision flips; only a future crossing narrows the horizon
+    hours_to_threshold = result.get("hours_to_threshold")
+    if hours_to_threshold:
+        horizon = min(horizon, hours_to_threshold * 3600.0)
+    return max(min_interval, min(max_interval, horizon * SAFETY_FACTOR))
+
+
+CYCLE = "cycle"
+RESEND = "resend"
+
+
+class FleetScheduler:
+    """
+    Runs many agents on one thread, each on its own adaptive schedule.
+    Agents sit in a heap keyed by their next due time, together with the
+    deadlines at which an unacknowledged decision is due for a re-send
+    (ActuationTracker.resend_due_in) when that comes before the next cycle.
+    """
+
+    def __init__(self, agents: Iterable, min_interval: float = MIN_INTERVAL,
+                 max_interval: float = MAX_INTERVAL,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = profiling.sleep,
+                 checkpointer=None, spread_seconds: float = 0.0):
+        self.min_interval = min_interval
+        self.checkpointer = checkpointer
+        self.max_interval = max_interval
+        self.clock = clock
+        self.sleep = sleep
+        self._seq = itertools.count()
+        self._heap = []
+        self._next_cycle: Dict[int, float] = {}  # id(agent) -> next cycle due time
+        self._resend_at: Dict[int, float] = {}   # id(agent) -> live re-send deadline
+        now = clock()
+        agents = list(agents)
+        # Stagger first fetches (e.g. after a warm restart) instead of a burst
+        for i, agent in enumerate(agents):
+            self.add(agent, now + spread_seconds * i / max(1, len(agents)))
+        self.cycles_run = 0
+        self.resend_checks = 0
+
+    def add(self, agent, due: Optional[float] = None):
+        due = self.clock() if due is None else due
+        self._next_cycle[id(agent)] = due
+        heapq.heappush(self._heap, (due, next(self._seq), CYCLE, agent))
+
+    def _schedule_resend(self, agent, now: float):
+        """Queues the agent's re-send deadline if it falls before its next cycle."""
+        due_in = agent.actuation.resend_due_in(agent.device_name, agent.clock())
+        if due_in is None or now + due_in >= self._next_cycle[id(agent)]:
+            self._resend_at.pop(id(agent), None)
+            return
+        self._resend_at[id(agent)] = now + due_in
+        heapq.heappush(self._heap, (now + due_in, next(self._seq), RESEND, agent))
+
+    def run_due(self) -> int:
+        """
+        Runs every agent cycle that is due now and reschedules it, and
+        confirms / re-sends decisions whose ack deadline passed; returns how
+        many cycles ran.
+        """
+        ran = 0
+        now = self.clock()
+        while self._heap and self._heap[0][0] <= now:
+            due, _, kind, agent = heapq.heappop(self._heap)
+            if kind == RESEND:
+                if self._resend_at.get(id(agent)) != due:
+                    continue  # superseded by a later cycle or deadline
+                self.resend_checks += 1
+                agent.confirm_or_resend()
+                self._schedule_resend(agent, now)
+                continue
+            result = agent.run_cycle()
+            wait = next_check_seconds(agent, result, self.min_interval, self.max_interval)
+            self.add(agent, now + wait)
+            self._schedule_resend(agent, now)
+            ran += 1
+        self.cycles_run += ran
+        return ran
+
+    def next_due_in(self) -> float:
+        if not self._heap:
+            return self.max_interval
+        return max(0.0, self._heap[0][0] - self.clock())
+
+    def run_forever(self):
+        print(f"Starting Fleet Scheduler ({len(self._heap)} fields, {self.min_interval}-{self.max_interval}s)")
+        try:
+            while True:
+                self.run_due()
+                if self.checkpointer is not None:
+                    self.checkpointer.maybe_save()
+                self.sleep(self.next_due_in())
+        except KeyboardInterrupt:
+            print("\nStopping Fleet Scheduler...")
@@ -0,0 +1,311 @@
+"""
+On-demand profiling for a running agent.
+
+Nothing is sampled until a session is started, either by signal
+(SIGUSR1 = sampling profiler, SIGUSR2 = cProfile) or through the local
+admin endpoint:
+
+    curl 'http://127.0.0.1:8765/profile/start?seconds=30&mode=sample'
+    curl 'http://127.0.0.1:8765/profile/stop'
+    curl 'http://127.0.0.1:8765/profile/status'
+    curl 'http://127.0.0.1:8765/metrics'          (registered agent metrics)
+
+A session writes, into PROFILE_DIR:
+    <name>.folded  one "stage;file:function;... count" line per stack,
+                   loadable by flamegraph.pl / speedscope (sample mode)
+    <name>.txt     per-function self/total statistics
+    <name>.pstats  raw cProfile data (cprofile mode)
+
+Samples are tagged with the cycle stage set via set_stage() (fetch,
+weather, decide, push). While idle, set_stage() is a single global check.
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse, parse_qs
+
+PROFILE_DIR = os.environ.get("AGENT_PROFILE_DIR", "profiles")
+DEFAULT_SECONDS = 30.0
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+MAX_STACK_DEPTH = 64
+
+SAMPLE = "sample"
+CPROFILE = "cprofile"
+
+_session = None
+_stages: Dict[int, str] = {}
+_lock = threading.Lock()
+_wake = threading.Event()  # interrupts sleep() when a cProfile session is armed or stopped
+_signal_request: Optional[str] = None  # mode toggled by a signal, acted on by check()
+_signal_seconds = DEFAULT_SECONDS
+log = logging.getLogger("profiling")
+_metrics: Dict[str, Callable[[], Dict[str, object]]] = {}
+
+
+def set_stage(name: Optional[str]):
+    """Tags the calling thread's samples with a cycle stage (no-op when idle)."""
+    if _session is not None:
+        _stages[threading.get_ident()] = name
+
+
+class _SamplingSession:
+    def __init__(self, seconds: float, interval: float = SAMPLE_INTERVAL):
+        self.mode = SAMPLE
+        self.seconds = seconds
+        self.interval = interval
+        self.started = time.time()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        main = threading.main_thread().ident
+        deadline = time.monotonic() + self.seconds
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                # Agent threads only: the main loop and anything that tagged a stage
+                if ident != main and ident not in _stages:
+                    continue
+                parts = []
+                while frame is not None and len(parts) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                parts.append(_stages.get(ident) or "untagged")
+                self.stacks[";".join(reversed(parts))] += 1
+                self.samples += 1
+            time.sleep(self.interval)
+        _finish(self)
+
+    def stop(self):
+        self._stop.set()
+
+    def write(self, base: str) -> Dict[str, str]:
+        with open(base + ".folded", "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        stage_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            stage_counts[frames[0]] += count
+            self_counts[frames[-1]] += count
+            for fn in set(frames[1:]):
+                total_counts[fn] += count
+
+        with open(base + ".txt", "w") as f:
+            f.write(f"{self.samples} samples every {self.interval * 1000:.1f} ms\n\n")
+            f.write("Samples by stage:\n")
+            for stage_name, count in stage_counts.most_common():
+                f.write(f"  {stage_name:<12} {count:>8} {count / max(1, self.samples):7.1%}\n")
+            f.write(f"\n{'self':>8} {'total':>8}  function\n")
+            for fn, count in total_counts.most_common(50):
+                f.write(f"{self_counts[fn]:>8} {count:>8}  {fn}\n")
+        return {"folded": base + ".folded", "stats": base + ".txt"}
+
+
+class _CProfileSession:
+    """
+    Deterministic profile of the agent loop thread. cProfile only sees the
+    thread that enabled it, so the session is armed here and enabled /
+    finished by check() on the agent thread, at cycle boundaries or from
+    sleep() between cycles.
+    """
+
+    def __init__(self, seconds: float):
+        self.mode = CPROFILE
+        self.seconds = seconds
+        self.started = time.time()
+        self.profiler = cProfile.Profile()
+        self.enabled = False
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+        _wake.set()
+
+    def write(self, base: str) -> Dict[str, str]:
+        self.profiler.disable()
+        self.profiler.dump_stats(base + ".pstats")
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(50)
+        with open(base + ".txt", "w") as f:
+            f.write(out.getvalue())
+        return {"pstats": base + ".pstats", "stats": base + ".txt"}
+
+
+_last_outputs: Dict[str, str] = {}
+
+
+def _finish(session):
+    global _session, _last_outputs
+    with _lock:
+        if _session is not session:
+            return
+        _session = None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, time.strftime("profile-%Y%m%d-%H%M%S", time.localtime(session.started)))
+    _last_outputs = session.write(base)
+    _stages.clear()
+    log.info(" [Profiler] %s profile written: %s", session.mode, ", ".join(_last_outputs.values()))
+
+
+def start(seconds: float = DEFAULT_SECONDS, mode: str = SAMPLE) -> bool:
+    """Starts a profiling session; returns False if one is already running."""
+    global _session
+    with _lock:
+        if _session is not None:
+            return False
+        if mode == CPROFILE:
+            _session = _CProfileSession(seconds)
+        else:
+            _session = _SamplingSession(seconds)
+    if mode == CPROFILE:
+        _wake.set()
+    log.info(" [Profiler] %s profiling started for %.0fs", mode, seconds)
+    return True
+
+
+def stop() -> bool:
+    session = _session
+    if session is None:
+        return False
+    session.stop()
+    return True
+
+
+def check():
+    """
+    Called by the agent loop once per cycle: acts on a signal toggle,
+    enables an armed cProfile session on this thread, and finishes it once
+    stopped or expired.
+    """
+    global _session, _signal_request
+    if _signal_request is not None:
+        mode, _signal_request = _signal_request, None
+        if not start(_signal_seconds, mode):
+            stop()
+    session = _session
+    if session is None or session.mode != CPROFILE:
+        return
+    if session.stopped or time.time() - session.started >= session.seconds:
+        if session.enabled:
+            _finish(session)
+        else:
+            with _lock:
+                _session = None
+    elif not session.enabled:
+        session.enabled = True
+        session.profiler.enable()
+
+
+def sleep(seconds: float):
+    """
+    time.sleep() for the agent loop between cycles. Wakes as soon as a
+    cProfile session is armed, stopped or expires and runs check(), so an
+    N-second profile starts and ends on time however far apart cycles are.
+    """
+    deadline = time.time() + seconds
+    while True:
+        check()
+        now = time.time()
+        remaining = deadline - now
+        session = _session
+        if session is not None and session.mode == CPROFILE and session.enabled:
+            remaining = min(remaining, session.started + session.seconds - now)
+        if remaining <= 0:
+            return
+        if _wake.wait(remaining):
+            _wake.clear()
+
+
+def status() -> Dict[str, object]:
+    session = _session
+    if session is None:
+        return {"running": False, "last_outputs": _last_outputs}
+    return {"running": True, "mode": session.mode, "seconds": session.seconds,
+            "elapsed": round(time.time() - session.started, 1)}
+
+
+def register_metrics(name: str, provider: Callable[[], Dict[str, object]]):
+    """Adds a section to the admin endpoint's /metrics (provider is called per request)."""
+    _metrics[name] = provider
+
+
+def metrics() -> Dict[str, object]:
+    return {name: provider() for name, provider in _metrics.items()}
+
+
+# --- Triggers ---
+def install_signal_handlers(seconds: float = DEFAULT_SECONDS):
+    """
+    SIGUSR1 toggles the sampling profiler, SIGUSR2 toggles cProfile. The
+    handler only records the request and wakes sleep(); check() on the agent
+    loop starts / stops the session, since the handler runs on the main
+    thread and could interrupt it while it holds _lock.
+    """
+    global _signal_seconds
+    if not hasattr(signal, "SIGUSR1"):
+        return  # Windows: use the admin endpoint instead
+    _signal_seconds = seconds
+
+    def toggle(mode):
+        def handler(signum, frame):
+            global _signal_request
+            _signal_request = mode
+            _wake.set()
+        return handler
+
+    signal.signal(signal.SIGUSR1, toggle(SAMPLE))
+    signal.signal(signal.SIGUSR2, toggle(CPROFILE))
+
+
+class _AdminHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        if parsed.path == "/profile/start":
+            seconds = float(query.get("seconds", [DEFAULT_SECONDS])[0])
+            mode = query.get("mode", [SAMPLE])[0]
+            body = {"started": start(seconds, mode)}
+        elif parsed.path == "/profile/stop":
+            body = {"stopped": stop()}
+        elif parsed.path == "/profile/status":
+            body = status()
+        elif parsed.path == "/metrics":
+            body = metrics()
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        raw = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+def start_admin_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serves /profile/{start,stop,status} and /metrics on localhost only."""
+    server = ThreadingHTTPServer((host, port), _AdminHandler)
+    threading.Thread(target=server.serve_forever, name="profiler-admin", daemon=True).start()
+    log.info(" [Profiler] Admin endpoint on http://%s:%d/profile/status", host, port)
+    return server
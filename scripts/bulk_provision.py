@@ -0,0 +1,368 @@
+"""
+Bulk ThingsBoard provisioning for a fleet of fields.
+
+Reads a field inventory (CSV with name,zone,crop,stage,soil,size_ha and an
+optional token column) and, for every field, concurrently:
+
+    1. finds or creates the device (with the inventory's access token, or a new one)
+    2. reads the access token of devices that already existed
+    3. writes the field config as shared attributes (config_crop_type, ...),
+       unless an existing device already has exactly that config
+    4. finds or creates its dashboard from thingsboard_dashboard.json
+
+One JWT session is shared by all workers (refreshed once when it expires),
+requests go through a client-side rate limiter and back off on HTTP 429,
+and every step looks before it creates, so re-running after a failure or
+on a grown inventory only does the missing work. Writes a fleet inventory
+(name,token,zone) for fleet_dashboard.py / FLEET_DEVICES.
+
+    python scripts/bulk_provision.py fields.csv --server http://localhost:8080 \\
+        --workers 16 --rate 200 --output fleet.csv
+"""
+import argparse
+import copy
+import csv
+import getpass
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from field_config import CONFIG_VERSION, next_version
+
+DEFAULT_DASHBOARD = os.path.join(ROOT, "thingsboard_dashboard.json")
+TB_SERVER_URL = "https://demo.thingsboard.io"
+
+DEVICE_TYPE = "irrigation-field"
+DEFAULT_WORKERS = 16
+DEFAULT_RATE = 100.0        # requests/second across all workers (0 = unlimited)
+HTTP_TIMEOUT_SECONDS = 10
+MAX_ATTEMPTS = 5            # per request, for 429 / 5xx / connection errors
+BACKOFF_SECONDS = 0.5       # doubled per attempt
+PROGRESS_SECONDS = 2.0
+DASHBOARD_PAGE_SIZE = 1000
+
+# Inventory column -> shared attribute the agent reads
+CONFIG_ATTRIBUTES = {
+    "crop": "config_crop_type",
+    "stage": "config_growth_stage",
+    "soil": "config_soil_type",
+    "size_ha": "config_field_size",
+    "zone": "config_zone",
+}
+
+
+class ProvisionError(Exception):
+    pass
+
+
+def load_fields(path: str) -> List[Dict[str, str]]:
+    with open(path, newline="") as f:
+        fields = [{k: (v or "").strip() for k, v in row.items()} for row in csv.DictReader(f)]
+    names = [field.get("name") for field in fields]
+    if not all(names):
+        raise ProvisionError(f"{path}: every row needs a name")
+    if len(set(names)) != len(names):
+        raise ProvisionError(f"{path}: duplicate field names")
+    return fields
+
+
+class RateLimiter:
+    """Token bucket shared by all workers."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                delay = (1.0 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+class TBSession:
+    """
+    Authenticated, pooled, rate-limited ThingsBoard REST client, safe to
+    share between threads. A 401 triggers one token refresh (or re-login)
+    for all threads, then the request is retried.
+    """
+
+    def __init__(self, server: str, username: str, password: str, rate: float = DEFAULT_RATE,
+                 pool_size: int = DEFAULT_WORKERS):
+        self.server = server.rstrip("/")
+        self.username = username
+        self.password = password
+        self.limiter = RateLimiter(rate)
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+        self.lock = threading.Lock()
+        self.token = None
+        self.refresh_token = None
+        self.token_generation = 0
+        self.stats = {"requests": 0, "throttled": 0, "retries": 0, "token_refreshes": 0}
+        # Separate from self.lock, which is held for the whole token refresh
+        self.stats_lock = threading.Lock()
+
+    def login(self):
+        response = self.http.post(f"{self.server}/api/auth/login", timeout=HTTP_TIMEOUT_SECONDS,
+                                  json={"username": self.username, "password": self.password})
+        if response.status_code != 200:
+            raise ProvisionError(f"Login failed: {response.status_code} - {response.text}")
+        self._set_tokens(response.json())
+
+    def _set_tokens(self, body: Dict[str, str]):
+        self.token = body["token"]
+        self.refresh_token = body.get("refreshToken")
+        self.token_generation += 1
+
+    def _refresh(self, seen_generation: int):
+        with self.lock:
+            if self.token_generation != seen_generation:
+                return  # another thread already refreshed
+            self._count("token_refreshes")
+            response = None
+            if self.refresh_token:
+                response = self.http.post(f"{self.server}/api/auth/token", timeout=HTTP_TIMEOUT_SECONDS,
+                                          json={"refreshToken": self.refresh_token})
+            if response is not None and response.status_code == 200:
+                self._set_tokens(response.json())
+            else:
+                self.login()
+
+    def _count(self, key: str):
+        """Bumps a stats counter; request() runs on many worker threads."""
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def request(self, method: str, path: str, expect_404: bool = False, **kwargs) -> Optional[Any]:
+        """JSON body of the response, or None for an expected 404."""
+        for attempt in range(MAX_ATTEMPTS):
+            self.limiter.wait()
+            generation = self.token_generation
+            headers = {"X-Authorization": f"Bearer {self.token}"}
+            self._count("requests")
+            try:
+                response = self.http.request(method, self.server + path, headers=headers,
+                                             timeout=HTTP_TIMEOUT_SECONDS, **kwargs)
+            except requests.RequestException as e:
+                error = str(e)
+            else:
+                if response.status_code == 200:
+                    return response.json() if response.content else None
+                if response.status_code == 404 and expect_404:
+                    return None
+                if response.status_code == 401:
+                    self._refresh(generation)
+                    continue
+                error = f"{response.status_code} - {response.text[:200]}"
+                if response.status_code == 429:
+                    self._count("throttled")
+                elif response.status_code < 500:
+                    raise ProvisionError(f"{method} {path}: {error}")
+            self._count("retries")
+            time.sleep(BACKOFF_SECONDS * (2 ** attempt))
+        raise ProvisionError(f"{method} {path}: gave up after {MAX_ATTEMPTS} attempts ({error})")
+
+    def existing_dashboards(self, prefix: str) -> Dict[str, str]:
+        """title -> dashboard id for every dashboard whose title starts with prefix (paged once up front)."""
+        titles, page = {}, 0
+        while True:
+            body = self.request("GET", "/api/tenant/dashboards",
+                                params={"pageSize": DASHBOARD_PAGE_SIZE, "page": page, "textSearch": prefix})
+            for dashboard in body["data"]:
+                titles[dashboard["title"]] = dashboard["id"]["id"]
+            if not body.get("hasNext"):
+                return titles
+            page += 1
+
+
+def field_dashboard(template: Dict[str, Any], title: str, device_id: str) -> Dict[str, Any]:
+    """The dashboard template bound to one device (every entity alias points at it)."""
+    dashboard = copy.deepcopy(template)
+    dashboard["title"] = title
+    for alias in dashboard.get("configuration", {}).get("entityAliases", {}).values():
+        single = alias.get("filter", {}).get("singleEntity")
+        if single is not None:
+            single["id"] = device_id
+    return dashboard
+
+
+class Provisioner:
+    def __init__(self, session: TBSession, template: Optional[Dict[str, Any]], workers: int = DEFAULT_WORKERS):
+        self.session = session
+        self.template = template
+        self.workers = workers
+        self.dashboards: Dict[str, str] = {}
+        self.lock = threading.Lock()
+        self.counts = {"done": 0, "failed": 0, "devices_created": 0, "dashboards_created": 0,
+                       "configs_written": 0}
+        self.failures: List[Dict[str, str]] = []
+
+    def dashboard_title(self, name: str) -> str:
+        return f"{self.template['title']} - {name}"
+
+    def shared_config(self, device_id: str, keys: List[str]) -> Dict[str, Any]:
+        """The device's current shared values for `keys` plus config_version."""
+        path = f"/api/plugins/telemetry/DEVICE/{device_id}/values/attributes/SHARED_SCOPE"
+        rows = self.session.request("GET", path, params={"keys": ",".join(keys + [CONFIG_VERSION])})
+        return {row["key"]: row["value"] for row in rows}
+
+    def provision_field(self, field: Dict[str, str]) -> Dict[str, str]:
+        session, name = self.session, field["name"]
+        token = None
+        device = session.request("GET", "/api/tenant/devices", params={"deviceName": name}, expect_404=True)
+        if device is None:
+            # Choosing the token here saves a credentials lookup per new device
+            new_token = field.get("token") or secrets.token_hex(10)
+            try:
+                device = session.request("POST", "/api/device", params={"accessToken": new_token},
+                                         json={"name": name, "type": DEVICE_TYPE, "label": field.get("zone") or None})
+                token = new_token
+            except ProvisionError:
+                # Lost a race with another run creating the same name: use theirs
+                device = session.request("GET", "/api/tenant/devices", params={"deviceName": name}, expect_404=True)
+                if device is None:
+                    raise
+        created = token is not None
+        device_id = device["id"]["id"]
+        if token is None:
+            token = session.request("GET", f"/api/device/{device_id}/credentials")["credentialsId"]
+
+        config = {attribute: field[column] for column, attribute in CONFIG_ATTRIBUTES.items() if field.get(column)}
+        if "config_field_size" in config:
+            config["config_field_size"] = float(config["config_field_size"])
+        if config:
+            # Versioned snapshot (see field_config.py): agents reload config when the
+            # version changes, so an unchanged config is left alone
+            current = {} if created else self.shared_config(device_id, list(config))
+            if any(current.get(key) != value for key, value in config.items()):
+                snapshot = dict(config, **{CONFIG_VERSION: next_version(current.get(CONFIG_VERSION))})
+                session.request("POST", f"/api/plugins/telemetry/DEVICE/{device_id}/attributes/SHARED_SCOPE",
+                                json=snapshot)
+                with self.lock:
+                    self.counts["configs_written"] += 1
+
+        dashboard_created = False
+        if self.template is not None:
+            title = self.dashboard_title(name)
+            if title not in self.dashboards:
+                body = session.request("POST", "/api/dashboard", json=field_dashboard(self.template, title, device_id))
+                with self.lock:
+                    self.dashboards[title] = body["id"]["id"]
+                dashboard_created = True
+
+        with self.lock:
+            self.counts["devices_created"] += created
+            self.counts["dashboards_created"] += dashboard_created
+        return {"name": name, "token": token, "zone": field.get("zone") or "default"}
+
+    def run(self, fields: List[Dict[str, str]], progress_seconds: float = PROGRESS_SECONDS) -> List[Dict[str, str]]:
+        if self.template is not None:
+            self.dashboards = self.session.existing_dashboards(self.template["title"])
+        results: List[Optional[Dict[str, str]]] = [None] * len(fields)
+        start = last_report = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self.provision_field, field): i for i, field in enumerate(fields)}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                    self.counts["done"] += 1
+                except Exception as e:
+                    self.counts["failed"] += 1
+                    self.failures.append({"name": fields[i]["name"], "error": str(e)})
+                now = time.perf_counter()
+                if progress_seconds and now - last_report >= progress_seconds:
+                    last_report = now
+                    self._report(len(fields), now - start)
+        self.elapsed = time.perf_counter() - start
+        if progress_seconds:
+            self._report(len(fields), self.elapsed)
+        return [r for r in results if r is not None]
+
+    def _report(self, total: int, elapsed: float):
+        finished = self.counts["done"] + self.counts["failed"]
+        rate = finished / elapsed if elapsed > 0 else 0.0
+        eta = (total - finished) / rate if rate else 0.0
+        print(f" > {finished:,}/{total:,} fields ({self.counts['failed']:,} failed) | "
+              f"{rate:,.1f} fields/s | ETA {eta:,.0f}s | "
+              f"{self.session.stats['requests']:,} requests, {self.session.stats['throttled']:,} throttled")
+
+    def summary(self, total: int) -> Dict[str, Any]:
+        return dict(self.counts, fields=total, seconds=round(self.elapsed, 2),
+                    fields_per_sec=round(self.counts["done"] / self.elapsed, 1) if self.elapsed else None,
+                    **self.session.stats)
+
+
+def write_fleet_inventory(path: str, rows: List[Dict[str, str]]):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["name", "token", "zone"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk ThingsBoard provisioning for a fleet of fields.")
+    parser.add_argument("inventory", help="CSV: name,zone,crop,stage,soil,size_ha[,token]")
+    parser.add_argument("--server", default=os.environ.get("TB_SERVER", TB_SERVER_URL))
+    parser.add_argument("--username", default=os.environ.get("TB_USERNAME"))
+    parser.add_argument("--password", default=os.environ.get("TB_PASSWORD"))
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="max requests/second (0 = unlimited)")
+    parser.add_argument("--dashboard", default=DEFAULT_DASHBOARD, help="dashboard template JSON")
+    parser.add_argument("--no-dashboards", action="store_true", help="devices and attributes only")
+    parser.add_argument("--output", default="fleet.csv", help="fleet inventory (name,token,zone) to write")
+    parser.add_argument("--quiet", action="store_true", help="no progress lines")
+    args = parser.parse_args(argv)
+
+    print("--- Smart Irrigation Bulk Provisioner ---")
+    fields = load_fields(args.inventory)
+    print(f"Server: {args.server} | {len(fields):,} fields | {args.workers} workers | {args.rate:g} req/s")
+    username = args.username or input("Email: ").strip()
+    password = args.password or getpass.getpass("Password: ")
+
+    template = None
+    if not args.no_dashboards:
+        with open(args.dashboard) as f:
+            template = json.load(f)
+
+    session = TBSession(args.server, username, password, rate=args.rate, pool_size=args.workers)
+    session.login()
+    provisioner = Provisioner(session, template, workers=args.workers)
+    rows = provisioner.run(fields, progress_seconds=0 if args.quiet else PROGRESS_SECONDS)
+    write_fleet_inventory(args.output, rows)
+
+    summary = provisioner.summary(len(fields))
+    print(json.dumps(summary, indent=2))
+    for failure in provisioner.failures[:20]:
+        print(f" ! {failure['name']}: {failure['error']}")
+    print(f"Fleet inventory written to {args.output}")
+    if provisioner.failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
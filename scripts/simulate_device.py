@@ -1,15 +1,20 @@
 
+import os
+import sys
 import time
 import requests
 import random
 import json
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
 # ThingsBoard Config
 TB_HOST = "http://demo.thingsboard.io"
 ACCESS_TOKEN = "YOUR_ACCESS_TOKEN" # Replace with yours
 
 TELEMETRY_URL = f"{TB_HOST}/api/v1/{ACCESS_TOKEN}/telemetry"
-ATTRIBUTES_URL = f"{TB_HOST}/api/v1/{ACCESS_TOKEN}/attributes?sharedKeys=pump_command"
+ATTRIBUTES_URL = f"{TB_HOST}/api/v1/{ACCESS_TOKEN}/attributes?sharedKeys=pump_command&clientKeys=pump_decision,last_decision_ts"
+SYNC_URL = f"{TB_HOST}/api/v1/{ACCESS_TOKEN}/attributes"
 
 def simulate_device():
     print(f"🚀 Starting Virtual TB Device...")
@@ -17,6 +22,8 @@ def simulate_device():
     
     pump_state = "OFF"
     moisture = 50 
+    decision_ack = None  # id (last_decision_ts) of the newest agent decision applied...
+    decision_ack_ts = None  # ...and when (epoch ms)
     
     while True:
         # 1. Simulate Moisture
@@ -55,10 +62,64 @@ def simulate_device():
                     if cmd != pump_state:
                          print(f"🔄 Command Received: {cmd}")
                          pump_state = cmd
+                # {"client":{"pump_decision":"PUMP_ON","last_decision_ts":...}} from the agent
+                client = data.get("client", {})
+                if client.get("pump_decision") in ("PUMP_ON", "PUMP_OFF"):
+                    cmd = client["pump_decision"][5:]
+                    if cmd != pump_state:
+                         print(f"🔄 Decision Received: {cmd}")
+                         pump_state = cmd
+                    if client.get("last_decision_ts") != decision_ack:
+                         decision_ack = client.get("last_decision_ts")
+                         decision_ack_ts = int(time.time() * 1000)
         except:
             pass
+
+        # 4. Report state + acknowledge the applied decision (agent tracks the latency)
+        try:
+            sync = {"current_moisture": moisture, "pump_state": pump_state}
+            if decision_ack is not None:
+                sync["decision_ack"] = decision_ack
+                sync["decision_ack_ts"] = decision_ack_ts
+            requests.post(SYNC_URL, json=sync)
+        except Exception as e:
+            print(f"Error: {e}")
             
         time.sleep(5)
 
+def simulate_fleet(num_devices, gateway_token=ACCESS_TOKEN, interval=5):
+    """
+    Simulates many devices behind one gateway. Samples are buffered and sent
+    as gateway batches (many devices and timestamps per request) instead of
+    one POST per sample.
+    """
+    from gateway_batcher import GatewayBatcher, http_transport
+
+    print(f"🚀 Starting Virtual Gateway with {num_devices} devices...")
+    batcher = GatewayBatcher(http_transport(TB_HOST, gateway_token), max_delay=interval).start()
+    moisture = {f"Field-{i:05d}": random.randint(30, 70) for i in range(num_devices)}
+    pump_state = {name: "OFF" for name in moisture}
+
+    try:
+        while True:
+            ts_ms = int(time.time() * 1000)
+            for name in moisture:
+                if pump_state[name] == "ON":
+                    moisture[name] += 5
+                else:
+                    moisture[name] -= 2
+                moisture[name] = max(0, min(100, moisture[name]))
+                batcher.add_telemetry(name, {
+                    "soil_moisture": int(4095 - (moisture[name] * 30.95)),
+                    "pump_state": pump_state[name]
+                }, ts_ms)
+            print(f"📤 Buffered {num_devices} samples ({batcher.stats['messages_sent']} batches sent)")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        batcher.close()
+
 if __name__ == "__main__":
-    simulate_device()
+    if len(sys.argv) > 1:
+        simulate_fleet(int(sys.argv[1]))
+    else:
+        simulate_device()
@@ -0,0 +1,232 @@
+"""
+Local time-series rollup store for dashboard charts.
+
+The agent records moisture, pump state and decisions per field; the store
+keeps only rollups (min / max / mean / last) at 1 min, 15 min, 1 h and 1 day
+resolution, never the raw samples. Each sample updates one in-memory bucket
+per resolution; pending buckets are merged into SQLite in one transaction
+every FLUSH_SECONDS, so the agent's hot path never waits on disk.
+
+Dashboards open the same file (WAL mode: readers don't block the writer)
+and query any range from the coarsest level that still gives enough points,
+so a season-long chart reads a few hundred rows instead of millions.
+"""
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TIMESERIES_PATH = "timeseries.sqlite"
+FLUSH_SECONDS = 10.0         # pending buckets older than this are written out
+PRUNE_SECONDS = 3600.0       # how often expired buckets are deleted
+MAX_POINTS = 800             # default chart resolution (points per series)
+
+# Resolution name -> (bucket seconds, retention seconds), finest first
+RESOLUTIONS = {
+    "1m": (60, 2 * 86400),
+    "15m": (900, 35 * 86400),
+    "1h": (3600, 400 * 86400),
+    "1d": (86400, 10 * 365 * 86400),
+}
+
+# Recorded metrics
+MOISTURE = "moisture"
+PUMP_ON = "pump_on"        # 0/1; its mean is the pump duty cycle
+DECISION_ON = "decision"   # 0/1 PUMP_ON decisions
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup (
+    series TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    min REAL NOT NULL,
+    max REAL NOT NULL,
+    sum REAL NOT NULL,
+    count INTEGER NOT NULL,
+    last REAL NOT NULL,
+    last_ts REAL NOT NULL,
+    PRIMARY KEY (series, metric, resolution, bucket)
+) WITHOUT ROWID
+"""
+
+# Merges a pending bucket into the stored one
+_UPSERT = """
+INSERT INTO rollup VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (series, metric, resolution, bucket) DO UPDATE SET
+    min = min(min, excluded.min),
+    max = max(max, excluded.max),
+    sum = sum + excluded.sum,
+    count = count + excluded.count,
+    last = CASE WHEN excluded.last_ts >= last_ts THEN excluded.last ELSE last END,
+    last_ts = max(last_ts, excluded.last_ts)
+"""
+
+
+def pick_resolution(start: float, end: float, max_points: int = MAX_POINTS,
+                    now: Optional[float] = None) -> str:
+    """Finest resolution that covers [start, end] in at most max_points buckets and is still retained."""
+    now = time.time() if now is None else now
+    for name, (seconds, retention) in RESOLUTIONS.items():
+        if (end - start) / seconds <= max_points and start >= now - retention:
+            return name
+    return "1d"
+
+
+class TimeSeriesStore:
+    """
+    Multi-resolution rollups in one SQLite file. A writer (the agent)
+    calls record(); readers (dashboards) open with readonly=True and query().
+    """
+
+    def __init__(self, path: str = TIMESERIES_PATH, readonly: bool = False,
+                 flush_seconds: float = FLUSH_SECONDS, clock=time.time):
+        self.path = path
+        self.readonly = readonly
+        self.flush_seconds = flush_seconds
+        self.clock = clock
+        if readonly:
+            self.db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute(_SCHEMA)
+            self.db.commit()
+        # (series, metric, resolution seconds, bucket) -> [min, max, sum, count, last, last_ts]
+        self.pending: Dict[Tuple[str, str, int, int], list] = {}
+        self._levels = tuple(seconds for seconds, _ in RESOLUTIONS.values())
+        self._last_flush = clock()
+        self._last_prune = 0.0
+        self.samples = 0
+        self.flushes = 0
+
+    @classmethod
+    def open_readonly(cls, path: str = TIMESERIES_PATH) -> Optional["TimeSeriesStore"]:
+        """Reader for dashboards; None until the agent has created the file."""
+        if not os.path.exists(path):
+            return None
+        return cls(path, readonly=True)
+
+    # --- Ingest ---
+    def record(self, series: str, ts: float, values: Dict[str, float]):
+        """Adds one sample per metric, e.g. record("Field-1", now, {"moisture": 41.5, "pump_on": 1})."""
+        pending = self.pending
+        for metric, value in values.items():
+            if value is None:
+                continue
+            value = float(value)
+            for seconds in self._levels:
+                key = (series, metric, seconds, int(ts // seconds) * seconds)
+                bucket = pending.get(key)
+                if bucket is None:
+                    pending[key] = [value, value, value, 1, value, ts]
+                else:
+                    if value < bucket[0]:
+                        bucket[0] = value
+                    if value > bucket[1]:
+                        bucket[1] = value
+                    bucket[2] += value
+                    bucket[3] += 1
+                    if ts >= bucket[5]:
+                        bucket[4] = value
+                        bucket[5] = ts
+        self.samples += 1
+        if self.clock() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def record_many(self, rows: Iterable[Tuple[str, float, Dict[str, float]]]):
+        for series, ts, values in rows:
+            self.record(series, ts, values)
+
+    def flush(self):
+        """Merges pending buckets into the file in one transaction."""
+        now = self.clock()
+        self._last_flush = now
+        if not self.pending:
+            return
+        # Buckets already past their level's retention (backfills) are dropped
+        oldest = {seconds: now - retention for seconds, retention in RESOLUTIONS.values()}
+        rows = [key + tuple(bucket) for key, bucket in self.pending.items() if key[3] >= oldest[key[2]]]
+        self.pending = {}
+        with self.db:
+            self.db.executemany(_UPSERT, rows)
+            if now - self._last_prune >= PRUNE_SECONDS:
+                self._prune(now)
+        self.flushes += 1
+
+    def _prune(self, now: float):
+        self._last_prune = now
+        for seconds, retention in RESOLUTIONS.values():
+            self.db.execute("DELETE FROM rollup WHERE resolution = ? AND bucket < ?",
+                            (seconds, now - retention))
+
+    def close(self):
+        if not self.readonly:
+            self.flush()
+        self.db.close()
+
+    # --- Queries ---
+    def series(self) -> List[str]:
+        """Fields with any data (for chart pickers)."""
+        rows = self.db.execute("SELECT DISTINCT series FROM rollup WHERE resolution = ?",
+                               (RESOLUTIONS["1d"][0],))
+        return sorted(row[0] for row in rows)
+
+    def query(self, series: str, metric: str, start: float, end: float,
+              max_points: int = MAX_POINTS, resolution: Optional[str] = None) -> Dict[str, list]:
+        """
+        Columns {"ts", "min", "max", "mean", "last"} (bucket start, epoch
+        seconds) for [start, end] at `resolution`, or the finest resolution
+        that fits max_points. Also returns the resolution used.
+        """
+        if not self.readonly:
+            self.flush()
+        resolution = resolution or pick_resolution(start, end, max_points, now=self.clock())
+        seconds = RESOLUTIONS[resolution][0]
+        rows = self.db.execute(
+            "SELECT bucket, min, max, sum / count, last FROM rollup "
+            "WHERE series = ? AND metric = ? AND resolution = ? AND bucket BETWEEN ? AND ? "
+            "ORDER BY bucket",
+            (series, metric, seconds, int(start // seconds) * seconds, end),
+        ).fetchall()
+        columns = {"resolution": resolution, "ts": [], "min": [], "max": [], "mean": [], "last": []}
+        for bucket, lo, hi, mean, last in rows:
+            columns["ts"].append(bucket)
+            columns["min"].append(lo)
+            columns["max"].append(hi)
+            columns["mean"].append(mean)
+            columns["last"].append(last)
+        return columns
+
+
+# --- Dashboard Helpers ---
+HISTORY_RANGES = {
+    "6 Hours": 6 * 3600,
+    "24 Hours": 86400,
+    "7 Days": 7 * 86400,
+    "30 Days": 30 * 86400,
+    "Season": 180 * 86400,
+}
+
+
+def history_frame(store: TimeSeriesStore, series: str, seconds: float, now: Optional[float] = None):
+    """
+    Chart-ready DataFrame (local-time index) of moisture mean/min/max and
+    pump on-time % for the last `seconds`, plus the resolution used.
+    """
+    import pandas as pd
+
+    now = time.time() if now is None else now
+    moisture = store.query(series, MOISTURE, now - seconds, now)
+    pump = store.query(series, PUMP_ON, now - seconds, now, resolution=moisture["resolution"])
+    frame = pd.DataFrame({
+        "Moisture %": pd.Series(moisture["mean"], index=moisture["ts"], dtype=float),
+        "Min %": pd.Series(moisture["min"], index=moisture["ts"], dtype=float),
+        "Max %": pd.Series(moisture["max"], index=moisture["ts"], dtype=float),
+        "Pump On %": pd.Series(pump["mean"], index=pump["ts"], dtype=float) * 100.0,
+    })
+    # Local time, like payload_codec.format_ts (at most max_points conversions)
+    frame.index = pd.DatetimeIndex([datetime.fromtimestamp(ts) for ts in frame.index])
+    return frame, moisture["resolution"]
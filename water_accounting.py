@@ -0,0 +1,366 @@
+"""
+Incremental water accounting.
+
+Books delivered water (pump on-time x flow rate, split into AI-controlled
+and manual) and the fixed-timer baseline into per-field, per-zone and
+fleet-wide day / week / season totals. Every event touches a constant
+number of buckets, so totals are always current and a dashboard query is
+a lookup, not a scan over history.
+
+The baseline accrues continuously at each field's timer rate (FIXED_MM_PER_DAY
+x Kc over the field's area); zone and fleet baselines accrue from summed
+rates, so they too cost O(1) per query. Day buckets are a ring of
+HISTORY_DAYS days (a season), weeks start on Monday.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+AI, MANUAL, FIXED = 0, 1, 2
+CHANNELS = ("ai", "manual", "fixed")
+
+FIXED_MM_PER_DAY = 7.0     # timer baseline per unit Kc, as in irrigation_engine
+DEFAULT_FLOW_LPM = 600.0   # pump delivery, liters per minute
+HISTORY_DAYS = 200         # one season of daily buckets per field
+DAY_SECONDS = 86400
+INITIAL_CAPACITY = 16
+
+FIELD, ZONE, FLEET = "field", "zone", "fleet"
+DAY, WEEK, SEASON = "day", "week", "season"
+
+
+def day_index(ts: float, utc_offset_hours: float = 0.0) -> int:
+    return int((ts + utc_offset_hours * 3600) // DAY_SECONDS)
+
+
+def week_index(day: int) -> int:
+    """Monday-based week number (1970-01-01 was a Thursday)."""
+    return (day + 3) // 7
+
+
+class _Level:
+    """Buckets for one aggregation level: nodes x {day ring, week ring, season} x channels."""
+
+    def __init__(self, history_days: int, weeks: int, capacity: int):
+        self.index: Dict[str, int] = {}
+        self.history_days = history_days
+        self.weeks = weeks
+        self.size = 0
+        self.capacity = 0
+        self._grow(capacity)
+
+    def _grow(self, capacity: int):
+        def grow(old, shape, fill=0.0):
+            new = np.full((capacity,) + shape, fill)
+            if old is not None:
+                new[:self.size] = old[:self.size]
+            return new
+
+        self.day = grow(getattr(self, "day", None), (self.history_days, len(CHANNELS)))
+        self.week = grow(getattr(self, "week", None), (self.weeks, len(CHANNELS)))
+        self.season = grow(getattr(self, "season", None), (len(CHANNELS),))
+        self.rate = grow(getattr(self, "rate", None), ())     # baseline liters/second
+        self.since = grow(getattr(self, "since", None), ())   # baseline accrued up to
+        self.capacity = capacity
+
+    def add_node(self, name: str, now: float) -> int:
+        if name in self.index:
+            return self.index[name]
+        if self.size == self.capacity:
+            self._grow(self.capacity * 2)
+        node = self.size
+        self.size += 1
+        self.index[name] = node
+        self.since[node] = now
+        return node
+
+
+class WaterLedger:
+    """
+    Water-use ledger for a fleet of fields grouped into zones.
+
+        ledger.register_field("Field-1", zone="North", area_ha=1.5, kc=1.1, now=ts)
+        ledger.pump_state("Field-1", ts, on=True)          # every pump_state sample
+        ledger.totals(FIELD, "Field-1", DAY, now=ts)       # {"ai", "manual", "fixed", "delivered", "saved"}
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY, history_days: int = HISTORY_DAYS,
+                 utc_offset_hours: float = 0.0):
+        self.history_days = history_days
+        self.weeks = history_days // 7 + 2
+        self.utc_offset_hours = utc_offset_hours
+        self.levels = {
+            FIELD: _Level(history_days, self.weeks, capacity),
+            ZONE: _Level(history_days, self.weeks, 4),
+            FLEET: _Level(history_days, self.weeks, 1),
+        }
+        self.levels[FLEET].add_node(FLEET, 0.0)
+        self._fleet_started = False
+        # Which absolute day / week each ring slot currently holds
+        self.slot_day = np.full(history_days, -1, dtype=np.int64)
+        self.slot_week = np.full(self.weeks, -1, dtype=np.int64)
+        # Per-field pump bookkeeping
+        self.zone_of: Dict[str, str] = {}
+        self.flow_lps: Dict[str, float] = {}
+        self.config: Dict[str, tuple] = {}
+        self.pump: Dict[str, tuple] = {}  # field -> (on, manual, booked_until)
+        self.running = set()
+        self.events = 0
+
+    # --- Persistence ---
+    def to_state(self) -> Dict:
+        """Checkpoint state; only day / week ring slots in use are stored."""
+        days = np.flatnonzero(self.slot_day >= 0)
+        weeks = np.flatnonzero(self.slot_week >= 0)
+        levels = {}
+        for name, level in self.levels.items():
+            n = level.size
+            levels[name] = {"index": level.index, "day": level.day[:n][:, days].tolist(),
+                            "week": level.week[:n][:, weeks].tolist(), "season": level.season[:n].tolist(),
+                            "rate": level.rate[:n].tolist(), "since": level.since[:n].tolist()}
+        return {
+            "history_days": self.history_days, "utc_offset_hours": self.utc_offset_hours,
+            "slot_day": self.slot_day.tolist(), "slot_week": self.slot_week.tolist(), "levels": levels,
+            "fleet_started": self._fleet_started, "zone_of": self.zone_of, "flow_lps": self.flow_lps,
+            "config": self.config, "pump": self.pump, "running": sorted(self.running), "events": self.events,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "WaterLedger":
+        ledger = cls(capacity=max(INITIAL_CAPACITY, len(state["levels"][FIELD]["index"])),
+                     history_days=state["history_days"], utc_offset_hours=state["utc_offset_hours"])
+        ledger.slot_day[:] = state["slot_day"]
+        ledger.slot_week[:] = state["slot_week"]
+        days = np.flatnonzero(ledger.slot_day >= 0)
+        weeks = np.flatnonzero(ledger.slot_week >= 0)
+        for name, saved in state["levels"].items():
+            level = ledger.levels[name]
+            n = len(saved["index"])
+            if n > level.capacity:
+                level._grow(n)
+            level.index = dict(saved["index"])
+            level.size = n
+            if n:
+                level.day[:n, days] = saved["day"]
+                level.week[:n, weeks] = saved["week"]
+                level.season[:n] = saved["season"]
+                level.rate[:n] = saved["rate"]
+                level.since[:n] = saved["since"]
+        ledger._fleet_started = state["fleet_started"]
+        ledger.zone_of = dict(state["zone_of"])
+        ledger.flow_lps = dict(state["flow_lps"])
+        ledger.config = {field: tuple(config) for field, config in state["config"].items()}
+        ledger.pump = {field: tuple(pump) for field, pump in state["pump"].items()}
+        ledger.running = set(state["running"])
+        ledger.events = state["events"]
+        return ledger
+
+    # --- Registry / Config ---
+    def register_field(self, field: str, zone: str = "default", area_ha: float = 1.0, kc: float = 1.0,
+                       flow_lpm: float = DEFAULT_FLOW_LPM, now: float = 0.0) -> int:
+        fields, zones = self.levels[FIELD], self.levels[ZONE]
+        if field in fields.index:
+            self.configure(field, area_ha=area_ha, kc=kc, flow_lpm=flow_lpm, zone=zone, now=now)
+            return fields.index[field]
+        if not self._fleet_started:
+            self.levels[FLEET].since[0] = now
+            self._fleet_started = True
+        node = fields.add_node(field, now)
+        zones.add_node(zone, now)
+        self.zone_of[field] = zone
+        self.flow_lps[field] = flow_lpm / 60.0
+        self.config[field] = (zone, area_ha, kc)
+        self._set_rate(field, self._fixed_rate(area_ha, kc), now)
+        return node
+
+    def configure(self, field: str, area_ha: float, kc: float, zone: Optional[str] = None,
+                  flow_lpm: Optional[float] = None, now: float = 0.0):
+        """Config change (cheap no-op when unchanged); the baseline follows from `now` on."""
+        zone = zone or self.zone_of[field]
+        if flow_lpm is not None:
+            self.flow_lps[field] = flow_lpm / 60.0
+        if self.config.get(field) == (zone, area_ha, kc):
+            return
+        if zone != self.zone_of[field]:
+            # Move the field's baseline rate to its new zone
+            self._set_rate(field, 0.0, now)
+            self._book_pump(field, now)
+            self.levels[ZONE].add_node(zone, now)
+            self.zone_of[field] = zone
+        self.config[field] = (zone, area_ha, kc)
+        self._set_rate(field, self._fixed_rate(area_ha, kc), now)
+
+    @staticmethod
+    def _fixed_rate(area_ha: float, kc: float) -> float:
+        return FIXED_MM_PER_DAY * kc * 10000.0 * area_ha / DAY_SECONDS
+
+    def _set_rate(self, field: str, rate: float, now: float):
+        fields, zones, fleet = self.levels[FIELD], self.levels[ZONE], self.levels[FLEET]
+        node, zone = fields.index[field], zones.index[self.zone_of[field]]
+        delta = rate - fields.rate[node]
+        for level, i in ((fields, node), (zones, zone), (fleet, 0)):
+            self._accrue(level, i, now)
+            level.rate[i] += delta
+
+    # --- Events ---
+    def pump_state(self, field: str, ts: float, on: bool, manual: bool = False):
+        """
+        Feed every pump_state sample (repeats are fine): water is booked for
+        the time the pump was on since the previous sample, so totals stay
+        current while it runs.
+        """
+        self.events += 1
+        self._book_pump(field, ts)
+        self.pump[field] = (on, manual, ts)
+        if on:
+            self.running.add(field)
+        else:
+            self.running.discard(field)
+
+    def _book_pump(self, field: str, ts: float):
+        state = self.pump.get(field)
+        if state is None:
+            return
+        on, manual, booked_until = state
+        if on and ts > booked_until:
+            self._book(field, booked_until, ts, MANUAL if manual else AI, self.flow_lps[field])
+        self.pump[field] = (on, manual, max(ts, booked_until))
+
+    def add_delivery(self, field: str, ts: float, liters: float, manual: bool = False):
+        """A metered delivery (e.g. a flow meter total) booked at one instant."""
+        self.events += 1
+        self._add_all(field, day_index(ts, self.utc_offset_hours), MANUAL if manual else AI, liters)
+
+    # --- Bucket Updates ---
+    def _slots(self, day: int):
+        slot = day % self.history_days
+        if self.slot_day[slot] != day:
+            # Ring slot reused for a new day: clear the old day everywhere
+            for level in self.levels.values():
+                level.day[:level.size, slot] = 0.0
+            self.slot_day[slot] = day
+        week = week_index(day)
+        wslot = week % self.weeks
+        if self.slot_week[wslot] != week:
+            for level in self.levels.values():
+                level.week[:level.size, wslot] = 0.0
+            self.slot_week[wslot] = week
+        return slot, wslot
+
+    def _add(self, level: _Level, node: int, day: int, channel: int, liters: float):
+        slot, wslot = self._slots(day)
+        level.day[node, slot, channel] += liters
+        level.week[node, wslot, channel] += liters
+        level.season[node, channel] += liters
+
+    def _add_all(self, field: str, day: int, channel: int, liters: float):
+        """Books into the field, its zone and the fleet (ring slots resolved once)."""
+        slot, wslot = self._slots(day)
+        fields, zones, fleet = self.levels[FIELD], self.levels[ZONE], self.levels[FLEET]
+        for level, node in ((fields, fields.index[field]), (zones, zones.index[self.zone_of[field]]),
+                            (fleet, 0)):
+            level.day[node, slot, channel] += liters
+            level.week[node, wslot, channel] += liters
+            level.season[node, channel] += liters
+
+    def _book(self, field: str, start: float, end: float, channel: int, liters_per_sec: float):
+        """Books a constant-rate interval, split at local midnights."""
+        offset = self.utc_offset_hours * 3600
+        while start < end:
+            day = day_index(start, self.utc_offset_hours)
+            segment_end = min(end, (day + 1) * DAY_SECONDS - offset)
+            self._add_all(field, day, channel, (segment_end - start) * liters_per_sec)
+            start = segment_end
+
+    def _accrue(self, level: _Level, node: int, now: float):
+        """Brings a node's fixed-schedule baseline up to `now`."""
+        start = level.since[node]
+        rate = level.rate[node]
+        if not rate:
+            level.since[node] = max(now, start)
+            return
+        offset = self.utc_offset_hours * 3600
+        while start < now:
+            day = day_index(start, self.utc_offset_hours)
+            segment_end = min(now, (day + 1) * DAY_SECONDS - offset)
+            self._add(level, node, day, FIXED, (segment_end - start) * rate)
+            start = segment_end
+        level.since[node] = max(start, level.since[node])
+
+    # --- Queries ---
+    def totals(self, level_name: str, name: str, period: str = DAY, now: float = 0.0,
+               at: Optional[float] = None) -> Dict[str, float]:
+        """
+        Totals for one field / zone (or the fleet) for the day or week
+        containing `at` (default: now), or the whole season.
+        """
+        level = self.levels[level_name]
+        node = level.index[name]
+        self._accrue(level, node, now)
+        if level_name == FIELD:
+            self._book_pump(name, now)
+        day = day_index(now if at is None else at, self.utc_offset_hours)
+        if period == SEASON:
+            values = level.season[node]
+        elif period == WEEK:
+            wslot = week_index(day) % self.weeks
+            values = level.week[node, wslot] if self.slot_week[wslot] == week_index(day) else np.zeros(3)
+        else:
+            slot = day % self.history_days
+            values = level.day[node, slot] if self.slot_day[slot] == day else np.zeros(3)
+        return _as_totals(values)
+
+    def series(self, level_name: str, name: str, days: int = 7, now: float = 0.0) -> List[Dict[str, float]]:
+        """Daily totals for the last `days` days up to today, oldest first (for charts)."""
+        today = day_index(now, self.utc_offset_hours)
+        offset = self.utc_offset_hours * 3600
+        return [dict(self.totals(level_name, name, DAY, now, at=d * DAY_SECONDS - offset), day=d)
+                for d in range(today - days + 1, today + 1)]
+
+    def field_table(self, period: str = DAY, now: float = 0.0) -> Dict[str, np.ndarray]:
+        """Every field's totals for today / this week / the season as columns (dashboards)."""
+        fields = self.levels[FIELD]
+        for field in self.running:
+            self._book_pump(field, now)
+        self._accrue_all(fields, now)
+        n = fields.size
+        day = day_index(now, self.utc_offset_hours)
+        if period == SEASON:
+            values = fields.season[:n]
+        elif period == WEEK:
+            wslot = week_index(day) % self.weeks
+            values = fields.week[:n, wslot] if self.slot_week[wslot] == week_index(day) else np.zeros((n, 3))
+        else:
+            slot = day % self.history_days
+            values = fields.day[:n, slot] if self.slot_day[slot] == day else np.zeros((n, 3))
+        table = {channel: values[:, i].copy() for i, channel in enumerate(CHANNELS)}
+        table["delivered"] = table["ai"] + table["manual"]
+        table["saved"] = table["fixed"] - table["delivered"]
+        table["field"] = np.array(list(fields.index), dtype=object)
+        return table
+
+    def _accrue_all(self, level: _Level, now: float):
+        """Vectorized _accrue over every node of a level."""
+        n = level.size
+        offset = self.utc_offset_hours * 3600
+        since, rate = level.since[:n], level.rate[:n]
+        while True:
+            pending = since < now
+            if not pending.any():
+                break
+            nodes = np.nonzero(pending)[0]
+            days = ((since[nodes] + offset) // DAY_SECONDS).astype(np.int64)
+            ends = np.minimum(now, (days + 1) * DAY_SECONDS - offset)
+            liters = (ends - since[nodes]) * rate[nodes]
+            for day in np.unique(days):
+                mask = days == day
+                slot, wslot = self._slots(int(day))
+                level.day[nodes[mask], slot, FIXED] += liters[mask]
+                level.week[nodes[mask], wslot, FIXED] += liters[mask]
+            level.season[nodes, FIXED] += liters
+            since[nodes] = ends
+
+
+def _as_totals(values: np.ndarray) -> Dict[str, float]:
+    ai, manual, fixed = (float(v) for v in values)
+    return {"ai": ai, "manual": manual, "fixed": fixed, "delivered": ai + manual, "saved": fixed - (ai + manual)}
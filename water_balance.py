@@ -0,0 +1,198 @@
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+BASE_ET0 = 6.5  # mm/day Reference Evapotranspiration
+REFERENCE_TEMP_C = 28.0  # air temperature BASE_ET0 corresponds to
+
+# Volumetric water content (m3/m3) and how fast water above field capacity
+# drains out of the root zone (1/day, exponential decay of the surplus).
+SOIL_PROPERTIES = {
+    "Loam": {"field_capacity": 0.30, "wilting_point": 0.14, "drainage_per_day": 0.7},
+    "Clay": {"field_capacity": 0.38, "wilting_point": 0.22, "drainage_per_day": 0.25},
+    "Sandy": {"field_capacity": 0.15, "wilting_point": 0.06, "drainage_per_day": 2.0},
+}
+DEFAULT_SOIL = "Loam"
+
+# Effective root depth (m) and FAO-56 depletion fraction p per crop.
+CROP_ROOTING = {
+    "Rice (Paddy)": {"root_depth_m": 0.5, "depletion_fraction": 0.2},
+    "Wheat": {"root_depth_m": 1.0, "depletion_fraction": 0.55},
+    "Sugarcane": {"root_depth_m": 1.2, "depletion_fraction": 0.65},
+    "Cotton": {"root_depth_m": 1.0, "depletion_fraction": 0.65},
+}
+DEFAULT_ROOTING = {"root_depth_m": 0.6, "depletion_fraction": 0.5}
+
+# Weight given to a new moisture sample vs. the model's own estimate.
+SAMPLE_GAIN = 0.6
+INITIAL_CAPACITY = 16
+
+
+def soil_key(soil_type: str) -> str:
+    """Maps dashboard labels like 'Clay (Retains Water)' to SOIL_PROPERTIES keys."""
+    for key in SOIL_PROPERTIES:
+        if soil_type and soil_type.lower().startswith(key.lower()):
+            return key
+    return DEFAULT_SOIL
+
+
+def et0_from_weather(weather: Dict) -> float:
+    """Reference ET (mm/day): BASE_ET0 scaled by air temperature (Hargreaves' T + 17.8 term)."""
+    temperature = weather.get("temperature")
+    if temperature is None:
+        return BASE_ET0
+    return max(0.0, BASE_ET0 * (temperature + 17.8) / (REFERENCE_TEMP_C + 17.8))
+
+
+class FieldWaterBalance:
+    """
+    Root-zone water balance (FAO-56 style) for many fields, stored as one
+    numpy column per state variable so a whole fleet advances in a single
+    vectorized step.
+
+    Per field:
+        depletion  Dr, mm below field capacity (0 = at capacity, TAW = wilting)
+        surplus    mm above field capacity, still draining
+        taw / raw  total and readily available water, mm
+        etc        crop evapotranspiration, mm/day (ET0 * Kc)
+
+    Moisture samples (0-100 %, 100 = field capacity, 0 = wilting point) are
+    blended into Dr; ET, drainage, rain and irrigation update it between samples.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.index: Dict[str, int] = {}
+        self.size = 0
+        self._alloc(max(1, capacity))
+
+    def _alloc(self, capacity: int):
+        def grow(name, fill=0.0):
+            column = np.full(capacity, fill)
+            old = getattr(self, name, None)
+            if old is not None:
+                column[:self.size] = old[:self.size]
+            setattr(self, name, column)
+
+        for name in self.COLUMNS:
+            grow(name)
+        self.capacity = capacity
+
+    # --- Persistence ---
+    COLUMNS = ("depletion", "surplus", "taw", "raw", "etc", "drainage", "updated_at")
+
+    def to_state(self) -> Dict:
+        return {"index": self.index,
+                "columns": {name: getattr(self, name)[:self.size].tolist() for name in self.COLUMNS}}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "FieldWaterBalance":
+        model = cls(capacity=max(INITIAL_CAPACITY, len(state["index"])))
+        model.index = dict(state["index"])
+        model.size = len(model.index)
+        for name in cls.COLUMNS:
+            getattr(model, name)[:model.size] = state["columns"][name]
+        return model
+
+    # --- Registry ---
+    def add_field(self, name: str, soil_type: str = DEFAULT_SOIL, crop_type: str = "",
+                  kc: float = 1.0, et0: float = BASE_ET0, now: Optional[float] = None) -> int:
+        if name in self.index:
+            return self.index[name]
+        if self.size == self.capacity:
+            self._alloc(self.capacity * 2)
+        idx = self.size
+        self.size += 1
+        self.index[name] = idx
+        self.configure(idx, soil_type, crop_type, kc, et0)
+        self.updated_at[idx] = time.time() if now is None else now
+        return idx
+
+    def configure(self, idx: int, soil_type: str, crop_type: str, kc: float, et0: float = BASE_ET0):
+        soil = SOIL_PROPERTIES[soil_key(soil_type)]
+        rooting = CROP_ROOTING.get(crop_type, DEFAULT_ROOTING)
+        taw = 1000.0 * (soil["field_capacity"] - soil["wilting_point"]) * rooting["root_depth_m"]
+        # Keep the same relative depletion when the soil/crop changes
+        fraction = self.depletion[idx] / self.taw[idx] if self.taw[idx] > 0 else 0.0
+        self.taw[idx] = taw
+        self.raw[idx] = rooting["depletion_fraction"] * taw
+        self.depletion[idx] = fraction * taw
+        self.drainage[idx] = soil["drainage_per_day"]
+        self.etc[idx] = et0 * kc
+
+    def set_et0(self, idx: int, et0: float, kc: float):
+        self.etc[idx] = et0 * kc
+
+    # --- Incremental Updates (single field) ---
+    def advance(self, idx: int, now: float):
+        """Applies ET and drainage since the field's last update."""
+        self._step(slice(idx, idx + 1), now)
+
+    def assimilate(self, idx: int, moisture_percent: float, now: float):
+        self.advance(idx, now)
+        observed = self.taw[idx] * (1.0 - min(100.0, max(0.0, moisture_percent)) / 100.0)
+        self.depletion[idx] += SAMPLE_GAIN * (observed - self.depletion[idx])
+        self.surplus[idx] *= (1.0 - SAMPLE_GAIN)
+
+    def add_water(self, idx: int, mm: float, now: float):
+        """Rain or irrigation event: refills depletion first, the rest drains as surplus."""
+        self.advance(idx, now)
+        refill = min(mm, self.depletion[idx])
+        self.depletion[idx] -= refill
+        self.surplus[idx] += mm - refill
+
+    # --- Incremental Updates (whole fleet) ---
+    def advance_all(self, now: float):
+        self._step(slice(0, self.size), now)
+
+    def assimilate_all(self, indices: np.ndarray, moisture_percent: np.ndarray, now: float):
+        self._step(slice(0, self.size), now)
+        observed = self.taw[indices] * (1.0 - np.clip(moisture_percent, 0.0, 100.0) / 100.0)
+        self.depletion[indices] += SAMPLE_GAIN * (observed - self.depletion[indices])
+        self.surplus[indices] *= (1.0 - SAMPLE_GAIN)
+
+    def add_water_all(self, indices: np.ndarray, mm: np.ndarray, now: float):
+        self._step(slice(0, self.size), now)
+        refill = np.minimum(mm, self.depletion[indices])
+        self.depletion[indices] -= refill
+        self.surplus[indices] += mm - refill
+
+    def _step(self, sel: slice, now: float):
+        dt_days = np.maximum(0.0, now - self.updated_at[sel]) / 86400.0
+        surplus = self.surplus[sel]
+        depletion = self.depletion[sel]
+        taw = self.taw[sel]
+        raw = self.raw[sel]
+
+        # Water stress coefficient Ks: ET slows once depletion passes RAW
+        stress_range = np.maximum(taw - raw, 1e-9)
+        ks = np.clip((taw - depletion) / stress_range, 0.0, 1.0)
+        et_mm = self.etc[sel] * ks * dt_days
+
+        drained = surplus * np.exp(-self.drainage[sel] * dt_days)
+        from_surplus = np.minimum(drained, et_mm)
+        self.surplus[sel] = drained - from_surplus
+        self.depletion[sel] = np.minimum(taw, depletion + et_mm - from_surplus)
+        self.updated_at[sel] = now
+
+    # --- Queries ---
+    def moisture_percent(self, idx: int) -> float:
+        if self.taw[idx] <= 0:
+            return 100.0
+        return 100.0 * (1.0 - self.depletion[idx] / self.taw[idx])
+
+    def hours_to_threshold(self, idx: int) -> float:
+        """Hours until depletion reaches RAW (the irrigation trigger); 0 if already past."""
+        remaining = max(0.0, self.raw[idx] - self.depletion[idx])
+        if self.etc[idx] <= 0:
+            return float("inf")
+        return float(remaining / self.etc[idx] * 24.0)
+
+    def hours_to_threshold_all(self) -> np.ndarray:
+        n = self.size
+        # Surplus is ignored on purpose: drainage removes it without ET, so
+        # counting it would overestimate the time left.
+        remaining = np.maximum(0.0, self.raw[:n] - self.depletion[:n])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            hours = np.where(self.etc[:n] > 0, remaining / self.etc[:n] * 24.0, np.inf)
+        return hours